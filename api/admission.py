@@ -0,0 +1,160 @@
+"""
+DONGOL Admission Control - Per-client rate limits and load shedding
+"""
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from core.engine import DongolEngine, Priority
+
+
+# Share of the queue-depth and memory limits each priority may use before
+# it is shed. CRITICAL is never shed for load, only rate limited.
+SHED_THRESHOLDS: Dict[Priority, float] = {
+    Priority.BACKGROUND: 0.25,
+    Priority.LOW: 0.5,
+    Priority.NORMAL: 0.75,
+    Priority.HIGH: 0.9,
+    Priority.CRITICAL: math.inf,
+}
+
+
+@dataclass
+class Rejection:
+    """Why a request was refused and when the client may retry"""
+    reason: str
+    retry_after: float
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at a fixed rate
+    """
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now if now is not None else time.monotonic()
+
+    def take(self, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """Take tokens; returns 0 if admitted, else seconds until they are available"""
+        now = now if now is not None else time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size, where the platform exposes it cheaply"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class AdmissionController:
+    """
+    Decides whether the API takes on more work
+
+    Each client gets a token bucket, so one noisy caller cannot starve the
+    rest. On top of that, requests are shed by priority as the engine's
+    pending chunk count or the process RSS approach their limits: BACKGROUND
+    work goes first, then LOW, and CRITICAL work is always let through. Any limit left as
+    None is not enforced.
+    """
+
+    def __init__(
+        self,
+        rate_per_client: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_pending_chunks: Optional[int] = None,
+        max_memory_mb: Optional[float] = None,
+        retry_after_seconds: float = 1.0,
+        max_clients: int = 10000
+    ):
+        self.rate_per_client = rate_per_client
+        self.burst = burst if burst is not None else max(1.0, 2 * (rate_per_client or 0))
+        self.max_pending_chunks = max_pending_chunks
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024) if max_memory_mb else None
+        self.retry_after_seconds = retry_after_seconds
+        self.max_clients = max_clients
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        def number(name: str) -> Optional[float]:
+            value = os.environ.get(name)
+            return float(value) if value else None
+
+        max_pending = number("DONGOL_MAX_PENDING_CHUNKS")
+        return cls(
+            rate_per_client=number("DONGOL_RATE_LIMIT"),
+            burst=number("DONGOL_RATE_BURST"),
+            max_pending_chunks=int(max_pending) if max_pending is not None else None,
+            max_memory_mb=number("DONGOL_MAX_MEMORY_MB"),
+            retry_after_seconds=number("DONGOL_RETRY_AFTER") or 1.0
+        )
+
+    def _bucket(self, client_id: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = self._buckets[client_id] = TokenBucket(self.rate_per_client, self.burst, now)
+            if len(self._buckets) > self.max_clients:
+                # Forget the least recently seen client; it starts with a full bucket
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client_id)
+        return bucket
+
+    def _load(self, engine: DongolEngine) -> float:
+        """Highest utilisation across the enforced limits, as a fraction"""
+        load = 0.0
+        if self.max_pending_chunks:
+            load = engine.stats.pending_chunks / self.max_pending_chunks
+        if self.max_memory_bytes:
+            rss = _rss_bytes()
+            if rss is not None:
+                load = max(load, rss / self.max_memory_bytes)
+        return load
+
+    def check(
+        self,
+        engine: DongolEngine,
+        client_id: str,
+        priority: Priority = Priority.NORMAL,
+        cost: float = 1.0,
+        now: Optional[float] = None
+    ) -> Optional[Rejection]:
+        """Admit a request (returns None) or explain why it is refused"""
+        if priority is not Priority.CRITICAL and self._load(engine) >= SHED_THRESHOLDS[priority]:
+            return self._reject("overloaded", self.retry_after_seconds)
+
+        if self.rate_per_client:
+            now = now if now is not None else time.monotonic()
+            wait = self._bucket(client_id, now).take(cost, now)
+            if wait > 0:
+                return self._reject("rate_limited", wait)
+
+        self.admitted += 1
+        return None
+
+    def _reject(self, reason: str, retry_after: float) -> Rejection:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return Rejection(reason, retry_after)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "tracked_clients": len(self._buckets),
+        }
@@ -0,0 +1,117 @@
+"""
+DONGOL Idempotency - Deduplicate retried task creation requests
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class IdempotencyConflict(Exception):
+    """An Idempotency-Key was reused with a different request body"""
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    result: "asyncio.Future[str]"
+    expires_at: float
+
+
+class IdempotencyCache:
+    """
+    Bounded, TTL-evicted map from idempotency keys to created task ids
+
+    The first request for a key runs the creation; concurrent requests
+    with the same key await the same future instead of creating again, and
+    later retries replay the stored task id. If the creating request is
+    cancelled, its waiters retry the creation themselves. Every entry shares
+    one TTL, so insertion order is expiry order and eviction only looks at
+    the front.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 86400):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "IdempotencyCache":
+        return cls(
+            max_entries=int(os.environ.get("DONGOL_IDEMPOTENCY_MAX_KEYS", 10000)),
+            ttl_seconds=float(os.environ.get("DONGOL_IDEMPOTENCY_TTL", 86400))
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self, now: float):
+        entries = self._entries
+        while entries:
+            key, entry = next(iter(entries.items()))
+            if entry.expires_at > now and len(entries) <= self.max_entries:
+                return
+            if not entry.result.done():
+                # Never drop a creation that is still running; its waiters need it
+                return
+            del entries[key]
+
+    def forget(self, key: str, result: "asyncio.Future[str]"):
+        """Drop key, unless it has already been reused by a newer creation"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.result is result:
+            del self._entries[key]
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        create: Callable[[], Awaitable[str]],
+        now: Optional[float] = None
+    ) -> Tuple[str, bool]:
+        """Return (task_id, replayed), running create() only for a new key"""
+        now = now if now is not None else time.monotonic()
+        while True:
+            self._evict(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                raise IdempotencyConflict(
+                    f"Idempotency-Key {key} was already used with a different request"
+                )
+            self.hits += 1
+            try:
+                return await asyncio.shield(entry.result), True
+            except asyncio.CancelledError:
+                if not entry.result.cancelled():
+                    raise
+                # The request that was creating it went away; take over the key
+
+        self.misses += 1
+        future: "asyncio.Future[str]" = asyncio.get_running_loop().create_future()
+        self._entries[key] = _Entry(fingerprint, future, now + self.ttl_seconds)
+        try:
+            task_id = await create()
+        except BaseException as e:
+            # Failed creations are not remembered, so a retry can succeed
+            self.forget(key, future)
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # waiters re-raise it; don't warn if there are none
+            raise
+        future.set_result(task_id)
+        return task_id, False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "keys": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -4,19 +4,29 @@ DONGOL API Server
 REST API and WebSocket interface for remote access
 """
 import asyncio
+import hashlib
 import json
+import math
+import os
+import time
 from contextlib import asynccontextmanager
-from typing import Any, Dict, List, Optional
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+import orjson
 
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from core.engine import DongolEngine, Task, Chunk, TaskStatus, Priority
+from core.metrics import MetricsRegistry
+from api.admission import AdmissionController
+from api.idempotency import IdempotencyCache, IdempotencyConflict
 
 
 # Pydantic models for API
@@ -50,17 +60,136 @@ class SystemStats(BaseModel):
     status_distribution: Dict[str, int]
     avg_chunks_per_task: float
     engine_running: bool
+    chunks_in_flight: int = 0
+    pending_chunks: int = 0
+    chunks_completed: int = 0
+    chunks_failed: int = 0
+    tasks_completed: int = 0
+    tasks_completed_per_sec: float = 0.0
+    chunks_completed_per_sec: float = 0.0
+    admission: Optional[Dict[str, Any]] = None
+    idempotency: Optional[Dict[str, Any]] = None
+
+
+def _task_response(task: Task) -> TaskResponse:
+    return TaskResponse(
+        id=task.id,
+        name=task.name,
+        description=task.description,
+        status=task.status.name,
+        priority=task.priority.name,
+        created_at=task.created_at,
+        started_at=task.started_at,
+        completed_at=task.completed_at,
+        duration_ms=task.duration_ms,
+        chunk_count=len(task.chunks)
+    )
+
+
+MAX_RESULTS_PAGE = 10000
+
+
+def _dumps(payload: Any) -> bytes:
+    """Serialize straight to JSON bytes, bypassing pydantic"""
+    return orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS)
 
 
 # Global engine instance
 _engine: Optional[DongolEngine] = None
 
 
+def _engine_config() -> Dict[str, Any]:
+    """Engine settings taken from the environment"""
+    config: Dict[str, Any] = {}
+    budget = os.environ.get("DONGOL_MEMORY_BUDGET_MB")
+    if budget:
+        config["memory_budget_mb"] = float(budget)
+    spill_dir = os.environ.get("DONGOL_SPILL_DIR")
+    if spill_dir:
+        config["spill_dir"] = spill_dir
+    # Let dongol-worker processes connect and run chunks
+    remote_listen = os.environ.get("DONGOL_REMOTE_LISTEN")
+    if remote_listen:
+        config["remote"] = {
+            "listen": remote_listen,
+            "token": os.environ.get("DONGOL_WORKER_TOKEN")
+        }
+    # Feed chunks to dongol-worker processes through a shared queue
+    queue_url = os.environ.get("DONGOL_QUEUE_URL")
+    if queue_url:
+        handlers = os.environ.get("DONGOL_QUEUE_HANDLERS")
+        config["queue"] = {
+            "url": queue_url,
+            "handlers": [h.strip() for h in handlers.split(",") if h.strip()] if handlers else None,
+            "job_timeout": float(os.environ.get("DONGOL_QUEUE_JOB_TIMEOUT", 300))
+        }
+    # Several server processes (uvicorn --workers N) share tasks through this store
+    shared_store = os.environ.get("DONGOL_SHARED_STORE")
+    if shared_store:
+        config["shared"] = {
+            "path": shared_store,
+            "worker_id": os.environ.get("DONGOL_WORKER_ID"),
+            "max_claimed_jobs": int(os.environ.get("DONGOL_MAX_CLAIMED_JOBS", 4))
+        }
+    # Let the worker pool grow and shrink with load
+    max_workers = os.environ.get("DONGOL_AUTOSCALE_MAX_WORKERS")
+    if max_workers:
+        config["autoscale"] = {
+            "min_workers": int(os.environ.get("DONGOL_AUTOSCALE_MIN_WORKERS", 1)),
+            "max_workers": int(max_workers)
+        }
+    # Modules whose HANDLERS are registered by name up front
+    preload_modules = os.environ.get("DONGOL_PRELOAD")
+    if preload_modules:
+        config["pool"] = {
+            "preload": [m.strip() for m in preload_modules.split(",") if m.strip()]
+        }
+    return config
+
+
+admission = AdmissionController.from_env()
+idempotency = IdempotencyCache.from_env()
+
+# API-level metrics; counters live on the controllers and are read at scrape time
+api_metrics = MetricsRegistry()
+api_metrics.callback_counter(
+    "dongol_idempotency_requests_total", "Idempotency-Key lookups by outcome",
+    lambda: [({"result": "hit"}, idempotency.hits), ({"result": "miss"}, idempotency.misses)]
+)
+api_metrics.callback_counter(
+    "dongol_admission_rejected_total", "Requests refused by admission control",
+    lambda: [({"reason": reason}, count) for reason, count in admission.rejected.items()]
+)
+api_metrics.callback_counter(
+    "dongol_admission_admitted_total", "Requests let through by admission control",
+    lambda: [({}, admission.admitted)]
+)
+
+
+def _client_id(request: Request) -> str:
+    """Identify the caller for rate limiting"""
+    client_id = request.headers.get("X-Client-Id")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "unknown"
+
+
+def _admit(engine: DongolEngine, request: Request, priority: Priority):
+    """Refuse the request with 429 if admission control says no"""
+    rejection = admission.check(engine, _client_id(request), priority)
+    if rejection is not None:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Request refused: {rejection.reason}",
+            headers={"Retry-After": str(max(1, math.ceil(rejection.retry_after)))}
+        )
+
+
 async def get_engine() -> DongolEngine:
     """Get or create global engine"""
     global _engine
     if _engine is None:
-        _engine = DongolEngine()
+        _engine = DongolEngine(_engine_config())
         await _engine.start()
     return _engine
 
@@ -74,13 +203,17 @@ async def lifespan(app: FastAPI):
         return {
             "chunk_id": chunk.id,
             "processed": True,
-            "timestamp": asyncio.get_event_loop().time()
+            "timestamp": time.time()
         }
     engine.register_handler("default", default_handler)
+    engine.subscribe(manager.publish)
+    manager.start()
     
     yield
     
+    await manager.stop()
     if _engine:
+        _engine.unsubscribe(manager.publish)
         await _engine.stop()
 
 
@@ -115,12 +248,31 @@ async def get_stats():
     """Get system statistics"""
     engine = await get_engine()
     stats = engine.get_stats()
-    return SystemStats(**stats)
+    return SystemStats(
+        **stats,
+        admission=admission.get_stats(),
+        idempotency=idempotency.get_stats()
+    )
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text-format metrics"""
+    engine = await get_engine()
+    return Response(
+        content=engine.metrics.render() + api_metrics.render(),
+        media_type=MetricsRegistry.CONTENT_TYPE
+    )
 
 
 @app.post("/tasks", response_model=TaskResponse)
-async def create_task(request: TaskCreateRequest):
-    """Create a new task"""
+async def create_task(request: TaskCreateRequest, http_request: Request, response: Response):
+    """
+    Create a new task
+    
+    Send an Idempotency-Key header to make retries safe: repeats of the
+    same request return the task created by the first one.
+    """
     engine = await get_engine()
     
     try:
@@ -128,52 +280,139 @@ async def create_task(request: TaskCreateRequest):
     except KeyError:
         raise HTTPException(status_code=400, detail=f"Invalid priority: {request.priority}")
     
-    task = await engine.create_task(
-        name=request.name,
-        content=request.content,
-        description=request.description,
-        auto_chunk=request.auto_chunk,
-        chunk_size=request.chunk_size,
-        priority=priority,
-        parallel=request.parallel,
-        max_workers=request.max_workers
-    )
+    async def create() -> str:
+        _admit(engine, http_request, priority)
+        task = await engine.create_task(
+            name=request.name,
+            content=request.content,
+            description=request.description,
+            auto_chunk=request.auto_chunk,
+            chunk_size=request.chunk_size,
+            priority=priority,
+            parallel=request.parallel,
+            max_workers=request.max_workers
+        )
+        return task.id
     
-    return TaskResponse(
-        id=task.id,
-        name=task.name,
-        description=task.description,
-        status=task.status.name,
-        priority=task.priority.name,
-        created_at=task.created_at,
-        started_at=task.started_at,
-        completed_at=task.completed_at,
-        duration_ms=task.duration_ms,
-        chunk_count=len(task.chunks)
+    key = http_request.headers.get("Idempotency-Key")
+    if not key:
+        return _task_response(engine.tasks[await create()])
+    
+    fingerprint = hashlib.sha256(
+        orjson.dumps(request.model_dump(), option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+    try:
+        task_id, replayed = await idempotency.run(
+            f"{_client_id(http_request)}:{key}", fingerprint, create
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    task = engine.tasks.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} for this Idempotency-Key no longer exists")
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return _task_response(task)
+
+
+@app.post("/tasks/upload", status_code=202)
+async def upload_task(
+    request: Request,
+    name: str,
+    description: str = "",
+    chunk_size: int = 500,
+    priority: str = "NORMAL",
+    handler: str = "default"
+):
+    """
+    Create a task from a raw request body, chunking it as it streams in
+    
+    Send the content as the body (text/plain or application/octet-stream).
+    Chunks are executed while the upload is still in progress; poll the
+    status URL or stream results as usual.
+    """
+    engine = await get_engine()
+    
+    try:
+        priority_value = Priority[priority.upper()]
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Invalid priority: {priority}")
+    _admit(engine, request, priority_value)
+    
+    task = await engine.ingest_stream(
+        name=name,
+        stream=request.stream(),
+        handler_name=handler,
+        description=description,
+        chunk_size=chunk_size,
+        priority=priority_value
     )
+    
+    return {
+        **_task_response(task).model_dump(),
+        "status_url": f"/tasks/{task.id}/status",
+        "results_url": f"/tasks/{task.id}/results",
+        "stream_url": f"/tasks/{task.id}/stream"
+    }
 
 
 @app.get("/tasks", response_model=List[TaskResponse])
-async def list_tasks(status: Optional[str] = None, limit: int = 100, offset: int = 0):
-    """List all tasks"""
+async def list_tasks(
+    response: Response,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    order: str = "asc"
+):
+    """List tasks in creation order; follow X-Next-Cursor for the next page"""
     engine = await get_engine()
-    tasks = list(engine.tasks.values())
     
-    if status:
-        tasks = [t for t in tasks if t.status.name.lower() == status.lower()]
-    
-    tasks = tasks[offset:offset + limit]
+    try:
+        status_filter = TaskStatus[status.upper()] if status else None
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
+    try:
+        priority_filter = Priority[priority.upper()] if priority else None
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Invalid priority: {priority}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail=f"Invalid order: {order}")
     
-    return [
-        TaskResponse(
-            id=t.id, name=t.name, description=t.description,
-            status=t.status.name, priority=t.priority.name,
-            created_at=t.created_at, started_at=t.started_at,
-            completed_at=t.completed_at, duration_ms=t.duration_ms,
-            chunk_count=len(t.chunks)
+    try:
+        tasks, next_cursor = engine.list_tasks(
+            status=status_filter,
+            priority=priority_filter,
+            limit=max(0, min(limit, 1000)),
+            cursor=cursor,
+            newest_first=(order == "desc"),
+            offset=max(0, offset)
         )
-        for t in tasks
-    ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [_task_response(t) for t in tasks]
+
+
+@app.get("/search", response_model=List[TaskResponse])
+async def search_tasks(q: str, scope: str = "all", limit: int = 100):
+    """Search task names, descriptions and results (supports * and ? wildcards)"""
+    engine = await get_engine()
+    
+    if scope not in ("all", "tasks", "results"):
+        raise HTTPException(status_code=400, detail=f"Invalid scope: {scope}")
+    
+    tasks = engine.search(
+        q,
+        in_tasks=scope in ("all", "tasks"),
+        in_results=scope in ("all", "results"),
+        limit=max(0, min(limit, 1000))
+    )
+    return [_task_response(t) for t in tasks]
 
 
 @app.get("/tasks/{task_id}", response_model=TaskResponse)
@@ -181,35 +420,154 @@ async def get_task(task_id: str):
     """Get task details"""
     engine = await get_engine()
     
-    if task_id not in engine.tasks:
+    if await engine.get_task(task_id) is None:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
     
-    task = engine.tasks[task_id]
-    return TaskResponse(
-        id=task.id, name=t.name, description=t.description,
-        status=t.status.name, priority=t.priority.name,
-        created_at=t.created_at, started_at=t.started_at,
-        completed_at=t.completed_at, duration_ms=t.duration_ms,
-        chunk_count=len(t.chunks)
-    )
+    return _task_response(engine.tasks[task_id])
 
 
-@app.post("/tasks/{task_id}/execute")
-async def execute_task(task_id: str, handler: str = "default"):
-    """Execute a task"""
+@app.post("/tasks/{task_id}/execute", status_code=202)
+async def execute_task(request: Request, task_id: str, handler: str = "default", wait: bool = False):
+    """Start executing a task in the background (wait=true blocks until done)"""
     engine = await get_engine()
     
-    if task_id not in engine.tasks:
+    if await engine.get_task(task_id) is None:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    _admit(engine, request, engine.tasks[task_id].priority)
     
-    task = await engine.execute_task(task_id, handler)
+    try:
+        job = engine.submit_task(task_id, handler)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if wait:
+        try:
+            await asyncio.shield(job)
+        except RuntimeError as e:
+            # A shared-store job reports a duplicate run through its future
+            raise HTTPException(status_code=409, detail=str(e))
+        task = engine.tasks[task_id]
+        payload = {
+            "task_id": task.id,
+            "status": task.status.name,
+            "duration_ms": task.duration_ms,
+            "results": task.results
+        }
+        return Response(content=_dumps(payload), media_type="application/json")
+    
+    return {
+        "task_id": task_id,
+        "status": engine.tasks[task_id].status.name,
+        "status_url": f"/tasks/{task_id}/status",
+        "results_url": f"/tasks/{task_id}/results"
+    }
+
+
+@app.get("/tasks/{task_id}/status")
+async def get_task_status(task_id: str):
+    """Lightweight execution status for polling"""
+    engine = await get_engine()
+    
+    task = await engine.get_task(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
     
     return {
         "task_id": task.id,
         "status": task.status.name,
+        "completed_chunks": task.completed_chunks,
+        "total_chunks": len(task.chunks),
         "duration_ms": task.duration_ms,
-        "results": task.results
+        "error": task.metadata.get("error")
+    }
+
+
+def _project(result: Any, fields: Optional[List[str]]) -> Any:
+    if fields is None or not isinstance(result, dict):
+        return result
+    return {key: result[key] for key in fields if key in result}
+
+
+@app.get("/tasks/{task_id}/results")
+async def get_task_results(
+    task_id: str,
+    start: int = 0,
+    end: Optional[int] = None,
+    limit: int = 1000,
+    fields: Optional[str] = None
+):
+    """
+    Fetch a page of results in chunk order
+    
+    start/end select a range of chunk positions, limit caps the page size
+    and fields projects result dicts onto a comma-separated key list.
+    Follow next_start for the next page.
+    """
+    engine = await get_engine()
+    
+    task = await engine.get_task(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    
+    total = len(task.chunks)
+    start = max(0, start)
+    stop = total if end is None else max(start, min(end, total))
+    stop = min(stop, start + max(1, min(limit, MAX_RESULTS_PAGE)))
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    
+    results = task.results
+    page = {}
+    for chunk in task.chunks[start:stop]:
+        if chunk.id in results:
+            page[chunk.id] = _project(results[chunk.id], field_list)
+    
+    end_of_range = total if end is None else min(end, total)
+    payload = {
+        "task_id": task.id,
+        "status": task.status.name,
+        "total_chunks": total,
+        "start": start,
+        "next_start": stop if stop < end_of_range else None,
+        "results": page
     }
+    return Response(content=_dumps(payload), media_type="application/json")
+
+
+@app.get("/tasks/{task_id}/stream")
+async def stream_task_results(task_id: str, format: str = "ndjson", fields: Optional[str] = None):
+    """
+    Stream chunk results as they complete
+    
+    format=ndjson emits one JSON object per line, format=sse emits
+    Server-Sent Events. Results are pulled from the engine one at a time
+    as the client reads, so a slow reader is never buffered for.
+    """
+    engine = await get_engine()
+    
+    if await engine.get_task(task_id) is None:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail=f"Invalid format: {format}")
+    
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    sse = format == "sse"
+    
+    async def events():
+        async for chunk_id, result in engine.stream_results(task_id):
+            data = _dumps({"chunk_id": chunk_id, "result": _project(result, field_list)})
+            yield (b"event: chunk\ndata: " + data + b"\n\n") if sse else (data + b"\n")
+        
+        task = engine.tasks.get(task_id)
+        done = _dumps({
+            "done": True,
+            "status": task.status.name if task else "DELETED",
+            "error": task.metadata.get("error") if task else None
+        })
+        yield (b"event: done\ndata: " + done + b"\n\n") if sse else (done + b"\n")
+    
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache"})
 
 
 @app.delete("/tasks/{task_id}")
@@ -217,36 +575,271 @@ async def delete_task(task_id: str):
     """Delete a task"""
     engine = await get_engine()
     
-    if task_id not in engine.tasks:
+    if await engine.get_task(task_id) is None:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
     
-    del engine.tasks[task_id]
+    engine.remove_task(task_id)
     return {"message": f"Task {task_id} deleted"}
 
 
-class ConnectionManager:
+# Chunk events that a newer one for the same task supersedes
+_PROGRESS_EVENTS = frozenset({"chunk_started", "chunk_completed", "chunk_failed"})
+
+
+class Subscription:
+    """Which task events a WebSocket client wants"""
+    
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.task_ids: Set[str] = set()
+        self.all_tasks = False
+
+
+class ClientConnection:
+    """
+    One WebSocket client with a bounded send queue and its own writer task
+    
+    Frames are pre-serialized text shared between clients. When the queue
+    is full the overflow policy decides what happens: drop_oldest evicts
+    the oldest frame, coalesce drops the newest queued frame with the same
+    key (a task's progress, a stats reply) and queues the new one in its
+    place at the back, falling back to drop_oldest, and disconnect closes
+    the client.
+    """
+    
+    def __init__(self, websocket: WebSocket, max_queue: int, overflow: str):
+        self.websocket = websocket
+        self.subscription = Subscription()
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.dropped = 0
+        self.closed = False
+        self._queue: Deque[Tuple[Optional[str], str]] = deque()
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._on_close: Optional[Callable[['ClientConnection'], None]] = None
+    
+    def start(self, on_close: Callable[['ClientConnection'], None]):
+        self._on_close = on_close
+        self._writer = asyncio.create_task(self._write_loop())
+    
+    def enqueue(self, frame: str, key: Optional[str] = None) -> bool:
+        """Queue a frame without blocking; False if the client must be dropped"""
+        if self.closed:
+            return False
+        if len(self._queue) >= self.max_queue:
+            if self.overflow == "disconnect":
+                self.close()
+                asyncio.ensure_future(self._close_socket())
+                return False
+            self.dropped += 1
+            replaced = False
+            if self.overflow == "coalesce" and key is not None:
+                # The newest match, so frames for a key stay in order
+                for i in range(len(self._queue) - 1, -1, -1):
+                    if self._queue[i][0] == key:
+                        del self._queue[i]
+                        replaced = True
+                        break
+            if not replaced:
+                self._queue.popleft()
+        self._queue.append((key, frame))
+        self._ready.set()
+        return True
+    
+    async def _write_loop(self):
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                _, frame = self._queue.popleft()
+                await self.websocket.send_text(frame)
+        except Exception:
+            pass
+        finally:
+            self.close()
+    
+    async def _close_socket(self):
+        try:
+            # 1013: try again later
+            await self.websocket.close(code=1013)
+        except Exception:
+            pass
+    
+    def close(self):
+        self.closed = True
+        self._ready.set()
+        self._queue.clear()
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close(self)
+
+
+class ConnectionManager:
+    """
+    Tracks WebSocket clients and pushes engine events to subscribers
+    
+    Events are collected between flushes and delivered as one batched
+    frame per client every batch_interval seconds. Each event is
+    serialized once and the bytes are shared by every client's frame;
+    delivery goes through per-client queues so a stalled client never
+    holds up the others. Subscribers are indexed by task id, so an event
+    costs nothing when no one is subscribed to its task.
+    """
     
-    async def connect(self, websocket: WebSocket):
+    def __init__(self, batch_interval: float = 0.1, max_queue: int = 256,
+                 overflow: str = "drop_oldest"):
+        if overflow not in ("drop_oldest", "coalesce", "disconnect"):
+            raise ValueError(f"Invalid overflow policy: {overflow}")
+        self.connections: Dict[WebSocket, ClientConnection] = {}
+        self.batch_interval = batch_interval
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self._subscribers: Dict[str, Set[ClientConnection]] = {}
+        self._all: Set[ClientConnection] = set()
+        self._pending: List[Dict[str, Any]] = []
+        self._flusher: Optional[asyncio.Task] = None
+    
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.connections)
+    
+    @property
+    def subscriptions(self) -> Dict[WebSocket, Subscription]:
+        return {ws: conn.subscription for ws, conn in self.connections.items()}
+    
+    async def connect(self, websocket: WebSocket) -> ClientConnection:
         await websocket.accept()
-        self.active_connections.append(websocket)
+        connection = ClientConnection(websocket, self.max_queue, self.overflow)
+        self.connections[websocket] = connection
+        connection.start(self._closed)
+        return connection
     
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        connection = self.connections.pop(websocket, None)
+        if connection is not None:
+            connection.close()
+    
+    def _closed(self, connection: ClientConnection):
+        self.unsubscribe(connection, set(connection.subscription.task_ids), all_tasks=True)
+        if self.connections.get(connection.websocket) is connection:
+            del self.connections[connection.websocket]
+    
+    def subscribe(self, connection: ClientConnection, task_ids: Set[str], all_tasks: bool = False):
+        subscription = connection.subscription
+        for task_id in task_ids - subscription.task_ids:
+            self._subscribers.setdefault(task_id, set()).add(connection)
+        subscription.task_ids |= task_ids
+        if all_tasks:
+            subscription.all_tasks = True
+            self._all.add(connection)
+    
+    def unsubscribe(self, connection: ClientConnection, task_ids: Set[str], all_tasks: bool = False):
+        subscription = connection.subscription
+        for task_id in task_ids & subscription.task_ids:
+            subscribers = self._subscribers[task_id]
+            subscribers.discard(connection)
+            if not subscribers:
+                del self._subscribers[task_id]
+        subscription.task_ids -= task_ids
+        if all_tasks:
+            subscription.all_tasks = False
+            self._all.discard(connection)
+    
+    def send(self, websocket: WebSocket, message: Dict[str, Any], key: Optional[str] = None):
+        """Queue a direct reply to one client"""
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            connection.enqueue(_dumps(message).decode(), key)
+    
+    async def broadcast(self, message: dict, key: Optional[str] = None):
+        """Serialize once and queue for every client; never blocks on a slow one"""
+        frame = _dumps(message).decode()
+        for connection in list(self.connections.values()):
+            connection.enqueue(frame, key)
+    
+    def publish(self, event: Dict[str, Any]):
+        """Engine subscriber: queue an event for the next batched frame"""
+        if self._all or event.get("task_id") in self._subscribers:
+            self._pending.append(event)
     
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_json(message)
+    def start(self):
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        for websocket in list(self.connections):
+            self.disconnect(websocket)
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.batch_interval)
+            await self.flush()
+    
+    async def flush(self):
+        """Queue pending events to each interested client as one frame"""
+        if not self._pending:
+            return
+        events, self._pending = self._pending, []
+        encoded = [_dumps(event) for event in events]
+        
+        # Clients subscribed to everything share the same frames
+        if self._all:
+            everything = self._frames(events, encoded)
+            for connection in list(self._all):
+                for key, frame in everything:
+                    connection.enqueue(frame, key)
+        parts: Dict[ClientConnection, List[int]] = {}
+        for i, event in enumerate(events):
+            for connection in self._subscribers.get(event.get("task_id"), ()):
+                if connection not in self._all:
+                    parts.setdefault(connection, []).append(i)
+        for connection, picked in parts.items():
+            for key, frame in self._frames([events[i] for i in picked], [encoded[i] for i in picked]):
+                connection.enqueue(frame, key)
+    
+    def _frames(self, events: List[Dict[str, Any]], encoded: List[bytes]) -> List[Tuple[Optional[str], str]]:
+        """Batch events into frames; under coalesce, each task's progress gets its own keyed frame"""
+        if self.overflow != "coalesce":
+            return [(None, _events_frame(encoded))]
+        progress: Dict[str, List[bytes]] = {}
+        other: List[bytes] = []
+        for event, data in zip(events, encoded):
+            if event.get("type") in _PROGRESS_EVENTS and event.get("task_id") is not None:
+                progress.setdefault(event["task_id"], []).append(data)
+            else:
+                other.append(data)
+        frames: List[Tuple[Optional[str], str]] = [
+            (f"progress:{task_id}", _events_frame(parts)) for task_id, parts in progress.items()
+        ]
+        if other:
+            # Task outcomes are not keyed, so newer progress never replaces them
+            frames.append((None, _events_frame(other)))
+        return frames
+
 
+def _events_frame(encoded: List[bytes]) -> str:
+    """Assemble a batched frame from already-serialized events"""
+    return (b'{"type":"events","events":[' + b",".join(encoded) + b"]}").decode()
 
-manager = ConnectionManager()
+
+manager = ConnectionManager(
+    batch_interval=float(os.environ.get("DONGOL_WS_BATCH_MS", "100")) / 1000,
+    max_queue=int(os.environ.get("DONGOL_WS_MAX_QUEUE", "256")),
+    overflow=os.environ.get("DONGOL_WS_OVERFLOW", "drop_oldest")
+)
 
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket for real-time task updates"""
-    await manager.connect(websocket)
+    connection = await manager.connect(websocket)
     
     try:
         while True:
@@ -255,14 +848,28 @@ async def websocket_endpoint(websocket: WebSocket):
             command = message.get("command")
             
             if command == "ping":
-                await websocket.send_json({"type": "pong"})
+                manager.send(websocket, {"type": "pong"})
             elif command == "get_stats":
                 engine = await get_engine()
                 stats = engine.get_stats()
-                await websocket.send_json({"type": "stats", "data": stats})
+                manager.send(websocket, {"type": "stats", "data": stats}, key="stats")
+            elif command in ("subscribe", "unsubscribe"):
+                subscription = connection.subscription
+                task_ids = set(message.get("task_ids") or [])
+                if command == "subscribe":
+                    manager.subscribe(connection, task_ids, bool(message.get("all")))
+                else:
+                    manager.unsubscribe(connection, task_ids, bool(message.get("all")))
+                manager.send(websocket, {
+                    "type": "subscriptions",
+                    "task_ids": sorted(subscription.task_ids),
+                    "all": subscription.all_tasks
+                })
             else:
-                await websocket.send_json({"type": "error", "message": f"Unknown command: {command}"})
+                manager.send(websocket, {"type": "error", "message": f"Unknown command: {command}"})
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
 
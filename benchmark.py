@@ -9,6 +9,8 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
 
+from core.affinity import cpu_topology
+from core.broadcast import get_broadcast
 from core.engine import DongolEngine, Chunk
 
 
@@ -155,6 +157,100 @@ async def benchmark_structured_data():
     await engine.stop()
 
 
+def skewed_work(chunk: Chunk):
+    """CPU-bound handler where one chunk in eight is 20x heavier"""
+    rounds = 200_000 if hash(chunk.id) % 8 == 0 else 10_000
+    total = 0
+    for i in range(rounds):
+        total += i * i
+    return total
+
+
+async def benchmark_work_stealing():
+    """Compare the central process pool with the work-stealing pool on skewed chunks"""
+    print("\n" + "="*60)
+    print("Benchmark: Work Stealing (skewed CPU chunks)")
+    print("="*60)
+    
+    # Structured content gives independent chunks, like a batch of files
+    content = {f"file_{i}": f"payload {i}" for i in range(400)}
+    for scheduler in ("central", "stealing"):
+        engine = DongolEngine({'max_workers': 4, 'use_processes': True, 'scheduler': scheduler})
+        await engine.start()
+        engine.register_handler("skewed", skewed_work)
+        task = await engine.create_task("Skewed", content)
+        
+        start = time.perf_counter()
+        await engine.execute_task(task.id, "skewed")
+        elapsed = time.perf_counter() - start
+        
+        print(f"{scheduler:>8}: {len(task.chunks)} chunks in {elapsed*1000:.2f}ms "
+              f"({len(task.chunks)/elapsed:.0f} chunks/sec)")
+        await engine.stop()
+
+
+def short_work(chunk: Chunk):
+    """CPU-bound handler short enough that IPC dominates"""
+    return sum(i * i for i in range(200))
+
+
+async def benchmark_batched_submission():
+    """Compare per-chunk process-pool submission with batched submission"""
+    print("\n" + "="*60)
+    print("Benchmark: Batched Submission (short CPU chunks)")
+    print("="*60)
+    
+    content = {f"item_{i}": f"payload {i}" for i in range(4000)}
+    for label, batch in (("per-chunk", {}), ("batched", {'enabled': True})):
+        engine = DongolEngine({'max_workers': 4, 'use_processes': True, 'batch': batch})
+        await engine.start()
+        engine.register_handler("short", short_work)
+        task = await engine.create_task("Short", content)
+        
+        start = time.perf_counter()
+        await engine.execute_task(task.id, "short")
+        elapsed = time.perf_counter() - start
+        
+        batches = engine.get_stats().get('batching', {}).get('batches', len(task.chunks))
+        print(f"{label:>9}: {len(task.chunks)} chunks in {batches} calls, {elapsed*1000:.2f}ms "
+              f"({len(task.chunks)/elapsed:.0f} chunks/sec)")
+        await engine.stop()
+
+
+def scan_table(chunk: Chunk):
+    """Memory-bound handler: stream through a slice of a broadcast table"""
+    table = get_broadcast("table")
+    start = hash(chunk.id) % 8 * (len(table) // 8)
+    return table.count(b"\x01", start, start + len(table) // 2)
+
+
+async def benchmark_affinity():
+    """Compare floating workers with socket-pinned, co-located workers on memory-bound chunks"""
+    print("\n" + "="*60)
+    print("Benchmark: CPU Affinity (memory-bound chunks)")
+    print("="*60)
+    
+    topology = cpu_topology()
+    print(f"Sockets: {', '.join(f'{node}: {len(cpus)} CPUs' for node, cpus in topology.items())}")
+    content = {f"block_{i}": i for i in range(200)}
+    for label, affinity in (("floating", {}), ("pinned", {'enabled': True})):
+        engine = DongolEngine({
+            'max_workers': 4, 'use_processes': True, 'scheduler': 'stealing', 'affinity': affinity
+        })
+        await engine.start()
+        engine.broadcast("table", bytes(range(256)) * (256 * 1024))
+        engine.register_handler("scan", scan_table)
+        task = await engine.create_task("Scan", content)
+        
+        start = time.perf_counter()
+        await engine.execute_task(task.id, "scan")
+        elapsed = time.perf_counter() - start
+        
+        print(f"{label:>8}: {len(task.chunks)} chunks in {elapsed*1000:.2f}ms "
+              f"({len(task.chunks)/elapsed:.0f} chunks/sec)")
+        await engine.stop()
+
+
 async def main():
     print("="*60)
     print("DONGOL Performance Benchmark")
@@ -164,6 +260,9 @@ async def main():
     await benchmark_chunking()
     await benchmark_parallel_execution()
     await benchmark_structured_data()
+    await benchmark_work_stealing()
+    await benchmark_batched_submission()
+    await benchmark_affinity()
     
     print("\n" + "="*60)
     print("Benchmark Complete!")
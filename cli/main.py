@@ -346,29 +346,20 @@ async def search(pattern: str, in_tasks: bool, in_results: bool, json_out: bool)
     """
     🔍 Search through tasks and results
     
-    PATTERN: Search pattern (supports wildcards)
+    PATTERN: Words to match; each word matches terms it starts
+    ("optim" finds "optimization"), and * ? [ ] wildcards are supported
     
     Example:
       dongol search "error*"
-      dongol search "optimization" --in-results
+      dongol search "optim" --in-results
     """
     engine = await get_engine()
-    results = []
-    
-    for task in engine.tasks.values():
-        match = False
-        if in_tasks or not in_results:
-            if pattern.lower() in task.name.lower():
-                match = True
-        
-        if in_results or not in_tasks:
-            for res in task.results.values():
-                if pattern.lower() in str(res).lower():
-                    match = True
-                    break
-        
-        if match:
-            results.append(task)
+    results = engine.search(
+        pattern,
+        in_tasks=in_tasks or not in_results,
+        in_results=in_results or not in_tasks,
+        prefix=True
+    )
     
     if json_out:
         console.print_json(data=[{
@@ -420,7 +411,7 @@ async def cancel(task_id: str, force: bool):
         console.print(f"[yellow]Task is running. Use --force to cancel.[/yellow]")
         return
     
-    task.status = TaskStatus.CANCELLED
+    engine.cancel_task(task_id)
     console.print(f"[green]Task {task_id} cancelled[/green]")
 
 
@@ -14,6 +14,7 @@ from .engine import (
     Priority,
     get_engine,
 )
+from .broadcast import get_broadcast
 
 __all__ = [
     "DongolEngine",
@@ -24,4 +25,5 @@ __all__ = [
     "TaskStatus",
     "Priority",
     "get_engine",
+    "get_broadcast",
 ]
@@ -0,0 +1,115 @@
+"""
+DONGOL Affinity - Pin pool workers to CPU sockets (Linux)
+"""
+import glob
+import os
+import re
+from typing import Any, Dict, List, Optional, Set
+
+# Sockets (NUMA nodes) and the CPUs on each
+Topology = Dict[int, List[int]]
+
+
+def parse_cpulist(text: str) -> List[int]:
+    """Parse a kernel cpulist such as '0-3,8-11'"""
+    cpus: List[int] = []
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        low, _, high = part.partition('-')
+        cpus.extend(range(int(low), int(high or low) + 1))
+    return cpus
+
+
+def _allowed() -> Set[int]:
+    if hasattr(os, 'sched_getaffinity'):
+        return set(os.sched_getaffinity(0))
+    return set(range(os.cpu_count() or 1))
+
+
+def cpu_topology(root: str = '/sys/devices/system') -> Topology:
+    """
+    Group the CPUs this process may run on by NUMA node
+
+    Falls back to physical package ids when the kernel exposes no nodes,
+    and to a single socket holding every CPU off Linux.
+    """
+    allowed = _allowed()
+    topology: Topology = {}
+    for path in glob.glob(os.path.join(root, 'node', 'node[0-9]*', 'cpulist')):
+        node = int(re.search(r'node(\d+)', os.path.dirname(path)).group(1))
+        with open(path) as f:
+            cpus = [cpu for cpu in parse_cpulist(f.read()) if cpu in allowed]
+        if cpus:
+            topology[node] = cpus
+    if not topology:
+        for cpu in sorted(allowed):
+            try:
+                with open(os.path.join(root, 'cpu', f'cpu{cpu}', 'topology', 'physical_package_id')) as f:
+                    package = int(f.read())
+            except (OSError, ValueError):
+                package = 0
+            topology.setdefault(package, []).append(cpu)
+    return dict(sorted(topology.items()))
+
+
+class AffinityPlan:
+    """
+    Which CPUs and socket each pool worker gets
+
+    With a socket chosen, every worker is kept on that socket; otherwise
+    workers are split into contiguous blocks, one block per socket, so
+    each stays on one socket and neighbours share caches and memory.
+    per_core narrows each worker to a single CPU of its socket.
+    """
+
+    def __init__(self, workers: int, socket: Optional[int] = None, per_core: bool = False,
+                 topology: Optional[Topology] = None):
+        topology = topology if topology is not None else cpu_topology()
+        if socket is not None:
+            if socket not in topology:
+                raise ValueError(f"No socket {socket}; this machine has {sorted(topology)}")
+            sockets = [socket] * workers
+        else:
+            names = list(topology)
+            sockets = [names[i * len(names) // workers] for i in range(workers)]
+        self.sockets = sockets
+        self.cpus: List[Set[int]] = []
+        used: Dict[int, int] = {}
+        for node in sockets:
+            if per_core:
+                cpus = topology[node]
+                self.cpus.append({cpus[used.get(node, 0) % len(cpus)]})
+                used[node] = used.get(node, 0) + 1
+            else:
+                self.cpus.append(set(topology[node]))
+
+    def __len__(self) -> int:
+        return len(self.cpus)
+
+    def for_worker(self, index: int) -> Set[int]:
+        return self.cpus[index % len(self.cpus)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'sockets': sorted(set(self.sockets)),
+            'workers': [
+                {'socket': node, 'cpus': sorted(cpus)} for node, cpus in zip(self.sockets, self.cpus)
+            ],
+        }
+
+
+def pin(cpus: Set[int]) -> bool:
+    """Pin the calling process to these CPUs; False where the OS has no affinity call"""
+    if not cpus or not hasattr(os, 'sched_setaffinity'):
+        return False
+    os.sched_setaffinity(0, cpus)
+    return True
+
+
+def pin_next(counter: Any, plan: AffinityPlan):
+    """ProcessPoolExecutor initializer: pin each new worker to the plan's next slot"""
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    pin(plan.for_worker(index))
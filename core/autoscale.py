@@ -0,0 +1,158 @@
+"""
+DONGOL Autoscale - Grow and shrink the executor pool at runtime
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+if TYPE_CHECKING:
+    from .engine import DongolEngine
+
+
+@dataclass
+class AutoscalePolicy:
+    """Bounds and thresholds for resizing the executor pool"""
+    min_workers: int = 1
+    max_workers: Optional[int] = None
+    interval_seconds: float = 1.0
+    target_wait_ms: float = 50.0
+    max_cpu_load: Optional[float] = 1.0
+    scale_up_after: int = 1
+    scale_down_after_seconds: float = 60.0
+    idle_utilization: float = 0.5
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> 'AutoscalePolicy':
+        config = config or {}
+        return cls(
+            min_workers=config.get('min_workers', 1),
+            max_workers=config.get('max_workers'),
+            interval_seconds=config.get('interval_seconds', 1.0),
+            target_wait_ms=config.get('target_wait_ms', 50.0),
+            max_cpu_load=config.get('max_cpu_load', 1.0),
+            scale_up_after=config.get('scale_up_after', 1),
+            scale_down_after_seconds=config.get('scale_down_after_seconds', 60.0),
+            idle_utilization=config.get('idle_utilization', 0.5),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers is not None
+
+    def clamp(self, workers: int) -> int:
+        return max(self.min_workers, min(self.max_workers or workers, workers))
+
+
+def cpu_load() -> Optional[float]:
+    """One-minute load average per CPU, or None where the OS has none"""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+class Autoscaler:
+    """
+    Resizes the engine's executor from backlog, chunk latency and CPU load
+
+    Every interval it compares the chunks in flight with the pool size.
+    A backlog whose chunks waited longer than target_wait_ms for a worker
+    (or that nothing has finished from yet) grows the pool at once, by
+    the backlog but at most doubling, unless the machine's load per CPU
+    is already above max_cpu_load and more workers would only contend.
+    Shrinking is deliberately slower: the pool must stay below
+    idle_utilization for scale_down_after_seconds, and then gives back
+    half its idle workers per step, so a lull between bursts does not
+    throw away capacity the next burst needs.
+    """
+
+    def __init__(self, engine: 'DongolEngine', policy: AutoscalePolicy):
+        self.engine = engine
+        self.policy = policy
+        self.cpu_load: Callable[[], Optional[float]] = cpu_load
+        self.scale_ups = 0
+        self.scale_downs = 0
+        self._wait_total = 0.0
+        self._wait_count = 0
+        self._hot = 0
+        self._idle_since: Optional[float] = None
+        self.last_wait = 0.0
+        self.last_backlog = 0
+
+    def observe(self, queue_wait: float):
+        """Record how long a finished chunk waited for a worker"""
+        self._wait_total += queue_wait
+        self._wait_count += 1
+
+    def sample(self, now: Optional[float] = None) -> Optional[int]:
+        """Take one reading; the new pool size, or None to keep the current one"""
+        now = now if now is not None else time.monotonic()
+        policy = self.policy
+        current = self.engine.executor.max_workers
+        in_flight = self.engine.stats.chunks_in_flight
+        backlog = max(0, in_flight - current)
+        waited = self._wait_total / self._wait_count if self._wait_count else None
+        self._wait_total, self._wait_count = 0.0, 0
+        self.last_backlog = backlog
+        self.last_wait = waited or 0.0
+
+        if policy.clamp(current) != current:
+            return policy.clamp(current)
+
+        if backlog and (waited is None or waited * 1000 >= policy.target_wait_ms):
+            self._idle_since = None
+            load = self.cpu_load() if policy.max_cpu_load is not None else None
+            if load is not None and load > policy.max_cpu_load:
+                return None
+            self._hot += 1
+            if self._hot < policy.scale_up_after or current >= policy.max_workers:
+                return None
+            self._hot = 0
+            return policy.clamp(max(current + 1, min(current * 2, current + backlog)))
+
+        self._hot = 0
+        if in_flight < current * policy.idle_utilization and current > policy.min_workers:
+            if self._idle_since is None:
+                self._idle_since = now
+            elif now - self._idle_since >= policy.scale_down_after_seconds:
+                # Restart the clock so the next step needs another quiet period
+                self._idle_since = now
+                idle = current - in_flight
+                return policy.clamp(current - max(1, math.ceil(idle / 2)))
+            return None
+        self._idle_since = None
+        return None
+
+    async def apply(self, workers: int):
+        current = self.engine.executor.max_workers
+        if workers == current:
+            return
+        if workers > current:
+            self.scale_ups += 1
+        else:
+            self.scale_downs += 1
+        await self.engine.executor.resize(workers)
+
+    async def run(self):
+        """Background sampling loop"""
+        while True:
+            await asyncio.sleep(self.policy.interval_seconds)
+            workers = self.sample()
+            if workers is not None:
+                await self.apply(workers)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.engine.executor.max_workers,
+            'min_workers': self.policy.min_workers,
+            'max_workers': self.policy.max_workers,
+            'backlog': self.last_backlog,
+            'queue_wait_ms': self.last_wait * 1000,
+            'scale_ups': self.scale_ups,
+            'scale_downs': self.scale_downs,
+        }
@@ -0,0 +1,140 @@
+"""
+DONGOL Batch - Pack chunks into one process-pool call
+"""
+import asyncio
+import math
+import sys
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def run_batch(handler: Callable[[Any], Any], chunks: List[Any]) -> List[Tuple[bool, Any, float, float]]:
+    """Run a batch of chunks in one worker call, returning (ok, value, start, end) per chunk"""
+    replies = []
+    for chunk in chunks:
+        started = time.perf_counter()
+        try:
+            replies.append((True, handler(chunk), started, time.perf_counter()))
+        except Exception as e:
+            replies.append((False, e, started, time.perf_counter()))
+    return replies
+
+
+def payload_size(content: Any) -> int:
+    """Cheap estimate of a chunk's pickled size, without pickling it"""
+    if isinstance(content, (str, bytes, bytearray)):
+        return len(content)
+    if isinstance(content, dict):
+        return sum(payload_size(k) + payload_size(v) for k, v in content.items())
+    if isinstance(content, (list, tuple)):
+        return sum(payload_size(v) for v in content)
+    return sys.getsizeof(content)
+
+
+class _Pending:
+    __slots__ = ('handler', 'chunks', 'futures', 'size', 'timer')
+
+    def __init__(self, handler: Callable[[Any], Any]):
+        self.handler = handler
+        self.chunks: List[Any] = []
+        self.futures: List['asyncio.Future[Tuple[Any, float, float]]'] = []
+        self.size = 0
+        self.timer: Optional[asyncio.Handle] = None
+
+
+class ChunkBatcher:
+    """
+    Packs chunks bound for a process pool into batched calls
+
+    Chunks submitted for the same handler are held until max_chunks of
+    them or max_bytes of content are waiting, or max_delay_ms has passed
+    (0 flushes on the next loop iteration, which still catches every
+    chunk of a wave), then sent as one run_batch call: one pickle, one
+    pipe round trip and one future for the lot. A timed flush spreads
+    what is waiting over the pool's workers instead of handing it all
+    to one.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        max_workers: int,
+        max_chunks: int = 32,
+        max_bytes: int = 1024 * 1024,
+        max_delay_ms: float = 0.0
+    ):
+        self.executor = executor
+        self.max_workers = max_workers
+        self.max_chunks = max(1, max_chunks)
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay_ms / 1000
+        self._pending: Dict[int, _Pending] = {}
+        self.batches = 0
+        self.chunks = 0
+
+    def submit(self, handler: Callable[[Any], Any], chunk: Any) -> 'asyncio.Future[Tuple[Any, float, float]]':
+        """Queue a chunk; the future resolves to (result, start, end) or raises the handler's error"""
+        loop = asyncio.get_running_loop()
+        key = id(handler)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _Pending(handler)
+            if self.max_delay > 0:
+                pending.timer = loop.call_later(self.max_delay, self._flush, key)
+            else:
+                pending.timer = loop.call_soon(self._flush, key)
+        future: 'asyncio.Future[Tuple[Any, float, float]]' = loop.create_future()
+        pending.chunks.append(chunk)
+        pending.futures.append(future)
+        pending.size += payload_size(getattr(chunk, 'content', chunk))
+        if len(pending.chunks) >= self.max_chunks or pending.size >= self.max_bytes:
+            pending.timer.cancel()
+            self._flush(key, full=True)
+        return future
+
+    def _flush(self, key: int, full: bool = False):
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        # A full batch goes as is; what the timer flushes is split so every worker gets some
+        count = len(pending.chunks)
+        size = count if full else math.ceil(count / self.max_workers)
+        for start in range(0, count, size):
+            self._send(pending.handler, pending.chunks[start:start + size],
+                       pending.futures[start:start + size])
+
+    def _send(self, handler: Callable[[Any], Any], chunks: List[Any], futures: List[asyncio.Future]):
+        self.batches += 1
+        self.chunks += len(chunks)
+        loop = asyncio.get_running_loop()
+        call = loop.run_in_executor(self.executor, run_batch, handler, chunks)
+
+        def done(call: asyncio.Future):
+            if call.cancelled():
+                for future in futures:
+                    future.cancel()
+                return
+            error = call.exception()
+            if error is not None:
+                # The whole call failed (worker died, batch unpicklable)
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+                return
+            for future, (ok, value, started, finished) in zip(futures, call.result()):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result((value, started, finished))
+                else:
+                    future.set_exception(value)
+
+        call.add_done_callback(done)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'batches': self.batches,
+            'chunks': self.chunks,
+            'avg_batch_size': self.chunks / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,131 @@
+"""
+DONGOL Broadcast - Read-only reference data shipped once per worker
+"""
+import os
+import pickle
+import threading
+import uuid
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Dict, Tuple
+
+# (segment, size) of each published value, as last seen by this process
+BroadcastRefs = Dict[str, Tuple[str, int]]
+
+# Values this process holds, by name, with the segment they were read from
+_values: Dict[str, Tuple[str, Any]] = {}
+_refs: BroadcastRefs = {}
+_lock = threading.Lock()
+
+
+def get_broadcast(name: str) -> Any:
+    """
+    Resolve a broadcast value by name from inside a handler
+
+    The first call in a worker process attaches to the value's shared
+    memory segment and unpickles it; later calls return the cached
+    object. Treat it as read-only: each process has its own copy and
+    changes are not seen anywhere else.
+    """
+    ref = _refs.get(name)
+    if ref is None:
+        raise KeyError(f"No broadcast named {name}")
+    cached = _values.get(name)
+    if cached is not None and cached[0] == ref[0]:
+        return cached[1]
+    with _lock:
+        cached = _values.get(name)
+        if cached is None or cached[0] != ref[0]:
+            segment, size = ref
+            try:
+                shm = shared_memory.SharedMemory(segment)
+            except FileNotFoundError:
+                raise KeyError(f"Broadcast {name} was replaced or removed") from None
+            try:
+                cached = _values[name] = (segment, pickle.loads(shm.buf[:size]))
+            finally:
+                shm.close()
+        return cached[1]
+
+
+class BroadcastHandler:
+    """
+    Handler wrapper carrying where the broadcast values live
+
+    Only the segment names travel with each chunk; the worker installs
+    them before calling the handler so get_broadcast can find the data.
+    """
+
+    __slots__ = ('handler', 'refs')
+
+    def __init__(self, handler: Callable[[Any], Any], refs: BroadcastRefs):
+        self.handler = handler
+        self.refs = refs
+
+    def __call__(self, chunk: Any) -> Any:
+        _refs.update(self.refs)
+        return self.handler(chunk)
+
+    def __reduce__(self):
+        return BroadcastHandler, (self.handler, self.refs)
+
+
+class Broadcasts:
+    """
+    Named read-only values published to worker processes
+
+    Each value is pickled once into a shared memory segment. Workers
+    attach on first use, so a value crosses into each process once no
+    matter how many chunks read it. Publishing under an existing name
+    replaces the value; the old segment is unlinked, so do it between
+    tasks rather than while chunks that read it are running.
+    """
+
+    def __init__(self):
+        self._segments: Dict[str, shared_memory.SharedMemory] = {}
+        if os.name == 'posix':
+            # Workers forked from here share this tracker. One forked before it
+            # started would get its own, which unlinks the segments it attached
+            # to when the worker exits.
+            resource_tracker.ensure_running()
+
+    def publish(self, name: str, value: Any) -> int:
+        """Publish a value under a name, returning its pickled size"""
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        shm = shared_memory.SharedMemory(
+            name=f'dongol-{uuid.uuid4().hex[:16]}', create=True, size=max(1, len(data))
+        )
+        shm.buf[:len(data)] = data
+        self.remove(name)
+        self._segments[name] = shm
+        # This process reads its own values without attaching
+        with _lock:
+            _values[name] = (shm.name, value)
+            _refs[name] = (shm.name, len(data))
+        return len(data)
+
+    def remove(self, name: str) -> bool:
+        shm = self._segments.pop(name, None)
+        if shm is None:
+            return False
+        with _lock:
+            _values.pop(name, None)
+            _refs.pop(name, None)
+        shm.close()
+        shm.unlink()
+        return True
+
+    def refs(self) -> BroadcastRefs:
+        return {name: _refs[name] for name in self._segments}
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def close(self):
+        for name in list(self._segments):
+            self.remove(name)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'values': len(self._segments),
+            'bytes': sum(size for _, size in self.refs().values()),
+        }
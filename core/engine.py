@@ -4,17 +4,39 @@ DONGOL Core Engine - High-Performance Task Orchestration
 from __future__ import annotations
 
 import asyncio
+import codecs
 import hashlib
 import json
+import multiprocessing
+import os
+import threading
 import time
 import uuid
 from collections import defaultdict
 from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum, auto
-from typing import Any, Callable, Coroutine, Dict, Generic, List, Optional, Set, TypeVar, Union
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Coroutine, Dict, Generic, List, Optional, Set, Tuple, TypeVar, Union
 import heapq
 
+from .index import TaskIndex, decode_cursor, encode_cursor
+from .affinity import AffinityPlan, pin_next
+from .autoscale import Autoscaler, AutoscalePolicy
+from .batch import ChunkBatcher
+from .broadcast import BroadcastHandler, Broadcasts
+from .metrics import LoopLagMonitor, MetricsRegistry, timed_call
+from .routing import AUTO, HandlerProfile, RoutedHandler, profiled_call
+from .pool import PreloadedHandler, StealingPool, preload, preloaded, warm_pool
+from .remote import NoWorkersError, RemoteCoordinator, RemoteHandler
+from .retention import RetentionPolicy, RetentionSweeper
+from .search import ALL_FIELDS, FIELD_RESULTS, FIELD_TASK, SearchIndex
+from .spill import ResultSpiller, SpilledResults
+from .stats import EngineStats
+
+if TYPE_CHECKING:
+    from .queue import QueueDispatcher
+    from .store import StoreSync
+
 T = TypeVar('T')
 
 
@@ -27,6 +49,32 @@ class TaskStatus(Enum):
     CANCELLED = auto()
 
 
+FINISHED_STATUSES = frozenset({TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED})
+
+
+_id_lock = threading.Lock()
+_id_node = os.urandom(2).hex()
+_id_last_ms = 0
+_id_seq = 0
+
+
+def new_task_id() -> str:
+    """Time-ordered task id: epoch milliseconds, a sequence number and a node tag"""
+    global _id_last_ms, _id_seq
+    with _id_lock:
+        ms = int(time.time() * 1000)
+        if ms <= _id_last_ms:
+            ms = _id_last_ms
+            _id_seq += 1
+            if _id_seq > 0xffff:
+                ms += 1
+                _id_seq = 0
+        else:
+            _id_seq = 0
+        _id_last_ms = ms
+        return f"{ms:012x}{_id_seq:04x}{_id_node}"
+
+
 class Priority(Enum):
     CRITICAL = 0
     HIGH = 1
@@ -65,7 +113,7 @@ class Chunk:
 @dataclass
 class Task:
     """Main task container with parallel execution support"""
-    id: str = field(default_factory=lambda: str(uuid.uuid4())[:12])
+    id: str = field(default_factory=new_task_id)
     name: str = "unnamed"
     description: str = ""
     chunks: List[Chunk] = field(default_factory=list)
@@ -78,6 +126,7 @@ class Task:
     metadata: Dict[str, Any] = field(default_factory=dict)
     parallel_mode: bool = True
     max_workers: int = 4
+    completed_chunks: int = 0
     
     @property
     def duration_ms(self) -> Optional[float]:
@@ -86,6 +135,118 @@ class Task:
         return None
 
 
+def _get_results(self: Task) -> Dict[str, Any]:
+    results = self.__dict__.get('_results')
+    if isinstance(results, SpilledResults):
+        # Page spilled results back in transparently
+        return results.load()
+    spiller = self.__dict__.get('_spiller')
+    if spiller is not None:
+        spiller.touch(self)
+    return results
+
+
+def _set_results(self: Task, value: Dict[str, Any]):
+    old = self.__dict__.get('_results')
+    if isinstance(old, SpilledResults):
+        old.spiller.release(old)
+    self.__dict__['_results'] = value
+    spiller = self.__dict__.get('_spiller')
+    if spiller is not None:
+        spiller.track(self)
+
+
+# Results may live on disk under a memory budget, so route access through a property
+Task.results = property(_get_results, _set_results)  # type: ignore[assignment]
+
+
+class TokenChunker:
+    """
+    Incremental token chunker that can be fed text piece by piece
+    
+    Produces the same chunks as chunking the concatenated text in one go;
+    a word split across two pieces is carried over until it is complete.
+    A word longer than a chunk holds is cut every max_word_chars, so text
+    without whitespace is not carried (and rescanned) without bound.
+    """
+    
+    def __init__(self, token_limit: int = 500, overlap_ratio: float = 0.1,
+                 parent_id: Optional[str] = None):
+        self.token_limit = token_limit
+        self.overlap_ratio = overlap_ratio
+        self.parent_id = parent_id
+        self.max_word_chars = max(1, token_limit * 4)
+        self._words: List[str] = []
+        self._tokens = 0
+        self._carry = ''
+        self._previous: Optional[Chunk] = None
+    
+    def feed(self, text: str) -> List[Chunk]:
+        """Add text and return any chunks that are now complete"""
+        if not text:
+            return []
+        text = self._carry + text
+        words = text.split()
+        if words and not text[-1].isspace():
+            self._carry = words.pop()
+        else:
+            self._carry = ''
+        if len(self._carry) > self.max_word_chars:
+            # Pieces cut from the start of a word come out the same however it was fed
+            cut = len(self._carry) - len(self._carry) % self.max_word_chars
+            words.append(self._carry[:cut])
+            self._carry = self._carry[cut:]
+        
+        chunks = []
+        for word in words:
+            for start in range(0, len(word), self.max_word_chars):
+                chunk = self._add_word(word[start:start + self.max_word_chars])
+                if chunk is not None:
+                    chunks.append(chunk)
+        return chunks
+    
+    def close(self) -> List[Chunk]:
+        """Flush the carried word and the final partial chunk"""
+        chunks = []
+        if self._carry:
+            # Never longer than max_word_chars
+            chunk = self._add_word(self._carry)
+            self._carry = ''
+            if chunk is not None:
+                chunks.append(chunk)
+        if self._words:
+            chunks.append(self._emit())
+            self._words = []
+            self._tokens = 0
+        return chunks
+    
+    def _add_word(self, word: str) -> Optional[Chunk]:
+        word_tokens = len(word) // 4 + 1  # Rough estimate
+        chunk = None
+        
+        if self._tokens + word_tokens > self.token_limit and self._words:
+            chunk = self._emit()
+            # Keep overlap for context
+            overlap_start = max(0, len(self._words) - int(len(self._words) * self.overlap_ratio))
+            self._words = self._words[overlap_start:]
+            self._tokens = sum(len(w) // 4 + 1 for w in self._words)
+        
+        self._words.append(word)
+        self._tokens += word_tokens
+        return chunk
+    
+    def _emit(self) -> Chunk:
+        chunk = Chunk(
+            content=' '.join(self._words),
+            parent_id=self.parent_id,
+            tags={'auto_chunked', 'token_based'}
+        )
+        if self._previous is not None:
+            chunk.dependencies.add(self._previous.id)
+        self._previous = chunk
+        return chunk
+
+
 class ChunkingEngine:
     """
     Intelligent task chunking with dependency analysis
@@ -99,41 +260,19 @@ class ChunkingEngine:
     
     def chunk_by_tokens(self, content: str, token_limit: int = 500) -> List[Chunk]:
         """Smart chunking that respects semantic boundaries"""
-        words = content.split()
-        chunks = []
-        current_chunk = []
-        current_tokens = 0
-        
-        for word in words:
-            word_tokens = len(word) // 4 + 1  # Rough estimate
-            
-            if current_tokens + word_tokens > token_limit and current_chunk:
-                chunks.append(Chunk(
-                    content=' '.join(current_chunk),
-                    tags={'auto_chunked', 'token_based'}
-                ))
-                # Keep overlap for context
-                overlap_start = max(0, len(current_chunk) - int(len(current_chunk) * self.overlap_ratio))
-                current_chunk = current_chunk[overlap_start:]
-                current_tokens = sum(len(w) // 4 + 1 for w in current_chunk)
-            
-            current_chunk.append(word)
-            current_tokens += word_tokens
-        
-        if current_chunk:
-            chunks.append(Chunk(
-                content=' '.join(current_chunk),
-                tags={'auto_chunked', 'token_based'}
-            ))
+        chunker = self.stream_tokens(token_limit)
+        chunks = chunker.feed(content) + chunker.close()
         
         # Link dependencies
-        for i, chunk in enumerate(chunks):
+        for chunk in chunks:
             chunk.parent_id = f"batch_{hash(content) % 10000}"
-            if i > 0:
-                chunk.dependencies.add(chunks[i-1].id)
         
         return chunks
     
+    def stream_tokens(self, token_limit: int = 500, parent_id: Optional[str] = None) -> TokenChunker:
+        """Incremental counterpart of chunk_by_tokens for streamed content"""
+        return TokenChunker(token_limit, self.overlap_ratio, parent_id)
+    
     def chunk_by_structure(self, data: Dict[str, Any]) -> List[Chunk]:
         """Chunk structured data intelligently"""
         chunks = []
@@ -204,57 +343,281 @@ class ParallelExecutor:
     High-performance parallel task executor
     """
     
-    def __init__(self, max_workers: int = 4, use_processes: bool = False):
+    def __init__(
+        self,
+        max_workers: int = 4,
+        use_processes: bool = False,
+        scheduler: str = 'central',
+        pool: Optional[Dict[str, Any]] = None,
+        batch: Optional[Dict[str, Any]] = None,
+        affinity: Optional[Dict[str, Any]] = None
+    ):
         self.max_workers = max_workers
         self.use_processes = use_processes
-        self._executor: Optional[Union[ThreadPoolExecutor, ProcessPoolExecutor]] = None
+        # 'central': one shared ProcessPoolExecutor queue; 'stealing': per-worker deques
+        self.scheduler = scheduler
+        # Warm pool settings: persistent, preload, handlers, max_tasks_per_worker, max_memory_mb
+        self.pool = pool or {}
+        self.persistent = bool(self.use_processes and self.pool.get('persistent'))
+        # Batching settings (process mode): enabled, max_chunks, max_bytes, max_delay_ms
+        self.batch = batch or {}
+        # CPU pinning of process workers (Linux): enabled, socket, per_core
+        self.affinity = affinity or {}
+        self.affinity_plan: Optional[AffinityPlan] = None
+        self._executor: Optional[Union[ThreadPoolExecutor, ProcessPoolExecutor, StealingPool]] = None
+        self._batcher: Optional[ChunkBatcher] = None
+        # The main executor serves this named pool; the others start on first use
+        self.default_pool = 'cpu' if use_processes else 'io'
+        self._pools: Dict[str, Union[ThreadPoolExecutor, ProcessPoolExecutor]] = {}
         self._lock = asyncio.Lock()
         self._active_tasks: Dict[str, asyncio.Task] = {}
+        self._listeners: List[Callable[..., None]] = []
+    
+    def add_listener(self, listener: Callable[..., None]):
+        """Register a callback for chunk events (chunk_started, chunk_completed, chunk_failed)"""
+        self._listeners.append(listener)
+    
+    def _emit(self, event: str, chunk: Chunk, task_id: Optional[str], **data):
+        for listener in self._listeners:
+            listener(event, chunk, task_id, **data)
     
     async def start(self):
-        if self.use_processes:
-            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        if self.affinity.get('enabled'):
+            self.affinity_plan = AffinityPlan(
+                self.max_workers, self.affinity.get('socket'), self.affinity.get('per_core', False)
+            )
+        if self.persistent:
+            # Started once per process and reused by later engines
+            self._executor = warm_pool(
+                self.max_workers,
+                self.pool.get('preload') or (),
+                self.pool.get('handlers'),
+                self.pool.get('max_tasks_per_worker'),
+                self.pool.get('max_memory_mb'),
+                self.affinity_plan
+            )
+            self._start_batcher()
+            return
+        if self.pool.get('preload') or self.pool.get('handlers'):
+            # Threads share this process, so preloading here is enough
+            preload(self.pool.get('preload') or (), self.pool.get('handlers'))
+        if self.use_processes and self.scheduler == 'stealing':
+            self._executor = StealingPool(max_workers=self.max_workers, affinity=self.affinity_plan)
+        elif self.use_processes:
+            self._executor = self._process_pool()
         else:
             self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._start_batcher()
+    
+    def _start_batcher(self):
+        if self.use_processes and self.batch.get('enabled'):
+            self._batcher = ChunkBatcher(
+                self._executor,
+                self.max_workers,
+                max_chunks=self.batch.get('max_chunks', 32),
+                max_bytes=self.batch.get('max_bytes', 1024 * 1024),
+                max_delay_ms=self.batch.get('max_delay_ms', 0.0)
+            )
+    
+    async def resize(self, max_workers: int):
+        """Change the main executor's worker count without stopping in-flight chunks
+        
+        The stealing pool grows or shrinks in place. A thread or process
+        pool is replaced by one of the new size, and the old one finishes
+        what was already submitted to it in the background. A warm pool
+        is shared with other engines and keeps the size it started with.
+        """
+        max_workers = max(1, max_workers)
+        if max_workers == self.max_workers:
+            return
+        if self.persistent:
+            raise RuntimeError("A persistent pool is shared by every engine using it and cannot be resized")
+        self.max_workers = max_workers
+        if self._executor is None:
+            return
+        if self.affinity_plan is not None:
+            self.affinity_plan = AffinityPlan(
+                max_workers, self.affinity.get('socket'), self.affinity.get('per_core', False)
+            )
+        if isinstance(self._executor, StealingPool):
+            self._executor.resize(max_workers, self.affinity_plan)
+        else:
+            old = self._executor
+            self._executor = (
+                self._process_pool() if self.use_processes else ThreadPoolExecutor(max_workers=max_workers)
+            )
+            old.shutdown(wait=False)
+        if self._batcher is not None:
+            self._batcher.executor = self._executor
+            self._batcher.max_workers = max_workers
+    
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self.affinity_plan is None:
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        # Workers pin themselves to the plan's slots in start order
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=pin_next,
+            initargs=(multiprocessing.Value('i', 0), self.affinity_plan)
+        )
+    
+    def _pool(self, name: str) -> Any:
+        if name == self.default_pool:
+            return self._executor
+        pool = self._pools.get(name)
+        if pool is None:
+            if name == 'cpu':
+                pool = self._process_pool()
+            else:
+                pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            self._pools[name] = pool
+        return pool
     
     async def stop(self):
+        self._batcher = None
+        for pool in self._pools.values():
+            pool.shutdown(wait=True)
+        self._pools.clear()
         if self._executor:
-            self._executor.shutdown(wait=True)
+            # A warm pool stays up for the next engine and is shut down at exit
+            if not self.persistent:
+                self._executor.shutdown(wait=True)
             self._executor = None
     
+    def get_pool_stats(self) -> Optional[Dict[str, Any]]:
+        """Per-worker stats of the stealing or warm pool, if one is running"""
+        if isinstance(self._executor, StealingPool):
+            return self._executor.get_stats()
+        if self.affinity_plan is not None:
+            return self.affinity_plan.get_stats()
+        return None
+    
+    def get_batch_stats(self) -> Optional[Dict[str, Any]]:
+        """Batches sent and their average size, if batching is on"""
+        if self._batcher is not None:
+            return self._batcher.get_stats()
+        return None
+    
     async def execute_chunk(
         self, 
         chunk: Chunk, 
         handler: Callable[[Chunk], T],
-        dependency_results: Dict[str, T]
+        dependency_results: Dict[str, T],
+        task_id: Optional[str] = None,
+        placement: Optional[Dict[str, int]] = None
     ) -> T:
-        """Execute a single chunk with dependency injection"""
+        """Execute a single chunk with dependency injection
+        
+        With the stealing scheduler, placement maps chunk ids to the worker
+        that ran them; a chunk is queued on the worker that ran one of its
+        dependencies and its own worker is recorded. With batching on,
+        chunks go through the batcher instead and are not placed.
+        
+        A RoutedHandler runs on its named pool: io (threads), cpu
+        (processes) or async (inline on the event loop). A RemoteHandler
+        runs on a remote worker when one serves it, else as above.
+        """
         # Inject dependency results into context
         chunk.context['dependencies'] = dependency_results
         
-        loop = asyncio.get_event_loop()
+        self._emit('chunk_started', chunk, task_id)
+        submitted = time.perf_counter()
         
-        if self.use_processes:
-            # Use process pool for CPU-bound tasks
-            result = await loop.run_in_executor(self._executor, handler, chunk)
-        else:
-            # Use thread pool for I/O-bound tasks
-            if asyncio.iscoroutinefunction(handler):
-                result = await handler(chunk)
-            else:
-                result = await loop.run_in_executor(self._executor, handler, chunk)
+        try:
+            result, started, finished = await self._run(chunk, handler, task_id, placement, submitted)
+        except BaseException as e:
+            self._emit('chunk_failed', chunk, task_id, error=e)
+            raise
         
+        self._emit(
+            'chunk_completed', chunk, task_id, result=result,
+            queue_wait=max(0.0, started - submitted), run_time=finished - started
+        )
         return result
     
+    async def _run(
+        self,
+        chunk: Chunk,
+        handler: Callable[[Chunk], T],
+        task_id: Optional[str],
+        placement: Optional[Dict[str, int]],
+        submitted: float
+    ) -> Tuple[T, float, float]:
+        """Run a chunk where its handler belongs; returns (result, start, end)"""
+        if isinstance(handler, RemoteHandler):
+            remote, handler = handler, handler.local
+            if handler is None or remote.coordinator.has_worker(remote.name):
+                try:
+                    result = await remote.coordinator.submit(remote.name, chunk)
+                    return result, submitted, time.perf_counter()
+                except NoWorkersError:
+                    # The worker went away; the engine's own handler takes over
+                    if handler is None:
+                        raise
+        
+        route: Optional[RoutedHandler] = None
+        if isinstance(handler, RoutedHandler):
+            route, handler = handler, handler.handler
+        pool = route.target() if route is not None else None
+        
+        loop = asyncio.get_event_loop()
+        if asyncio.iscoroutinefunction(handler):
+            result = await handler(chunk)
+            return result, submitted, time.perf_counter()
+        if route is not None and pool is None and route.profile.begin_sample():
+            # Auto routing: time a sample on the io pool until the profile decides
+            try:
+                result, started, finished, cpu = await loop.run_in_executor(
+                    self._pool('io'), profiled_call, handler, chunk
+                )
+            except BaseException:
+                route.profile.abandon()
+                raise
+            route.profile.record(finished - started, cpu)
+            return result, started, finished
+        if pool == 'async':
+            return timed_call(handler, chunk)
+        if pool is not None and pool != self.default_pool:
+            return await loop.run_in_executor(self._pool(pool), timed_call, handler, chunk)
+        if self._batcher is not None:
+            return await self._batcher.submit(handler, chunk)
+        if isinstance(self._executor, StealingPool):
+            home = next(
+                (placement[dep] for dep in chunk.dependencies if placement and dep in placement),
+                None
+            )
+            if home is None and self.affinity_plan is not None:
+                # Keep chunks of one task, or reading one broadcast, on one socket
+                refs = getattr(handler, 'refs', None)
+                future = self._executor.submit_near(
+                    tuple(sorted(refs)) if refs else task_id or chunk.parent_id,
+                    chunk.priority.value, timed_call, handler, chunk
+                )
+            else:
+                future = self._executor.submit_to(
+                    home, chunk.priority.value, timed_call, handler, chunk
+                )
+            result, started, finished = await asyncio.wrap_future(future)
+            if placement is not None:
+                placement[chunk.id] = future.worker
+            return result, started, finished
+        # Process pool for CPU-bound work, thread pool for I/O-bound;
+        # the worker stamps when the handler actually started
+        return await loop.run_in_executor(self._executor, timed_call, handler, chunk)
+    
     async def execute_parallel(
         self,
         chunks: List[Chunk],
         handler: Callable[[Chunk], T],
-        dependency_graph: Optional[Dict[str, Set[str]]] = None
+        dependency_graph: Optional[Dict[str, Set[str]]] = None,
+        task_id: Optional[str] = None,
+        results: Optional[Dict[str, T]] = None
     ) -> Dict[str, T]:
         """Execute chunks in parallel respecting dependencies"""
-        results: Dict[str, T] = {}
+        if results is None:
+            results = {}
         completed: Set[str] = set()
+        placement: Dict[str, int] = {}
         chunk_map = {c.id: c for c in chunks}
         
         async def can_execute(chunk: Chunk) -> bool:
@@ -266,7 +629,7 @@ class ParallelExecutor:
                 for dep_id in chunk.dependencies 
                 if dep_id in results
             }
-            result = await self.execute_chunk(chunk, handler, dep_results)
+            result = await self.execute_chunk(chunk, handler, dep_results, task_id, placement)
             results[chunk.id] = result
             completed.add(chunk.id)
             return result
@@ -290,12 +653,45 @@ class ParallelExecutor:
                 for chunk in executable
             ]
             
-            await asyncio.gather(*batch_tasks, return_exceptions=True)
+            outcomes = await asyncio.gather(*batch_tasks, return_exceptions=True)
+            error = next((o for o in outcomes if isinstance(o, BaseException)), None)
+            if error is not None:
+                # The rest of the batch has settled; chunks after it may depend on the failed one
+                raise error
             remaining -= set(c.id for c in executable)
         
         return results
 
 
+class ResultFeed:
+    """
+    Completion-ordered log of a running task's chunk results
+    
+    Readers keep their own position and wait for new entries, so a slow
+    reader only lags behind instead of forcing results to be buffered.
+    """
+    
+    def __init__(self):
+        self.items: List[Tuple[str, Any]] = []
+        self.closed = False
+        self._changed = asyncio.Event()
+    
+    def append(self, chunk_id: str, result: Any):
+        self.items.append((chunk_id, result))
+        self._notify()
+    
+    def close(self):
+        self.closed = True
+        self._notify()
+    
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+    
+    async def wait(self):
+        await self._changed.wait()
+
+
 class DongolEngine:
     """
     Main DONGOL Engine - Universal Task Orchestrator
@@ -304,25 +700,177 @@ class DongolEngine:
     def __init__(self, config: Optional[Dict] = None):
         self.config = config or {}
         self.chunking = ChunkingEngine(self.config.get('chunking', {}))
+        autoscale = AutoscalePolicy.from_config(self.config.get('autoscale'))
+        workers = self.config.get('max_workers', 4)
         self.executor = ParallelExecutor(
-            max_workers=self.config.get('max_workers', 4),
-            use_processes=self.config.get('use_processes', False)
+            max_workers=autoscale.clamp(workers) if autoscale.enabled else workers,
+            use_processes=self.config.get('use_processes', False),
+            scheduler=self.config.get('scheduler', 'central'),
+            pool=self.config.get('pool'),
+            batch=self.config.get('batch'),
+            affinity=self.config.get('affinity')
         )
+        self._check_autoscale(autoscale)
         self.tasks: Dict[str, Task] = {}
+        self.stats = EngineStats()
+        self.index = TaskIndex()
+        self.search_index = SearchIndex()
+        self.broadcasts = Broadcasts()
+        self.executor.add_listener(self._on_chunk_event)
+        budget_mb = self.config.get('memory_budget_mb')
+        self._spiller: Optional[ResultSpiller] = (
+            ResultSpiller(
+                int(budget_mb * 1024 * 1024),
+                self.config.get('spill_dir'),
+                self.config.get('spill_compact_ratio', 0.5),
+                int(self.config.get('spill_compact_min_mb', 1) * 1024 * 1024)
+            )
+            if budget_mb else None
+        )
+        self.retention = RetentionSweeper(
+            self, RetentionPolicy.from_config(self.config.get('retention'))
+        )
+        self.autoscaler = Autoscaler(self, autoscale)
+        self._autoscaling: Optional[asyncio.Task] = None
         self._handlers: Dict[str, Callable] = {}
         self._running = False
         self._event_queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._sweeper: Optional[asyncio.Task] = None
+        self._jobs: Dict[str, asyncio.Task] = {}
+        self._feeds: Dict[str, ResultFeed] = {}
+        self.loop_lag = LoopLagMonitor()
+        self._lag_monitor: Optional[asyncio.Task] = None
+        self.metrics = MetricsRegistry()
+        self._init_metrics()
+        remote = self.config.get('remote') or {}
+        self.remote: Optional[RemoteCoordinator] = (
+            RemoteCoordinator(remote['listen'], remote.get('token'), remote.get('batch_size', 32))
+            if remote.get('listen') else None
+        )
+        self.queue: Optional['QueueDispatcher'] = None
+        queue = self.config.get('queue') or {}
+        if queue.get('url'):
+            from .queue import QueueDispatcher, open_queue
+            self.queue = QueueDispatcher(
+                open_queue(queue['url']),
+                name=queue.get('name', 'dongol'),
+                handlers=queue.get('handlers'),
+                batch_size=queue.get('batch_size', 64),
+                visibility_timeout=queue.get('visibility_timeout', 30.0),
+                poll_interval=queue.get('poll_interval_ms', 50) / 1000,
+                job_timeout=queue.get('job_timeout', 300.0)
+            )
+        self.shared: Optional['StoreSync'] = None
+        self._shared_sync: Optional[asyncio.Task] = None
+        shared = self.config.get('shared') or {}
+        if shared.get('path'):
+            # Imported lazily: the store module builds on this one
+            from .store import SharedStore, StoreSync
+            self.shared = StoreSync(
+                self,
+                SharedStore(shared['path'], shared.get('worker_id'), shared.get('lease_seconds', 30.0)),
+                sync_interval=shared.get('sync_interval_ms', 20) / 1000,
+                max_claimed_jobs=shared.get('max_claimed_jobs', 4)
+            )
+    
+    def _init_metrics(self):
+        """Register engine metrics; hot-path ones are sharded per thread"""
+        metrics = self.metrics
+        self._queue_wait = metrics.histogram(
+            'dongol_chunk_queue_wait_seconds',
+            'Time a chunk waited for an executor worker', ('handler',)
+        )
+        self._run_time = metrics.histogram(
+            'dongol_chunk_run_seconds', 'Chunk handler run time', ('handler',)
+        )
+        self._task_duration = metrics.histogram(
+            'dongol_task_duration_seconds',
+            'Task end-to-end duration from creation to finish', ('status',)
+        )
+        self._chunk_failures = metrics.counter(
+            'dongol_chunk_failures_total', 'Chunks whose handler raised', ('handler',)
+        )
+        metrics.gauge(
+            'dongol_chunks_in_flight', 'Chunks submitted to the executor and not finished',
+            lambda: self.stats.chunks_in_flight
+        )
+        metrics.gauge(
+            'dongol_executor_queue_depth', 'Chunks waiting for a free executor worker',
+            lambda: max(0, self.stats.chunks_in_flight - self.executor.max_workers)
+        )
+        metrics.gauge(
+            'dongol_pending_chunks', 'Chunks of running tasks not yet completed',
+            lambda: self.stats.pending_chunks
+        )
+        metrics.gauge(
+            'dongol_event_loop_lag_seconds', 'Most recent event-loop wakeup delay',
+            lambda: self.loop_lag.lag
+        )
+        metrics.gauge(
+            'dongol_tasks', 'Tasks in the table by status',
+            lambda: [({'status': name}, count) for name, count in self.stats.status_counts.items()]
+        )
+        metrics.callback_counter(
+            'dongol_tasks_completed_total', 'Tasks that completed successfully',
+            lambda: [({}, self.stats.tasks_completed)]
+        )
+        metrics.callback_counter(
+            'dongol_chunks_completed_total', 'Chunks that completed successfully',
+            lambda: [({}, self.stats.chunks_completed)]
+        )
+        metrics.callback_counter(
+            'dongol_result_page_ins_total', 'Spilled task results read back from disk',
+            lambda: [({}, self._spiller.page_in_count if self._spiller else 0)]
+        )
     
     async def start(self):
         """Initialize the engine"""
         await self.executor.start()
+        if self.remote is not None:
+            await self.remote.start()
+        if self.queue is not None:
+            await self.queue.start()
         self._running = True
         asyncio.create_task(self._event_loop())
+        self._lag_monitor = asyncio.create_task(self.loop_lag.run())
+        if self.retention.policy.enabled:
+            self._sweeper = asyncio.create_task(self.retention.run())
+        if self.autoscaler.policy.enabled:
+            self._autoscaling = asyncio.create_task(self.autoscaler.run())
+        if self.shared is not None:
+            await self.shared.hydrate()
+            self._shared_sync = asyncio.create_task(self.shared.run())
     
     async def stop(self):
         """Shutdown the engine"""
         self._running = False
+        if self._lag_monitor is not None:
+            self._lag_monitor.cancel()
+            self._lag_monitor = None
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        if self._autoscaling is not None:
+            self._autoscaling.cancel()
+            self._autoscaling = None
+        if self._shared_sync is not None:
+            self._shared_sync.cancel()
+            self._shared_sync = None
+        for job in list(self._jobs.values()):
+            job.cancel()
+        if self._jobs:
+            await asyncio.gather(*self._jobs.values(), return_exceptions=True)
+        if self.remote is not None:
+            await self.remote.stop()
+        if self.queue is not None:
+            await self.queue.stop()
         await self.executor.stop()
+        if self.shared is not None:
+            self.shared.close()
+        if self._spiller is not None:
+            self._spiller.close()
+        self.broadcasts.close()
     
     async def _event_loop(self):
         """Background event processing"""
@@ -336,16 +884,144 @@ class DongolEngine:
     async def _process_event(self, event: Dict[str, Any]):
         """Process system events"""
         event_type = event.get('type')
-        if event_type == 'task_complete':
+        if event_type == 'task_completed':
             task_id = event.get('task_id')
-            if task_id in self.tasks:
-                self.tasks[task_id].status = TaskStatus.COMPLETED
-                self.tasks[task_id].completed_at = time.time()
+            task = self.tasks.get(task_id)
+            if task is not None and task.status not in FINISHED_STATUSES:
+                task.completed_at = time.time()
+                self._set_status(task, TaskStatus.COMPLETED)
+        
+        for subscriber in list(self._subscribers):
+            subscriber(event)
+    
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """Receive engine events (chunk_started, chunk_completed, chunk_failed, task_completed, task_failed)"""
+        self._subscribers.append(callback)
+    
+    def unsubscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+    
+    def _publish(self, event: Dict[str, Any]):
+        if self._subscribers:
+            self._event_queue.put_nowait(event)
+    
+    def _set_status(self, task: Task, status: TaskStatus):
+        """Move a task to a new status, keeping engine bookkeeping in sync"""
+        old = task.status
+        task.status = status
+        if task.id in self.tasks:
+            self.stats.status_changed(old, status)
+            self.index.status_changed(task, old)
+        if status in FINISHED_STATUSES:
+            if old not in FINISHED_STATUSES:
+                self.retention.task_finished(task)
+        elif old in FINISHED_STATUSES:
+            self.retention.task_removed(task.id)
+        if self.shared is not None:
+            self.shared.task_saved(task)
+    
+    def _on_chunk_event(self, event: str, chunk: Chunk, task_id: Optional[str], **data):
+        """Executor listener keeping chunk counters and the search index current"""
+        if event == 'chunk_started':
+            self.stats.chunk_started()
+        else:
+            self.stats.chunk_finished(ok=(event == 'chunk_completed'))
+            task = self.tasks.get(task_id)
+            handler = task.metadata.get('handler', 'default') if task else 'default'
+            if event == 'chunk_completed':
+                self._queue_wait.observe(data['queue_wait'], handler)
+                self.autoscaler.observe(data['queue_wait'])
+                self._run_time.observe(data['run_time'], handler)
+            else:
+                self._chunk_failures.inc(handler)
+        if event == 'chunk_completed' and task_id in self.tasks:
+            self.tasks[task_id].completed_chunks += 1
+            self.stats.chunks_settled(1)
+            self.search_index.add(task_id, data.get('result'), FIELD_RESULTS)
+            feed = self._feeds.get(task_id)
+            if feed is not None:
+                feed.append(chunk.id, data.get('result'))
+            if self.shared is not None:
+                self.shared.result_added(self.tasks[task_id], chunk.id, data.get('result'))
+        
+        if self._subscribers:
+            task = self.tasks.get(task_id)
+            self._publish({
+                'type': event,
+                'task_id': task_id,
+                'chunk_id': chunk.id,
+                'completed_chunks': task.completed_chunks if task else None,
+                'total_chunks': len(task.chunks) if task else None,
+                'timestamp': time.time()
+            })
     
-    def register_handler(self, name: str, handler: Callable[[Chunk], Any]):
-        """Register a chunk handler"""
+    def register_handler(self, name: str, handler: Callable[[Chunk], Any], pool: Optional[str] = None):
+        """Register a chunk handler
+        
+        pool pins a sync handler to a named pool: 'io' (threads), 'cpu'
+        (processes, so the handler must be picklable) or 'async' (inline
+        on the event loop, for handlers too cheap to hand off). 'auto'
+        profiles its first runs and picks one. Without a pool the handler
+        runs on the engine's main executor.
+        """
+        if pool is not None and not asyncio.iscoroutinefunction(handler):
+            routing = self.config.get('routing', {})
+            profile = HandlerProfile(
+                samples=routing.get('samples', 5),
+                cpu_ratio=routing.get('cpu_ratio', 0.5),
+                inline_ms=routing.get('inline_ms', 0.5)
+            ) if pool == AUTO else None
+            handler = RoutedHandler(handler, pool, profile)
         self._handlers[name] = handler
     
+    def broadcast(self, name: str, value: Any) -> int:
+        """Publish read-only reference data that handlers resolve with get_broadcast(name)
+        
+        The value is pickled once and each worker process reads it once,
+        instead of it riding along in every chunk. Returns its pickled size.
+        """
+        return self.broadcasts.publish(name, value)
+    
+    def remove_broadcast(self, name: str) -> bool:
+        """Withdraw a broadcast value"""
+        return self.broadcasts.remove(name)
+    
+    def _resolve_handler(self, task: Task, handler_name: str) -> Callable[[Chunk], Any]:
+        """Look up a handler and record which one the task runs with"""
+        handler = self._handlers.get(handler_name)
+        if handler is None and preloaded(handler_name):
+            # Only the name is pickled; workers run their preloaded copy
+            handler = PreloadedHandler(handler_name)
+        # The built-in default handler counts as registered
+        registered = handler is not None or handler_name == 'default'
+        if self.queue is not None and self.queue.routes(handler_name, registered):
+            task.metadata['handler'] = handler_name
+            return self._queue_handler(handler_name)
+        remote_only = handler is None and self.remote is not None and self.remote.has_worker(handler_name)
+        if handler is None and not remote_only:
+            handler_name, handler = 'default', self._default_handler
+        task.metadata['handler'] = handler_name
+        if self.broadcasts and isinstance(handler, RoutedHandler):
+            # Tell worker processes where the broadcast values live
+            handler = handler.wrap(BroadcastHandler(handler.handler, self.broadcasts.refs()))
+        elif (self.broadcasts and self.executor.use_processes and handler is not None
+              and not asyncio.iscoroutinefunction(handler)):
+            handler = BroadcastHandler(handler, self.broadcasts.refs())
+        if self.remote is not None:
+            # Remote workers serving the name take it; otherwise it runs here
+            return RemoteHandler(self.remote, handler_name, handler)
+        return handler
+    
+    def _queue_handler(self, name: str) -> Callable[[Chunk], Any]:
+        """Run chunks on whichever queue worker reserves them"""
+        queue = self.queue
+        
+        async def run(chunk: Chunk) -> Any:
+            return await queue.submit(name, chunk)
+        
+        return run
+    
     async def create_task(
         self,
         name: str,
@@ -355,6 +1031,9 @@ class DongolEngine:
         **options
     ) -> Task:
         """Create and optionally chunk a new task"""
+        task_id = options.get('task_id')
+        if task_id is not None and task_id in self.tasks:
+            raise ValueError(f"Task {task_id} already exists")
         task = Task(
             name=name,
             description=options.get('description', ''),
@@ -362,6 +1041,9 @@ class DongolEngine:
             parallel_mode=options.get('parallel', True),
             max_workers=options.get('max_workers', 4)
         )
+        if task_id is not None:
+            # Callers that route by id (e.g. ShardedEngine) pick it up front
+            task.id = task_id
         
         if auto_chunk and isinstance(content, str):
             task.chunks = self.chunking.chunk_by_tokens(
@@ -373,50 +1055,364 @@ class DongolEngine:
         else:
             task.chunks = [Chunk(content=content, tags={'single'})]
         
+        # Chunks are scheduled at their task's priority
+        for chunk in task.chunks:
+            chunk.priority = task.priority
+        
         # Analyze dependencies
         self.chunking.analyze_dependencies(task.chunks)
         
+        self._add_task(task)
+        return task
+    
+    def _add_task(self, task: Task):
+        """Register a task with the table and every index"""
         self.tasks[task.id] = task
+        self.stats.task_added(task)
+        self.index.add(task)
+        self.search_index.add(task.id, [task.name, task.description], FIELD_TASK)
+        if self._spiller is not None:
+            self._spiller.adopt(task)
+        if self.shared is not None:
+            self.shared.task_saved(task)
+    
+    async def ingest_stream(
+        self,
+        name: str,
+        stream: AsyncIterator[Union[bytes, str]],
+        handler_name: str = "default",
+        **options
+    ) -> Task:
+        """
+        Create a task from streamed text, executing chunks while it arrives
+        
+        Each chunk is scheduled as soon as the chunker emits it, so the
+        first results can be ready before the upload finishes. Returns once
+        the stream is consumed; remaining execution continues as a job.
+        """
+        task = Task(
+            name=name,
+            description=options.get('description', ''),
+            priority=Priority(options.get('priority', 2)),
+            parallel_mode=options.get('parallel', True),
+            max_workers=options.get('max_workers', 4)
+        )
+        task.metadata['streamed'] = True
+        self._add_task(task)
+        
+        handler = self._resolve_handler(task, handler_name)
+        chunker = self.chunking.stream_tokens(
+            token_limit=options.get('chunk_size', 500),
+            parent_id=f"stream_{task.id}"
+        )
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        results, feed = self._begin_run(task)
+        pending: List[asyncio.Task] = []
+        
+        def schedule(chunks: List[Chunk]):
+            for chunk in chunks:
+                previous = pending[-1] if pending else None
+                chunk.priority = task.priority
+                task.chunks.append(chunk)
+                self.stats.chunks_added(1)
+                self.stats.chunks_scheduled(1)
+                if self.shared is not None:
+                    self.shared.task_touched(task)
+                pending.append(asyncio.create_task(
+                    self._run_streamed_chunk(task.id, chunk, handler, previous, results)
+                ))
+        
+        try:
+            async for piece in stream:
+                text = decoder.decode(piece) if isinstance(piece, bytes) else piece
+                schedule(chunker.feed(text))
+            schedule(chunker.feed(decoder.decode(b'', final=True)) + chunker.close())
+        except BaseException as e:
+            for job in pending:
+                job.cancel()
+            await self._finish_run(task, results, feed, error=e)
+            raise
+        
+        self._jobs[task.id] = asyncio.create_task(
+            self._finish_streamed(task, pending, results, feed)
+        )
+        return task
+    
+    async def _run_streamed_chunk(
+        self,
+        task_id: str,
+        chunk: Chunk,
+        handler: Callable,
+        previous: Optional[asyncio.Task],
+        results: Dict[str, Any]
+    ):
+        if previous is not None:
+            await asyncio.wait([previous])
+        dep_results = {dep: results[dep] for dep in chunk.dependencies if dep in results}
+        results[chunk.id] = await self.executor.execute_chunk(chunk, handler, dep_results, task_id)
+    
+    async def _finish_streamed(
+        self,
+        task: Task,
+        pending: List[asyncio.Task],
+        results: Dict[str, Any],
+        feed: ResultFeed
+    ):
+        try:
+            outcomes = await asyncio.gather(*pending, return_exceptions=True)
+        except asyncio.CancelledError as e:
+            for job in pending:
+                job.cancel()
+            await self._finish_run(task, results, feed, error=e)
+            raise
+        else:
+            error = next((o for o in outcomes if isinstance(o, BaseException)), None)
+            await self._finish_run(task, results, feed, error=error)
+        finally:
+            self._jobs.pop(task.id, None)
+    
+    async def get_task(self, task_id: str) -> Optional[Task]:
+        """Look up a task, checking the shared store for one not synced yet"""
+        task = self.tasks.get(task_id)
+        if task is None and self.shared is not None:
+            await self.shared.refresh(task_id)
+            task = self.tasks.get(task_id)
+        return task
+    
+    def remove_task(self, task_id: str) -> Task:
+        """Remove a task and release everything it holds"""
+        if task_id not in self.tasks:
+            raise ValueError(f"Task {task_id} not found")
+        
+        task = self.tasks.pop(task_id)
+        job = self._jobs.pop(task_id, None)
+        if job is not None:
+            job.cancel()
+        feed = self._feeds.pop(task_id, None)
+        if feed is not None:
+            feed.close()
+        self.stats.task_removed(task)
+        self.index.remove(task)
+        self.search_index.remove(task_id)
+        self.retention.task_removed(task_id)
+        if self._spiller is not None:
+            self._spiller.forget(task)
+        if self.shared is not None:
+            self.shared.task_deleted(task_id)
         return task
     
+    def drop_results(self, task_id: str) -> Task:
+        """Discard a task's results but keep its metadata"""
+        if task_id not in self.tasks:
+            raise ValueError(f"Task {task_id} not found")
+        
+        task = self.tasks[task_id]
+        task.results = {}
+        task.metadata['results_dropped'] = True
+        self.search_index.remove_field(task_id, FIELD_RESULTS)
+        if self.shared is not None:
+            self.shared.results_dropped(task)
+        return task
+    
+    def cancel_task(self, task_id: str) -> Task:
+        """Mark a task as cancelled, stopping its background run if it has one"""
+        if task_id not in self.tasks:
+            raise ValueError(f"Task {task_id} not found")
+        
+        task = self.tasks[task_id]
+        if self.shared is not None:
+            self.shared.cancel(task_id)
+        task.completed_at = time.time()
+        self._set_status(task, TaskStatus.CANCELLED)
+        job = self._jobs.get(task_id)
+        if job is not None:
+            job.cancel()
+        return task
+    
+    def list_tasks(
+        self,
+        status: Optional[TaskStatus] = None,
+        priority: Optional[Priority] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        newest_first: bool = False,
+        offset: int = 0
+    ) -> Tuple[List[Task], Optional[str]]:
+        """List tasks via the secondary indexes; returns (page, next_cursor)"""
+        after = decode_cursor(cursor) if cursor else None
+        page: List[Task] = []
+        skipped = 0
+        
+        for task_id in self.index.query(status, priority, after, newest_first):
+            if skipped < offset:
+                skipped += 1
+                continue
+            page.append(self.tasks[task_id])
+            if len(page) > limit:
+                break
+        
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            if page:
+                next_cursor = encode_cursor(page[-1].id)
+        return page, next_cursor
+    
+    def search(
+        self,
+        pattern: str,
+        in_tasks: bool = True,
+        in_results: bool = True,
+        limit: Optional[int] = None,
+        prefix: bool = False
+    ) -> List[Task]:
+        """Search task names, descriptions and results (supports * and ? wildcards)"""
+        fields = (FIELD_TASK if in_tasks else 0) | (FIELD_RESULTS if in_results else 0)
+        task_ids = self.search_index.search(pattern, fields or ALL_FIELDS, limit, prefix)
+        return [self.tasks[task_id] for task_id in task_ids if task_id in self.tasks]
+    
     async def execute_task(self, task_id: str, handler_name: str = "default") -> Task:
         """Execute a task with parallel chunk processing"""
         if task_id not in self.tasks:
             raise ValueError(f"Task {task_id} not found")
         
         task = self.tasks[task_id]
-        handler = self._handlers.get(handler_name, self._default_handler)
+        handler = self._resolve_handler(task, handler_name)
         
-        task.status = TaskStatus.RUNNING
-        task.started_at = time.time()
+        results, feed = self._begin_run(task)
         
-        if task.parallel_mode and len(task.chunks) > 1:
-            # Execute chunks in parallel
-            dependency_graph = {
-                c.id: c.dependencies for c in task.chunks
-            }
-            results = await self.executor.execute_parallel(
-                task.chunks, handler, dependency_graph
-            )
-        else:
-            # Sequential execution
-            results = {}
-            for chunk in task.chunks:
-                result = await self.executor.execute_chunk(chunk, handler, results)
-                results[chunk.id] = result
+        try:
+            if task.parallel_mode and len(task.chunks) > 1:
+                # Execute chunks in parallel
+                dependency_graph = {
+                    c.id: c.dependencies for c in task.chunks
+                }
+                await self.executor.execute_parallel(
+                    task.chunks, handler, dependency_graph, task_id=task_id, results=results
+                )
+            else:
+                # Sequential execution
+                for chunk in task.chunks:
+                    result = await self.executor.execute_chunk(chunk, handler, results, task_id)
+                    results[chunk.id] = result
+        except BaseException as e:
+            await self._finish_run(task, results, feed, error=e)
+            raise
+        
+        await self._finish_run(task, results, feed)
+        return task
+    
+    def _begin_run(self, task: Task) -> Tuple[Dict[str, Any], ResultFeed]:
+        """Move a task to RUNNING with a fresh results dict and feed"""
+        task.started_at = time.time()
+        task.completed_at = None
+        task.completed_chunks = 0
+        task.metadata.pop('error', None)
+        self._set_status(task, TaskStatus.RUNNING)
+        self.stats.chunks_scheduled(len(task.chunks))
+        self.search_index.remove_field(task.id, FIELD_RESULTS)
         
+        # Results fill in as chunks complete so they can be streamed
+        results: Dict[str, Any] = {}
         task.results = results
-        task.status = TaskStatus.COMPLETED
+        feed = self._feeds.get(task.id)
+        if feed is None:
+            feed = self._feeds[task.id] = ResultFeed()
+        return results, feed
+    
+    async def _finish_run(
+        self,
+        task: Task,
+        results: Dict[str, Any],
+        feed: ResultFeed,
+        error: Optional[BaseException] = None
+    ):
+        """Record the outcome of a run and notify subscribers"""
+        feed.close()
+        if self._feeds.get(task.id) is feed:
+            del self._feeds[task.id]
         task.completed_at = time.time()
+        self.stats.chunks_settled(len(task.chunks) - task.completed_chunks)
+        # Partial results of a failed or cancelled run count against the memory budget too
+        task.results = results
+        
+        if error is None and task.status == TaskStatus.CANCELLED:
+            # Cancelled after the last chunk finished; the cancel stands
+            error = asyncio.CancelledError()
+        if error is not None:
+            task.metadata['error'] = repr(error)
+            cancelled = isinstance(error, asyncio.CancelledError) or task.status == TaskStatus.CANCELLED
+            self._set_status(task, TaskStatus.CANCELLED if cancelled else TaskStatus.FAILED)
+            self._task_duration.observe(task.completed_at - task.created_at, task.status.name)
+            self._publish({
+                'type': 'task_failed',
+                'task_id': task.id,
+                'status': task.status.name,
+                'error': task.metadata['error'],
+                'timestamp': time.time()
+            })
+            return
+        
+        self._set_status(task, TaskStatus.COMPLETED)
+        self._task_duration.observe(task.completed_at - task.created_at, task.status.name)
         
         # Notify completion
         await self._event_queue.put({
-            'type': 'task_complete',
-            'task_id': task_id,
+            'type': 'task_completed',
+            'task_id': task.id,
+            'status': task.status.name,
+            'duration_ms': task.duration_ms,
             'timestamp': time.time()
         })
+    
+    async def stream_results(self, task_id: str) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield (chunk_id, result) pairs in completion order as they become available"""
+        if task_id not in self.tasks:
+            raise ValueError(f"Task {task_id} not found")
         
-        return task
+        task = self.tasks[task_id]
+        feed = self._feeds.get(task_id)
+        if feed is None:
+            if task.status in FINISHED_STATUSES:
+                results = task.results
+                for chunk_id in list(results):
+                    yield chunk_id, results[chunk_id]
+                return
+            # Not started yet; execute_task picks this feed up
+            feed = self._feeds[task_id] = ResultFeed()
+        
+        position = 0
+        while True:
+            while position < len(feed.items):
+                yield feed.items[position]
+                position += 1
+            if feed.closed:
+                return
+            await feed.wait()
+    
+    def submit_task(self, task_id: str, handler_name: str = "default") -> asyncio.Future:
+        """Start executing a task in the background and return its job"""
+        if task_id not in self.tasks:
+            raise ValueError(f"Task {task_id} not found")
+        job = self._jobs.get(task_id)
+        if job is not None and not job.done():
+            raise RuntimeError(f"Task {task_id} is already running")
+        if self.shared is not None:
+            # Any process sharing the store may pick the job up
+            return self.shared.submit(self.tasks[task_id], handler_name)
+        
+        job = asyncio.create_task(self._run_job(task_id, handler_name))
+        self._jobs[task_id] = job
+        return job
+    
+    async def _run_job(self, task_id: str, handler_name: str):
+        try:
+            await self.execute_task(task_id, handler_name)
+        except Exception:
+            # Failure is recorded on the task itself
+            pass
+        finally:
+            self._jobs.pop(task_id, None)
     
     def _default_handler(self, chunk: Chunk) -> Any:
         """Default chunk handler - override for custom logic"""
@@ -427,23 +1423,59 @@ class DongolEngine:
             'timestamp': time.time()
         }
     
-    def get_stats(self) -> Dict[str, Any]:
-        """Get engine statistics"""
-        total_tasks = len(self.tasks)
-        status_counts = defaultdict(int)
-        total_chunks = 0
-        
-        for task in self.tasks.values():
-            status_counts[task.status.name] += 1
-            total_chunks += len(task.chunks)
+    def _check_autoscale(self, policy: AutoscalePolicy) -> AutoscalePolicy:
+        if policy.enabled and self.executor.persistent:
+            # Resizing would change the warm pool every other engine gets too
+            raise ValueError("autoscale cannot be used with a persistent pool")
+        return policy
+    
+    async def reconfigure(self, config: Dict[str, Any]):
+        """Apply the settings that can change while running: max_workers and autoscale
         
-        return {
-            'total_tasks': total_tasks,
-            'total_chunks': total_chunks,
-            'status_distribution': dict(status_counts),
-            'avg_chunks_per_task': total_chunks / total_tasks if total_tasks > 0 else 0,
-            'engine_running': self._running
+        Anything else in config needs a new engine and is ignored here.
+        """
+        if 'autoscale' in config:
+            self.autoscaler.policy = self._check_autoscale(AutoscalePolicy.from_config(config['autoscale']))
+            if not self.autoscaler.policy.enabled and self._autoscaling is not None:
+                self._autoscaling.cancel()
+                self._autoscaling = None
+            elif self.autoscaler.policy.enabled and self._running and self._autoscaling is None:
+                self._autoscaling = asyncio.create_task(self.autoscaler.run())
+        workers = config.get('max_workers', self.executor.max_workers)
+        policy = self.autoscaler.policy
+        await self.executor.resize(policy.clamp(workers) if policy.enabled else workers)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get engine statistics (O(1) in the number of tasks)"""
+        stats = self.stats.snapshot()
+        stats['engine_running'] = self._running
+        if self._spiller is not None:
+            stats['memory'] = self._spiller.get_stats()
+        if self.retention.policy.enabled:
+            stats['retention'] = self.retention.get_stats()
+        if self.autoscaler.policy.enabled:
+            stats['autoscale'] = self.autoscaler.get_stats()
+        if self.shared is not None:
+            stats['shared'] = self.shared.get_stats()
+        if self.remote is not None:
+            stats['remote'] = self.remote.get_stats()
+        if self.queue is not None:
+            stats['queue'] = self.queue.get_stats()
+        pool_stats = self.executor.get_pool_stats()
+        if pool_stats is not None:
+            stats['pool'] = pool_stats
+        if self.broadcasts:
+            stats['broadcasts'] = self.broadcasts.get_stats()
+        routes = {
+            name: handler.profile.get_stats() if handler.profile else {'pool': handler.pool}
+            for name, handler in self._handlers.items() if isinstance(handler, RoutedHandler)
         }
+        if routes:
+            stats['routing'] = routes
+        batch_stats = self.executor.get_batch_stats()
+        if batch_stats is not None:
+            stats['batching'] = batch_stats
+        return stats
 
 
 # Singleton instance
@@ -451,9 +1483,14 @@ _engine: Optional[DongolEngine] = None
 
 
 async def get_engine(config: Optional[Dict] = None) -> DongolEngine:
-    """Get or create global engine instance"""
+    """Get or create global engine instance
+    
+    A config passed once the engine exists is applied with reconfigure().
+    """
     global _engine
     if _engine is None:
         _engine = DongolEngine(config)
         await _engine.start()
+    elif config:
+        await _engine.reconfigure(config)
     return _engine
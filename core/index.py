@@ -0,0 +1,176 @@
+"""
+DONGOL Task Index - Secondary indexes and cursor pagination
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from .engine import Priority, Task, TaskStatus
+
+
+class SortedIdSet:
+    """
+    Sorted set of ids kept as a list of bounded sorted blocks
+
+    Insertions, deletions and positioning a cursor cost O(log n) plus a
+    block-sized memmove, so paging stays flat as the set grows.
+    """
+
+    BLOCK_SIZE = 512
+
+    def __init__(self):
+        self._blocks: List[List[str]] = []
+        self._maxes: List[str] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, key: str) -> bool:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return False
+        block = self._blocks[i]
+        j = bisect_left(block, key)
+        return j < len(block) and block[j] == key
+
+    def add(self, key: str):
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            return
+
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+        block = self._blocks[i]
+        j = bisect_left(block, key)
+        if j < len(block) and block[j] == key:
+            return
+        block.insert(j, key)
+        self._maxes[i] = block[-1]
+        self._len += 1
+
+        if len(block) > 2 * self.BLOCK_SIZE:
+            half = len(block) // 2
+            self._blocks[i:i + 1] = [block[:half], block[half:]]
+            self._maxes[i:i + 1] = [block[half - 1], block[-1]]
+
+    def discard(self, key: str):
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return
+        block = self._blocks[i]
+        j = bisect_left(block, key)
+        if j == len(block) or block[j] != key:
+            return
+        del block[j]
+        self._len -= 1
+        if block:
+            self._maxes[i] = block[-1]
+        else:
+            del self._blocks[i]
+            del self._maxes[i]
+
+    def iter_from(self, after: Optional[str] = None, reverse: bool = False) -> Iterator[str]:
+        """Iterate ids strictly after (or before, when reversed) a cursor key"""
+        blocks = self._blocks
+        if not blocks:
+            return
+        if not reverse:
+            if after is None:
+                i, j = 0, 0
+            else:
+                i = bisect_right(self._maxes, after)
+                j = bisect_right(blocks[i], after) if i < len(blocks) else 0
+            while i < len(blocks):
+                block = blocks[i]
+                yield from block[j:]
+                i, j = i + 1, 0
+        else:
+            if after is None:
+                i = len(blocks) - 1
+                j = len(blocks[i])
+            else:
+                i = bisect_left(self._maxes, after)
+                if i == len(blocks):
+                    i -= 1
+                    j = len(blocks[i])
+                else:
+                    j = bisect_left(blocks[i], after)
+            while i >= 0:
+                block = blocks[i]
+                for k in range(j - 1, -1, -1):
+                    yield block[k]
+                i -= 1
+                j = len(blocks[i]) if i >= 0 else 0
+
+
+def encode_cursor(task_id: str) -> str:
+    """Opaque pagination cursor for a task id"""
+    return base64.urlsafe_b64encode(task_id.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> str:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return base64.urlsafe_b64decode(padded.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+class TaskIndex:
+    """
+    Engine-maintained secondary indexes over the task table
+
+    Task ids are time ordered, so ordering by id is ordering by creation
+    time and one sorted set per status/priority answers "newest N tasks
+    with status X" without scanning.
+    """
+
+    def __init__(self):
+        self.all = SortedIdSet()
+        self.by_status: Dict['TaskStatus', SortedIdSet] = defaultdict(SortedIdSet)
+        self.by_priority: Dict['Priority', SortedIdSet] = defaultdict(SortedIdSet)
+
+    def add(self, task: 'Task'):
+        self.all.add(task.id)
+        self.by_status[task.status].add(task.id)
+        self.by_priority[task.priority].add(task.id)
+
+    def remove(self, task: 'Task'):
+        self.all.discard(task.id)
+        self.by_status[task.status].discard(task.id)
+        self.by_priority[task.priority].discard(task.id)
+
+    def status_changed(self, task: 'Task', old: 'TaskStatus'):
+        self.by_status[old].discard(task.id)
+        self.by_status[task.status].add(task.id)
+
+    def query(
+        self,
+        status: Optional['TaskStatus'] = None,
+        priority: Optional['Priority'] = None,
+        after: Optional[str] = None,
+        newest_first: bool = False,
+    ) -> Iterator[str]:
+        """Iterate matching task ids in creation order, starting after a cursor key"""
+        candidates = [self.all]
+        if status is not None:
+            candidates.append(self.by_status.get(status, SortedIdSet()))
+        if priority is not None:
+            candidates.append(self.by_priority.get(priority, SortedIdSet()))
+
+        # Drive the scan from the smallest index, probe the others
+        candidates.sort(key=len)
+        driver, others = candidates[0], candidates[1:]
+        for task_id in driver.iter_from(after, reverse=newest_first):
+            if all(task_id in other for other in others if other is not self.all):
+                yield task_id
@@ -0,0 +1,243 @@
+"""
+DONGOL Metrics - Lock-free collectors with Prometheus text exposition
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[Dict[str, str], float]
+
+# Seconds; covers sub-millisecond handler calls up to multi-minute tasks
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Sharded:
+    """
+    Base for collectors that keep one accumulator per thread
+
+    Observing only touches the calling thread's shard, so the hot path
+    takes no lock. Shards are registered once per thread and merged when
+    the metric is scraped; a scrape may see an observation half applied,
+    which is fine for monitoring.
+    """
+
+    metric_type = ''
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, Any]] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> Dict[LabelValues, Any]:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _entries(self) -> Iterable[Tuple[LabelValues, Any]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            yield from list(shard.items())
+
+    def _labels(self, values: LabelValues, **extra: str) -> Dict[str, str]:
+        labels = dict(zip(self.label_names, values))
+        labels.update(extra)
+        return labels
+
+
+class Counter(_Sharded):
+    """Monotonic counter"""
+
+    metric_type = 'counter'
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        shard = self._shard()
+        shard[label_values] = shard.get(label_values, 0.0) + amount
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        totals: Dict[LabelValues, float] = {}
+        for key, value in self._entries():
+            totals[key] = totals.get(key, 0.0) + value
+        return [(self.name, self._labels(key), value) for key, value in sorted(totals.items())]
+
+
+class Histogram(_Sharded):
+    """Cumulative histogram with fixed bucket bounds"""
+
+    metric_type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *label_values: str):
+        shard = self._shard()
+        entry = shard.get(label_values)
+        if entry is None:
+            # [per-bucket counts..., +Inf count], sum
+            entry = shard[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        merged: Dict[LabelValues, List[Any]] = {}
+        for key, (counts, total) in self._entries():
+            acc = merged.get(key)
+            if acc is None:
+                acc = merged[key] = [[0] * len(counts), 0.0]
+            acc[0] = [a + b for a, b in zip(acc[0], counts)]
+            acc[1] += total
+
+        out: List[Tuple[str, Dict[str, str], float]] = []
+        for key, (counts, total) in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = '+Inf' if bound == math.inf else _format_value(bound)
+                out.append((f'{self.name}_bucket', self._labels(key, le=le), cumulative))
+            out.append((f'{self.name}_sum', self._labels(key), total))
+            out.append((f'{self.name}_count', self._labels(key), cumulative))
+        return out
+
+
+class CallbackMetric:
+    """Gauge or counter whose samples are read from a callback at scrape time"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Iterable[Sample]],
+        metric_type: str = 'gauge'
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.metric_type = metric_type
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        return [(self.name, labels, value) for labels, value in self.callback()]
+
+
+class MetricsRegistry:
+    """
+    Named collection of metrics rendered in the Prometheus text format
+    """
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def _register(self, metric: Any) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], Any]) -> CallbackMetric:
+        """Gauge read from a callback returning a number or (labels, value) samples"""
+        def samples() -> Iterable[Sample]:
+            value = callback()
+            if isinstance(value, (int, float)):
+                return [({}, value)]
+            return value
+        return self._register(CallbackMetric(name, documentation, samples, 'gauge'))
+
+    def callback_counter(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Iterable[Sample]]
+    ) -> CallbackMetric:
+        """Counter whose totals are kept elsewhere and read at scrape time"""
+        return self._register(CallbackMetric(name, documentation, callback, 'counter'))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.metric_type}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop responsiveness
+
+    Sleeps for a fixed interval and records how late it woke up. A busy
+    or blocked loop shows up as lag long before requests start timing out.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.lag = 0.0
+        self.max_lag = 0.0
+
+    async def run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, time.perf_counter() - expected)
+            self.max_lag = max(self.max_lag, self.lag)
+
+
+def timed_call(handler: Callable[..., Any], *args: Any) -> Tuple[Any, float, float]:
+    """Run a handler, returning (result, start, end) perf_counter stamps"""
+    started = time.perf_counter()
+    result = handler(*args)
+    return result, started, time.perf_counter()
+
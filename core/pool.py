@@ -0,0 +1,523 @@
+"""
+DONGOL Pool - Work-stealing process pool and warm preloaded pools
+"""
+from __future__ import annotations
+
+import atexit
+import importlib
+import itertools
+import multiprocessing
+import os
+import random
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from .affinity import AffinityPlan, pin
+
+# Priority levels match core.engine.Priority values; lower runs first
+PRIORITY_LEVELS = 5
+DEFAULT_PRIORITY = 2
+
+# Handlers preloaded into this process, by name
+_HANDLERS: Dict[str, Callable[[Any], Any]] = {}
+
+
+def load_handlers(modules: Iterable[str] = (), handlers: Optional[Dict[str, str]] = None) -> Dict[str, Callable[[Any], Any]]:
+    """Import modules exposing a HANDLERS dict and name: 'module:function' specs"""
+    found: Dict[str, Callable[[Any], Any]] = {}
+    for module_name in modules:
+        found.update(getattr(importlib.import_module(module_name), 'HANDLERS', None) or {})
+    for name, target in (handlers or {}).items():
+        module_name, _, attr = target.partition(':')
+        if not module_name or not attr:
+            raise ValueError(f"Expected module:function for handler {name}, got {target}")
+        found[name] = getattr(importlib.import_module(module_name), attr)
+    return found
+
+
+def preload(modules: Iterable[str] = (), handlers: Optional[Dict[str, str]] = None):
+    """Worker initializer: import handler modules and register them by name"""
+    _HANDLERS.update(load_handlers(modules, handlers))
+
+
+class PreloadedHandler:
+    """
+    Stand-in for a handler preloaded in the worker processes
+
+    Pickles as just the handler name, so a chunk's trip to a worker
+    carries the name and the payload instead of the function.
+    """
+
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __call__(self, chunk: Any) -> Any:
+        return _HANDLERS[self.name](chunk)
+
+    def __reduce__(self):
+        return PreloadedHandler, (self.name,)
+
+
+def _rss_mb() -> float:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        # Peak rather than current RSS, but the best available without /proc
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _worker_main(
+    conn: Connection,
+    cpus: Optional[Set[int]],
+    initializer: Optional[Callable[..., Any]],
+    initargs: Tuple[Any, ...],
+    max_tasks: Optional[int],
+    max_memory_mb: Optional[float]
+):
+    if cpus:
+        pin(cpus)
+    if initializer is not None:
+        initializer(*initargs)
+    done = 0
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        fn, args, kwargs = job
+        try:
+            ok, value = True, fn(*args, **kwargs)
+        except BaseException as e:
+            ok, value = False, e
+        done += 1
+        # Retire after this job; the parent starts a fresh worker in its place
+        retiring = bool(
+            (max_tasks and done >= max_tasks) or (max_memory_mb and _rss_mb() > max_memory_mb)
+        )
+        try:
+            conn.send((ok, value, retiring))
+        except Exception as e:
+            # Result or exception could not be pickled
+            conn.send((False, RuntimeError(f"Unpicklable result: {e!r}"), retiring))
+        if retiring:
+            return
+
+
+class _Item:
+    __slots__ = ('future', 'level', 'fn', 'args', 'kwargs')
+
+    def __init__(self, future: Future, level: int, fn: Callable[..., Any], args: tuple,
+                 kwargs: Dict[str, Any]):
+        self.future = future
+        self.level = level
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+
+class _Worker:
+    def __init__(self, index: int, context: Any, options: Tuple[Any, ...],
+                 socket: int = 0, cpus: Optional[Set[int]] = None):
+        self.index = index
+        self.context = context
+        self.options = options
+        self.socket = socket
+        self.cpus = cpus
+        # One deque per priority level
+        self.queues: List[Deque[_Item]] = [deque() for _ in range(PRIORITY_LEVELS)]
+        self.current: Optional[_Item] = None
+        self.executed = 0
+        self.stolen = 0
+        self.recycled = 0
+        # Set once resize() drops the worker; it finishes its current job and exits
+        self.removed = False
+        self.spawn()
+
+    def spawn(self):
+        self.conn, child = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker_main, args=(child, self.cpus, *self.options),
+            name=f'dongol-stealing-{self.index}', daemon=True
+        )
+        self.process.start()
+        child.close()
+
+    def queued(self) -> int:
+        return sum(len(q) for q in self.queues)
+
+    def pop_local(self) -> Optional[_Item]:
+        for queue in self.queues:
+            if queue:
+                return queue.popleft()
+        return None
+
+    def steal(self) -> Optional[_Item]:
+        # Thieves take from the far end, away from what the owner runs next
+        for queue in self.queues:
+            if queue:
+                return queue.pop()
+        return None
+
+
+class StealingPool(Executor):
+    """
+    Process pool with a deque per worker and randomized work stealing
+
+    Submissions are spread round robin over the workers' deques; work
+    submitted for a specific worker (a chunk whose dependency ran there)
+    goes to the front of that worker's deque so it runs next. An idle
+    worker first drains its own deque, highest priority first, and then
+    steals from the back of a randomly chosen busy worker, so a backlog
+    of long chunks behind one worker is picked apart by the idle ones
+    instead of waiting in line.
+
+    The deques live in the parent; a scheduler thread hands each worker
+    one job at a time over its own pipe and collects the results. Workers
+    run initializer once at start and retire after max_tasks_per_child
+    jobs or once their RSS passes max_memory_mb, and are replaced. A
+    worker that dies while idle is replaced too, before it is sent a job.
+
+    With an AffinityPlan each worker is pinned to its CPUs, and idle
+    workers steal from workers on their own socket before crossing to
+    another one. resize() adds or drops workers while the pool runs.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        mp_context: Any = None,
+        seed: Optional[int] = None,
+        initializer: Optional[Callable[..., Any]] = None,
+        initargs: Tuple[Any, ...] = (),
+        max_tasks_per_child: Optional[int] = None,
+        max_memory_mb: Optional[float] = None,
+        affinity: Optional[AffinityPlan] = None
+    ):
+        self.max_workers = max_workers
+        self.affinity = affinity
+        self._context = mp_context or multiprocessing.get_context()
+        self._options = (initializer, initargs, max_tasks_per_child, max_memory_mb)
+        self._workers = [self._new_worker(index) for index in range(max_workers)]
+        # Dropped by resize(): still finishing a job, or told to exit
+        self._retiring: List[_Worker] = []
+        self._stopped: List[_Worker] = []
+        self._index_sockets()
+        self._lock = threading.Lock()
+        self._wake_reader, self._wake_writer = self._context.Pipe(duplex=False)
+        self._round_robin = itertools.count()
+        self._random = random.Random(seed)
+        self._shutdown = False
+        self._scheduler = threading.Thread(target=self._schedule, name='dongol-stealing', daemon=True)
+        self._scheduler.start()
+
+    def _new_worker(self, index: int) -> _Worker:
+        if self.affinity is None:
+            return _Worker(index, self._context, self._options)
+        return _Worker(index, self._context, self._options,
+                       self.affinity.sockets[index % len(self.affinity)], self.affinity.for_worker(index))
+
+    def _index_sockets(self):
+        sockets: Dict[int, List[_Worker]] = {}
+        for worker in self._workers:
+            sockets.setdefault(worker.socket, []).append(worker)
+        self._sockets = sockets
+        self._socket_round_robin = {socket: itertools.count() for socket in sockets}
+
+    def resize(self, max_workers: int, affinity: Optional[AffinityPlan] = None):
+        """Grow or shrink the pool while it runs
+
+        Workers are added and dropped at the end. A dropped worker's
+        queued jobs move to the workers that stay, and a busy one exits
+        after finishing its current job. affinity places added workers.
+        """
+        max_workers = max(1, max_workers)
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot resize after shutdown")
+            if affinity is not None:
+                self.affinity = affinity
+            for index in range(len(self._workers), max_workers):
+                self._workers.append(self._new_worker(index))
+            removed = self._workers[max_workers:]
+            del self._workers[max_workers:]
+            self.max_workers = max_workers
+            for worker in removed:
+                worker.removed = True
+                for level, queue in enumerate(worker.queues):
+                    while queue:
+                        target = self._workers[next(self._round_robin) % max_workers]
+                        target.queues[level].append(queue.popleft())
+                if worker.current is None:
+                    self._stop_worker(worker)
+                else:
+                    self._retiring.append(worker)
+            self._index_sockets()
+        self._wake()
+
+    def _stop_worker(self, worker: _Worker):
+        try:
+            worker.conn.send(None)
+        except OSError:
+            pass
+        # is_alive() reaps the ones that already exited
+        self._stopped = [w for w in self._stopped if w.process.is_alive()] + [worker]
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        return self.submit_to(None, DEFAULT_PRIORITY, fn, *args, **kwargs)
+
+    def submit_to(
+        self,
+        worker: Optional[int],
+        priority: int,
+        fn: Callable[..., Any],
+        /,
+        *args: Any,
+        **kwargs: Any
+    ) -> Future:
+        """Submit to a worker's deque (or round robin when worker is None)
+
+        The returned future gets a ``worker`` attribute naming the worker
+        that ran it, for placing follow-up work.
+        """
+        if worker is None:
+            return self._push(self._workers[next(self._round_robin) % self.max_workers],
+                              priority, False, fn, args, kwargs)
+        return self._push(self._workers[worker % self.max_workers], priority, True, fn, args, kwargs)
+
+    def submit_near(
+        self,
+        key: Hashable,
+        priority: int,
+        fn: Callable[..., Any],
+        /,
+        *args: Any,
+        **kwargs: Any
+    ) -> Future:
+        """Submit round robin over the workers of the socket key hashes to
+
+        Work sharing a key (a task, a broadcast value) stays on one
+        socket, so it shares that socket's caches and memory.
+        """
+        sockets = list(self._sockets)
+        socket = sockets[hash(key) % len(sockets)]
+        members = self._sockets[socket]
+        worker = members[next(self._socket_round_robin[socket]) % len(members)]
+        return self._push(worker, priority, False, fn, args, kwargs)
+
+    def _push(self, worker: _Worker, priority: int, front: bool, fn: Callable[..., Any],
+              args: tuple, kwargs: Dict[str, Any]) -> Future:
+        future: Future = Future()
+        level = min(max(priority, 0), PRIORITY_LEVELS - 1)
+        item = _Item(future, level, fn, args, kwargs)
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            if worker.removed:
+                # Picked just before a resize dropped it
+                worker = self._workers[next(self._round_robin) % self.max_workers]
+            queue = worker.queues[level]
+            if front:
+                queue.appendleft(item)
+            else:
+                queue.append(item)
+        self._wake()
+        return future
+
+    def _wake(self):
+        try:
+            self._wake_writer.send_bytes(b'')
+        except OSError:
+            pass
+
+    def _next_item(self, worker: _Worker) -> Optional[_Item]:
+        item = worker.pop_local()
+        if item is not None:
+            return item
+        victims = [w for w in self._workers if w is not worker and w.queued()]
+        self._random.shuffle(victims)
+        # Same-socket victims first; the sort is stable, so order within each group stays random
+        victims.sort(key=lambda w: w.socket != worker.socket)
+        for victim in victims:
+            item = victim.steal()
+            if item is not None:
+                worker.stolen += 1
+                return item
+        return None
+
+    def _respawn(self, worker: _Worker):
+        # Caller holds the lock and has joined the old process
+        worker.conn.close()
+        worker.recycled += 1
+        worker.spawn()
+
+    def _dispatch(self):
+        with self._lock:
+            for worker in self._workers:
+                respawned = False
+                while worker.current is None:
+                    item = self._next_item(worker)
+                    if item is None:
+                        break
+                    # A job put back after a failed send is already running
+                    if not item.future.running() and not item.future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        worker.conn.send((item.fn, item.args, item.kwargs))
+                    except OSError as e:
+                        if respawned:
+                            item.future.set_exception(e)
+                            continue
+                        # The worker died while idle: replace it and retry the job there
+                        worker.queues[item.level].appendleft(item)
+                        worker.process.join()
+                        self._respawn(worker)
+                        respawned = True
+                        continue
+                    except Exception as e:
+                        item.future.set_exception(e)
+                        continue
+                    item.future.worker = worker.index
+                    worker.current = item
+
+    def _idle(self) -> bool:
+        return not self._retiring and all(w.current is None and not w.queued() for w in self._workers)
+
+    def _schedule(self):
+        while True:
+            self._dispatch()
+            with self._lock:
+                if self._shutdown and self._idle():
+                    break
+                busy = {w.conn: w for w in self._workers + self._retiring if w.current is not None}
+                # Watch idle workers too, so one that dies is replaced before it gets a job
+                idle = {w.process.sentinel: w for w in self._workers if w.current is None}
+            for ready in wait(list(busy) + list(idle) + [self._wake_reader]):
+                if ready is self._wake_reader:
+                    self._wake_reader.recv_bytes()
+                    continue
+                if ready in idle:
+                    worker = idle[ready]
+                    worker.process.join()
+                    with self._lock:
+                        if not worker.removed and worker.current is None:
+                            self._respawn(worker)
+                    continue
+                worker = busy[ready]
+                try:
+                    ok, value, retiring = ready.recv()
+                except (EOFError, OSError):
+                    ok, value, retiring = False, BrokenProcessPool(
+                        f"Worker process {worker.index} died while running a job"
+                    ), True
+                if retiring:
+                    worker.process.join()
+                # One locked step, so resize() sees the worker either busy
+                # (and retires it here) or idle (and stops it itself)
+                with self._lock:
+                    item, worker.current = worker.current, None
+                    worker.executed += 1
+                    if worker.removed:
+                        self._retiring.remove(worker)
+                        self._stop_worker(worker)
+                    elif retiring:
+                        self._respawn(worker)
+                if ok:
+                    item.future.set_result(value)
+                else:
+                    item.future.set_exception(value)
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                for worker in self._workers:
+                    for queue in worker.queues:
+                        while queue:
+                            queue.pop().future.cancel()
+        self._wake()
+        if wait:
+            self._scheduler.join()
+            for worker in self._workers + self._stopped:
+                worker.process.join()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'workers': [
+                    {'queued': w.queued(), 'busy': w.current is not None,
+                     'executed': w.executed, 'stolen': w.stolen, 'recycled': w.recycled,
+                     'socket': w.socket}
+                    for w in self._workers
+                ],
+                'steals': sum(w.stolen for w in self._workers),
+                'recycled': sum(w.recycled for w in self._workers),
+            }
+
+
+# Warm pools outlive engine restarts; one per distinct configuration
+_warm_pools: Dict[Tuple[Any, ...], StealingPool] = {}
+_warm_lock = threading.Lock()
+
+
+def warm_pool(
+    max_workers: int,
+    preload_modules: Iterable[str] = (),
+    handlers: Optional[Dict[str, str]] = None,
+    max_tasks_per_worker: Optional[int] = None,
+    max_memory_mb: Optional[float] = None,
+    affinity: Optional[AffinityPlan] = None
+) -> StealingPool:
+    """
+    Get or start the persistent pool for this configuration
+
+    Handler modules are imported here first, so forked workers start with
+    them already loaded, and each worker runs preload() to register them
+    by name. The pool is shared by every engine in the process and shut
+    down at exit.
+    """
+    modules = tuple(preload_modules)
+    specs = dict(handlers or {})
+    pinning = tuple(map(frozenset, affinity.cpus)) if affinity is not None else None
+    key = (max_workers, modules, tuple(sorted(specs.items())), max_tasks_per_worker, max_memory_mb, pinning)
+    with _warm_lock:
+        pool = _warm_pools.get(key)
+        if pool is None:
+            preload(modules, specs)
+            pool = _warm_pools[key] = StealingPool(
+                max_workers,
+                initializer=preload,
+                initargs=(modules, specs),
+                max_tasks_per_child=max_tasks_per_worker or None,
+                max_memory_mb=max_memory_mb or None,
+                affinity=affinity
+            )
+        return pool
+
+
+def preloaded(name: str) -> bool:
+    """Whether a handler of this name was preloaded for a warm pool"""
+    return name in _HANDLERS
+
+
+@atexit.register
+def shutdown_warm_pools():
+    with _warm_lock:
+        pools = list(_warm_pools.values())
+        _warm_pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
@@ -0,0 +1,812 @@
+"""
+DONGOL Queue - Pluggable work queues between an engine and a fleet of workers
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from urllib.parse import unquote, urlparse
+
+from .remote import RemoteHandlerError, _run_handler
+
+
+class QueueError(RuntimeError):
+    """The queue backend refused or failed a request"""
+
+
+@dataclass
+class QueueMessage:
+    id: str
+    payload: bytes
+    attempts: int
+
+
+class QueueBackend(ABC):
+    """
+    Named message queues with visibility timeouts
+
+    A reserved message stays hidden from other consumers until its
+    visibility timeout runs out; if it has not been acked by then it is
+    delivered again. Delivery is therefore at least once, and consumers
+    must tolerate seeing a message twice. Enqueueing an id that is still
+    queued is a no-op, which makes re-sending after a failure safe.
+    """
+
+    @abstractmethod
+    def enqueue(self, queue: str, messages: Sequence[Tuple[str, bytes]]) -> int:
+        """Add (id, payload) messages in one batch; returns how many were new"""
+
+    @abstractmethod
+    def reserve(self, queue: str, max_messages: int, visibility_timeout: float) -> List[QueueMessage]:
+        """Take up to max_messages deliverable messages, hiding them for visibility_timeout"""
+
+    @abstractmethod
+    def ack(self, queue: str, ids: Sequence[str]):
+        """Delete handled messages"""
+
+    @abstractmethod
+    def extend(self, queue: str, ids: Sequence[str], visibility_timeout: float):
+        """Keep reserved messages hidden for another visibility_timeout"""
+
+    @abstractmethod
+    def size(self, queue: str) -> int:
+        """Messages queued or reserved but not yet acked"""
+
+    def close(self):
+        pass
+
+
+class MemoryQueue(QueueBackend):
+    """
+    In-process backend, for tests and for workers running inside the engine process
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # queue -> id -> [payload, due, attempts]; due is the lease deadline once reserved
+        self._messages: Dict[str, Dict[str, List[Any]]] = {}
+        self._ready: Dict[str, Deque[str]] = {}
+        self._leases: Dict[str, List[Tuple[float, str]]] = {}
+
+    def enqueue(self, queue: str, messages: Sequence[Tuple[str, bytes]]) -> int:
+        now = time.time()
+        added = 0
+        with self._lock:
+            stored = self._messages.setdefault(queue, {})
+            ready = self._ready.setdefault(queue, deque())
+            for message_id, payload in messages:
+                if message_id not in stored:
+                    stored[message_id] = [payload, now, 0]
+                    ready.append(message_id)
+                    added += 1
+        return added
+
+    def reserve(self, queue: str, max_messages: int, visibility_timeout: float) -> List[QueueMessage]:
+        now = time.time()
+        deadline = now + visibility_timeout
+        out: List[QueueMessage] = []
+        with self._lock:
+            stored = self._messages.get(queue)
+            if not stored:
+                return out
+            ready = self._ready[queue]
+            leases = self._leases.setdefault(queue, [])
+            expired: List[str] = []
+            while leases and leases[0][0] <= now:
+                due, message_id = heapq.heappop(leases)
+                entry = stored.get(message_id)
+                # Skip leases that were acked or extended since
+                if entry is not None and entry[1] == due:
+                    expired.append(message_id)
+            # Redeliveries go first; they have waited longest
+            ready.extendleft(reversed(expired))
+            while ready and len(out) < max_messages:
+                message_id = ready.popleft()
+                entry = stored.get(message_id)
+                if entry is None:
+                    continue
+                entry[1] = deadline
+                entry[2] += 1
+                heapq.heappush(leases, (deadline, message_id))
+                out.append(QueueMessage(message_id, entry[0], entry[2]))
+        return out
+
+    def ack(self, queue: str, ids: Sequence[str]):
+        with self._lock:
+            stored = self._messages.get(queue, {})
+            for message_id in ids:
+                stored.pop(message_id, None)
+
+    def extend(self, queue: str, ids: Sequence[str], visibility_timeout: float):
+        deadline = time.time() + visibility_timeout
+        with self._lock:
+            stored = self._messages.get(queue, {})
+            leases = self._leases.setdefault(queue, [])
+            for message_id in ids:
+                entry = stored.get(message_id)
+                if entry is not None and entry[2] > 0:
+                    entry[1] = deadline
+                    heapq.heappush(leases, (deadline, message_id))
+
+    def size(self, queue: str) -> int:
+        with self._lock:
+            return len(self._messages.get(queue, {}))
+
+
+_QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue_messages (
+    queue TEXT NOT NULL,
+    id TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    due REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (queue, id)
+);
+CREATE INDEX IF NOT EXISTS queue_messages_by_due ON queue_messages (queue, due);
+"""
+
+
+class SQLiteQueue(QueueBackend):
+    """
+    Backend in a SQLite file, for workers on one machine
+
+    A message's due time is when it may next be delivered: the enqueue
+    time, then the lease deadline once reserved. Reserving is one
+    select-and-update transaction, so two processes never take the same
+    message while its lease is live. Database errors (a lock held past
+    timeout) are raised as QueueError, like an unreachable Redis.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._lock:
+            self._conn.executescript(_QUEUE_SCHEMA)
+
+    def _transaction(self, work: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._lock:
+            try:
+                self._conn.execute('BEGIN IMMEDIATE')
+                result = work(self._conn)
+                self._conn.execute('COMMIT')
+                return result
+            except BaseException as e:
+                # COMMIT can fail too, leaving the transaction open
+                if self._conn.in_transaction:
+                    self._conn.execute('ROLLBACK')
+                if isinstance(e, sqlite3.Error):
+                    raise QueueError(f"Queue database unavailable: {e}") from e
+                raise
+
+    def enqueue(self, queue: str, messages: Sequence[Tuple[str, bytes]]) -> int:
+        now = time.time()
+
+        def work(conn: sqlite3.Connection) -> int:
+            before = conn.total_changes
+            conn.executemany(
+                'INSERT OR IGNORE INTO queue_messages (queue, id, payload, due) VALUES (?, ?, ?, ?)',
+                [(queue, message_id, payload, now) for message_id, payload in messages]
+            )
+            return conn.total_changes - before
+
+        return self._transaction(work)
+
+    def reserve(self, queue: str, max_messages: int, visibility_timeout: float) -> List[QueueMessage]:
+        now = time.time()
+        deadline = now + visibility_timeout
+
+        def work(conn: sqlite3.Connection) -> List[QueueMessage]:
+            rows = conn.execute(
+                'SELECT id, payload, attempts FROM queue_messages WHERE queue = ? AND due <= ? '
+                'ORDER BY due, id LIMIT ?',
+                (queue, now, max_messages)
+            ).fetchall()
+            conn.executemany(
+                'UPDATE queue_messages SET due = ?, attempts = attempts + 1 WHERE queue = ? AND id = ?',
+                [(deadline, queue, message_id) for message_id, _, _ in rows]
+            )
+            return [QueueMessage(message_id, payload, attempts + 1) for message_id, payload, attempts in rows]
+
+        return self._transaction(work)
+
+    def ack(self, queue: str, ids: Sequence[str]):
+        self._transaction(lambda conn: conn.executemany(
+            'DELETE FROM queue_messages WHERE queue = ? AND id = ?',
+            [(queue, message_id) for message_id in ids]
+        ))
+
+    def extend(self, queue: str, ids: Sequence[str], visibility_timeout: float):
+        deadline = time.time() + visibility_timeout
+        self._transaction(lambda conn: conn.executemany(
+            'UPDATE queue_messages SET due = ? WHERE queue = ? AND id = ? AND attempts > 0',
+            [(deadline, queue, message_id) for message_id in ids]
+        ))
+
+    def size(self, queue: str) -> int:
+        with self._lock:
+            try:
+                (count,) = self._conn.execute(
+                    'SELECT COUNT(*) FROM queue_messages WHERE queue = ?', (queue,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                raise QueueError(f"Queue database unavailable: {e}") from e
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _encode_command(args: Sequence[Any]) -> bytes:
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        elif isinstance(arg, float):
+            data = repr(arg).encode()
+        else:
+            data = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+    return b''.join(parts)
+
+
+class _RespConnection:
+    """Minimal client for the Redis serialization protocol (RESP2)"""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile('rb')
+
+    def pipeline(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        """Send commands in one write and read every reply; error replies are returned"""
+        self._sock.sendall(b''.join(_encode_command(command) for command in commands))
+        return [self._read() for _ in commands]
+
+    def execute(self, *args: Any) -> Any:
+        reply = self.pipeline([args])[0]
+        if isinstance(reply, QueueError):
+            raise reply
+        return reply
+
+    def _read(self) -> Any:
+        line = self._file.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError("Connection closed by the queue server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            return QueueError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._file.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connection closed by the queue server")
+            return data[:-2]
+        if kind == b'*':
+            length = int(rest)
+            if length < 0:
+                return None
+            return [self._read() for _ in range(length)]
+        raise QueueError(f"Unexpected reply from the queue server: {line!r}")
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+
+def _check(replies: Iterable[Any]):
+    for reply in replies:
+        if isinstance(reply, QueueError):
+            raise reply
+
+
+class RedisQueue(QueueBackend):
+    """
+    Backend on any server speaking the Redis protocol
+
+    Each queue is three keys: a sorted set of ids scored by due time, a
+    hash of payloads and a hash of delivery counts. Writes are MULTI/EXEC
+    transactions sent as one pipelined write. Reserving watches the due
+    set, so when two consumers race for the same messages one of them
+    sees its transaction aborted and tries again.
+    """
+
+    def __init__(
+        self,
+        host: str = 'localhost',
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        timeout: float = 10.0,
+        max_retries: int = 20
+    ):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._conn: Optional[_RespConnection] = None
+
+    @classmethod
+    def from_url(cls, url: str) -> 'RedisQueue':
+        parsed = urlparse(url)
+        db = parsed.path.strip('/')
+        return cls(
+            host=parsed.hostname or 'localhost',
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=unquote(parsed.password) if parsed.password else None
+        )
+
+    def _connection(self) -> _RespConnection:
+        if self._conn is None:
+            conn = _RespConnection(self.host, self.port, self.timeout)
+            try:
+                if self.password:
+                    conn.execute('AUTH', self.password)
+                if self.db:
+                    conn.execute('SELECT', self.db)
+            except BaseException:
+                conn.close()
+                raise
+            self._conn = conn
+        return self._conn
+
+    def _pipeline(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        with self._lock:
+            return self._pipeline_locked(commands)
+
+    def _pipeline_locked(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        # Caller holds self._lock
+        try:
+            replies = self._connection().pipeline(commands)
+        except (OSError, ConnectionError) as e:
+            # The connection may be mid-transaction; start over on the next call
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            raise QueueError(f"Queue server unavailable: {e}") from e
+        _check(replies)
+        return replies
+
+    @staticmethod
+    def _keys(queue: str) -> Tuple[str, str, str]:
+        return f'{queue}:due', f'{queue}:body', f'{queue}:attempts'
+
+    def enqueue(self, queue: str, messages: Sequence[Tuple[str, bytes]]) -> int:
+        if not messages:
+            return 0
+        due, body, _ = self._keys(queue)
+        now = time.time()
+        zadd: List[Any] = ['ZADD', due, 'NX']
+        hset: List[Any] = ['HSET', body]
+        for message_id, payload in messages:
+            zadd += [now, message_id]
+            hset += [message_id, payload]
+        replies = self._pipeline([('MULTI',), hset, zadd, ('EXEC',)])
+        _check(replies[-1])
+        return replies[-1][1]
+
+    def reserve(self, queue: str, max_messages: int, visibility_timeout: float) -> List[QueueMessage]:
+        due, body, attempts = self._keys(queue)
+        for _ in range(self.max_retries):
+            now = time.time()
+            with self._lock:
+                # WATCH and the read must share the transaction's connection
+                ids = self._pipeline_locked([
+                    ('WATCH', due),
+                    ('ZRANGEBYSCORE', due, '-inf', now, 'LIMIT', 0, max_messages),
+                ])[1]
+                if not ids:
+                    self._pipeline_locked([('UNWATCH',)])
+                    return []
+                deadline = now + visibility_timeout
+                zadd: List[Any] = ['ZADD', due, 'XX']
+                for message_id in ids:
+                    zadd += [deadline, message_id]
+                replies = self._pipeline_locked(
+                    [('MULTI',), zadd]
+                    + [('HINCRBY', attempts, message_id, 1) for message_id in ids]
+                    + [('HMGET', body, *ids), ('EXEC',)]
+                )
+            result = replies[-1]
+            if result is None:
+                # Another client changed the queue between WATCH and EXEC
+                continue
+            _check(result)
+            counts, payloads = result[1:-1], result[-1]
+            return [
+                QueueMessage(message_id.decode(), payload, count)
+                for message_id, payload, count in zip(ids, payloads, counts)
+                if payload is not None
+            ]
+        return []
+
+    def ack(self, queue: str, ids: Sequence[str]):
+        if not ids:
+            return
+        due, body, attempts = self._keys(queue)
+        self._pipeline([
+            ('MULTI',), ('ZREM', due, *ids), ('HDEL', body, *ids), ('HDEL', attempts, *ids), ('EXEC',)
+        ])
+
+    def extend(self, queue: str, ids: Sequence[str], visibility_timeout: float):
+        if not ids:
+            return
+        due, _, _ = self._keys(queue)
+        deadline = time.time() + visibility_timeout
+        command: List[Any] = ['ZADD', due, 'XX']
+        for message_id in ids:
+            command += [deadline, message_id]
+        self._pipeline([command])
+
+    def size(self, queue: str) -> int:
+        return self._pipeline([('ZCARD', self._keys(queue)[0])])[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_memory_queues: Dict[str, MemoryQueue] = {}
+_memory_lock = threading.Lock()
+
+
+def open_queue(url: str) -> QueueBackend:
+    """Open a backend from memory://name, sqlite:///path or redis://[:password@]host:port/db"""
+    scheme = url.partition('://')[0]
+    if scheme == 'memory':
+        name = url[len('memory://'):]
+        with _memory_lock:
+            # The same name returns the same queue, so in-process workers share it
+            return _memory_queues.setdefault(name, MemoryQueue())
+    if scheme == 'sqlite':
+        return SQLiteQueue(url[len('sqlite://'):])
+    if scheme == 'redis':
+        return RedisQueue.from_url(url)
+    raise ValueError(f"Unknown queue URL: {url}")
+
+
+def jobs_queue(name: str, handler: str) -> str:
+    return f'{name}.jobs.{handler}'
+
+
+def _dumps(obj: Any) -> bytes:
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class QueueDispatcher:
+    """
+    Engine end: turns chunk submissions into queue messages
+
+    Jobs go to one queue per handler, so a worker only reserves work it
+    can run. Submissions made in the same loop iteration are enqueued as
+    one batch. Every job names this dispatcher's reply queue; workers put
+    results there under the job's id, so a job delivered twice produces
+    one result message and any duplicate is simply acked and dropped.
+    A job no worker has answered within job_timeout seconds (a handler
+    nobody serves, such as a mistyped name) fails with QueueError.
+    """
+
+    def __init__(
+        self,
+        backend: QueueBackend,
+        name: str = 'dongol',
+        handlers: Optional[Iterable[str]] = None,
+        batch_size: int = 64,
+        visibility_timeout: float = 30.0,
+        poll_interval: float = 0.05,
+        job_timeout: Optional[float] = 300.0
+    ):
+        self.backend = backend
+        self.name = name
+        self.handlers: Optional[Set[str]] = set(handlers) if handlers is not None else None
+        self.batch_size = batch_size
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.job_timeout = job_timeout
+        self.reply_queue = f'{name}.results.{uuid.uuid4().hex[:12]}'
+        self.jobs_sent = 0
+        self.jobs_completed = 0
+        self.jobs_expired = 0
+        self.duplicates = 0
+        self._ids = itertools.count(1)
+        self._waiting: Dict[str, 'asyncio.Future[Any]'] = {}
+        self._outbox: List[Tuple[str, str, bytes]] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._pump: Optional[asyncio.Task] = None
+        self._work = asyncio.Event()
+        # Backends block, so every call runs on this one thread, in order
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dongol-queue')
+
+    def routes(self, handler: str, registered: bool) -> bool:
+        """Whether chunks for this handler go through the queue"""
+        if self.handlers is not None:
+            return handler in self.handlers
+        return not registered
+
+    async def start(self):
+        self._pump = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        for task in (self._pump, self._flusher):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(
+            *(t for t in (self._pump, self._flusher) if t is not None), return_exceptions=True
+        )
+        self._pump = self._flusher = None
+        for future in self._waiting.values():
+            if not future.done():
+                future.set_exception(QueueError("Queue dispatcher stopped"))
+        self._waiting.clear()
+        self._io.shutdown(wait=True)
+        self.backend.close()
+
+    async def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._io, fn, *args)
+
+    def submit(self, handler: str, chunk: Any) -> 'asyncio.Future[Any]':
+        """Queue a chunk for any worker serving the handler; resolves to its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Zero-padded so ids sort in submission order
+        job_id = f'{self.reply_queue}-{next(self._ids):012d}'
+        try:
+            payload = _dumps((handler, chunk, self.reply_queue))
+        except Exception as e:
+            future.set_exception(e)
+            return future
+        self._waiting[job_id] = future
+        future.add_done_callback(lambda f, job_id=job_id: self._waiting.pop(job_id, None))
+        if self.job_timeout:
+            timer = loop.call_later(self.job_timeout, self._expire, future, handler)
+            future.add_done_callback(lambda f: timer.cancel())
+        self._outbox.append((jobs_queue(self.name, handler), job_id, payload))
+        self._work.set()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+        return future
+
+    def _expire(self, future: 'asyncio.Future[Any]', handler: str):
+        if not future.done():
+            # A result that turns up later is dropped as a duplicate
+            self.jobs_expired += 1
+            future.set_exception(QueueError(f"No queue worker ran handler {handler} within {self.job_timeout:g}s"))
+
+    async def _flush(self):
+        # Yield once so every submit made in this loop iteration joins the batch
+        await asyncio.sleep(0)
+        while self._outbox:
+            batch, self._outbox = self._outbox, []
+            by_queue: Dict[str, List[Tuple[str, bytes]]] = {}
+            for queue, job_id, payload in batch:
+                if job_id in self._waiting:
+                    by_queue.setdefault(queue, []).append((job_id, payload))
+            try:
+                for queue, messages in by_queue.items():
+                    await self._call(self.backend.enqueue, queue, messages)
+            except QueueError:
+                # Enqueueing an id twice is a no-op, so resend the whole batch
+                self._outbox[:0] = batch
+                await asyncio.sleep(self.poll_interval)
+                continue
+            self.jobs_sent += sum(len(m) for m in by_queue.values())
+
+    async def _collect(self):
+        while True:
+            if not self._waiting:
+                self._work.clear()
+                await self._work.wait()
+            try:
+                messages = await self._call(
+                    self.backend.reserve, self.reply_queue, self.batch_size, self.visibility_timeout
+                )
+            except QueueError:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if not messages:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            for message in messages:
+                future = self._waiting.pop(message.id, None)
+                if future is None or future.done():
+                    self.duplicates += 1
+                    continue
+                self.jobs_completed += 1
+                ok, value = pickle.loads(message.payload)
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(RemoteHandlerError(value))
+            try:
+                await self._call(self.backend.ack, self.reply_queue, [m.id for m in messages])
+            except QueueError:
+                # Left unacked the results come back after the timeout and are dropped as duplicates
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'backend': type(self.backend).__name__,
+            'name': self.name,
+            'waiting': len(self._waiting),
+            'jobs_sent': self.jobs_sent,
+            'jobs_completed': self.jobs_completed,
+            'jobs_expired': self.jobs_expired,
+            'duplicates': self.duplicates,
+        }
+
+
+class QueueWorker:
+    """
+    Worker end: reserves jobs from the queues of the handlers it serves
+
+    Up to prefetch jobs are held at once. Leases of running jobs are
+    extended while they run; a job is acked only after its result is
+    enqueued, so a worker that dies mid-job loses nothing. Jobs delivered
+    more than max_attempts times are reported as failed rather than
+    retried forever.
+    """
+
+    def __init__(
+        self,
+        backend: QueueBackend,
+        handlers: Dict[str, Callable[[Any], Any]],
+        name: str = 'dongol',
+        concurrency: int = 4,
+        prefetch: Optional[int] = None,
+        batch_size: int = 32,
+        visibility_timeout: float = 30.0,
+        poll_interval: float = 0.05,
+        max_attempts: int = 5,
+        worker_id: Optional[str] = None,
+        executor: Optional[Executor] = None
+    ):
+        self.backend = backend
+        self.handlers = handlers
+        self.name = name
+        self.concurrency = concurrency
+        self.prefetch = prefetch or concurrency * 2
+        self.batch_size = batch_size
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id or f"{os.uname().nodename}-{os.getpid()}"
+        self.jobs_done = 0
+        self._executor = executor
+        self._stopping = False
+        self._wake: Optional[asyncio.Event] = None
+
+    async def run(self):
+        """Serve until stopped"""
+        loop = asyncio.get_running_loop()
+        io = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dongol-queue')
+        executor = self._executor or ThreadPoolExecutor(max_workers=self.concurrency)
+        wake = self._wake = asyncio.Event()
+        # job id -> job queue name
+        running: Dict[str, str] = {}
+        # (job queue, job id, reply queue, ok, payload)
+        finished: List[Tuple[str, str, str, bool, Any]] = []
+        queues = [jobs_queue(self.name, handler) for handler in sorted(self.handlers)]
+        turn = itertools.cycle(range(len(queues)))
+        extended_at = time.monotonic()
+
+        def call(fn: Callable[..., Any], *args: Any) -> 'asyncio.Future[Any]':
+            return loop.run_in_executor(io, fn, *args)
+
+        def done(queue: str, job_id: str, reply: str, future: asyncio.Future):
+            if future.cancelled():
+                return
+            error = future.exception()
+            outcome = (False, repr(error)) if error else future.result()
+            finished.append((queue, job_id, reply, *outcome))
+            wake.set()
+
+        try:
+            while not self._stopping:
+                took = 0
+                try:
+                    # Visit the handler queues round robin so none is starved
+                    for _ in range(len(queues)):
+                        room = min(self.prefetch - len(running), self.batch_size)
+                        if room <= 0:
+                            break
+                        queue = queues[next(turn)]
+                        for message in await call(self.backend.reserve, queue, room, self.visibility_timeout):
+                            took += 1
+                            handler_name, chunk, reply = pickle.loads(message.payload)
+                            handler = self.handlers.get(handler_name)
+                            if message.attempts > self.max_attempts:
+                                finished.append((queue, message.id, reply, False,
+                                                 f"Gave up after {message.attempts - 1} deliveries"))
+                            elif handler is None:
+                                finished.append((queue, message.id, reply, False,
+                                                 f"Unknown handler {handler_name}"))
+                            else:
+                                running[message.id] = queue
+                                future = loop.run_in_executor(executor, _run_handler, handler, chunk)
+                                future.add_done_callback(
+                                    lambda f, q=queue, j=message.id, r=reply: done(q, j, r, f)
+                                )
+
+                    if finished:
+                        batch, finished = finished, []
+                        try:
+                            await self._settle(call, batch)
+                        except QueueError:
+                            finished[:0] = batch
+                            raise
+                        for _, job_id, _, _, _ in batch:
+                            running.pop(job_id, None)
+
+                    if running and time.monotonic() - extended_at > self.visibility_timeout / 3:
+                        by_queue: Dict[str, List[str]] = {}
+                        for job_id, queue in running.items():
+                            by_queue.setdefault(queue, []).append(job_id)
+                        for queue, ids in by_queue.items():
+                            await call(self.backend.extend, queue, ids, self.visibility_timeout)
+                        extended_at = time.monotonic()
+                except QueueError:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                if not took and not finished:
+                    wake.clear()
+                    try:
+                        await asyncio.wait_for(wake.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            if self._executor is None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            io.shutdown(wait=True)
+
+    async def _settle(self, call: Callable[..., Any], batch: List[Tuple[str, str, str, bool, Any]]):
+        """Enqueue results, then ack their jobs"""
+        results: Dict[str, List[Tuple[str, bytes]]] = {}
+        acks: Dict[str, List[str]] = {}
+        for queue, job_id, reply, ok, payload in batch:
+            try:
+                message = _dumps((ok, payload))
+            except Exception as e:
+                message = _dumps((False, f"Unpicklable result: {e!r}"))
+            results.setdefault(reply, []).append((job_id, message))
+            acks.setdefault(queue, []).append(job_id)
+        for reply, messages in results.items():
+            await call(self.backend.enqueue, reply, messages)
+        for queue, ids in acks.items():
+            await call(self.backend.ack, queue, ids)
+        self.jobs_done += len(batch)
+
+    def stop(self):
+        self._stopping = True
+        if self._wake is not None:
+            self._wake.set()
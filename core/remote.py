@@ -0,0 +1,459 @@
+"""
+DONGOL Remote Workers - Coordinator and worker ends of the chunk protocol
+"""
+from __future__ import annotations
+
+import asyncio
+import hmac
+import itertools
+import json
+import os
+import pickle
+import struct
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+# Every frame is a 4-byte big-endian length followed by the payload. The
+# first frame a worker sends is a JSON hello; the coordinator checks the
+# token before it unpickles anything from that connection and answers
+# with a JSON frame accepting or refusing the worker.
+_HEADER = struct.Struct('>I')
+MAX_FRAME_BYTES = 256 * 1024 * 1024
+
+
+class NoWorkersError(RuntimeError):
+    """No connected worker can run the requested handler"""
+
+
+class RemoteHandlerError(RuntimeError):
+    """A handler raised on a remote worker"""
+
+
+class WorkerRejectedError(RuntimeError):
+    """The coordinator refused a worker's token"""
+
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """Parse tcp://host:port or unix:///path into ('tcp', (host, port)) or ('unix', path)"""
+    if address.startswith('unix://'):
+        return 'unix', address[len('unix://'):]
+    if address.startswith('tcp://'):
+        address = address[len('tcp://'):]
+    host, sep, port = address.rpartition(':')
+    if not sep or not port.isdigit():
+        raise ValueError(f"Invalid address: {address}")
+    return 'tcp', (host.strip('[]') or '0.0.0.0', int(port))
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    header = await reader.readexactly(_HEADER.size)
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ConnectionError(f"Frame of {length} bytes exceeds the limit")
+    return await reader.readexactly(length)
+
+
+def encode_frame(payload: bytes) -> bytes:
+    return _HEADER.pack(len(payload)) + payload
+
+
+def _dumps(message: Any) -> bytes:
+    return pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class _Job:
+    __slots__ = ('id', 'handler', 'chunk', 'future')
+
+    def __init__(self, job_id: int, handler: str, chunk: Any, future: 'asyncio.Future[Any]'):
+        self.id = job_id
+        self.handler = handler
+        self.chunk = chunk
+        self.future = future
+
+
+class _WorkerConnection:
+    def __init__(self, worker_id: str, handlers: Set[str], capacity: int,
+                 writer: asyncio.StreamWriter):
+        self.worker_id = worker_id
+        self.handlers = handlers
+        self.capacity = capacity
+        self.writer = writer
+        self.outstanding: Dict[int, _Job] = {}
+
+    @property
+    def credit(self) -> int:
+        return self.capacity - len(self.outstanding)
+
+
+class RemoteCoordinator:
+    """
+    Hands chunks to remote worker processes and collects their results
+
+    Workers announce their handlers and a prefetch capacity. The
+    coordinator keeps up to that many jobs outstanding on each worker
+    (pipelining, so a worker never idles waiting for the next chunk) and
+    packs queued jobs into batches; workers send results back in batches
+    too, and a result doubles as the ack for its job. Jobs on a worker
+    that disconnects are requeued for the others. A tcp:// listener
+    needs a token; unix:// sockets are guarded by file permissions.
+    """
+
+    def __init__(self, address: str, token: Optional[str] = None, batch_size: int = 32):
+        if parse_address(address)[0] == 'tcp' and not token:
+            # Frames after the hello are unpickled, so an open TCP port would run anyone's code
+            raise ValueError(f"A token is required to listen on {address}; only unix:// may go without")
+        self.address = address
+        self.token = token
+        self.batch_size = batch_size
+        self.jobs_sent = 0
+        self.jobs_completed = 0
+        self.jobs_requeued = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._workers: Dict[str, _WorkerConnection] = {}
+        self._pending: Dict[str, Deque[_Job]] = {}
+        self._ids = itertools.count(1)
+        self._dispatch_scheduled = False
+        self._connection_tasks: Set[asyncio.Task] = set()
+
+    async def start(self):
+        kind, target = parse_address(self.address)
+        if kind == 'unix':
+            if os.path.exists(target):
+                os.unlink(target)
+            self._server = await asyncio.start_unix_server(self._serve, path=target)
+        else:
+            host, port = target
+            self._server = await asyncio.start_server(self._serve, host=host, port=port)
+            if port == 0:
+                # Report the port the OS picked
+                port = self._server.sockets[0].getsockname()[1]
+                self.address = f"tcp://{host}:{port}"
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for worker in list(self._workers.values()):
+            worker.writer.close()
+        if self._connection_tasks:
+            # Closing the transport ends each connection's read loop
+            _, stuck = await asyncio.wait(list(self._connection_tasks), timeout=1.0)
+            for task in stuck:
+                task.cancel()
+        for queue in self._pending.values():
+            for job in queue:
+                if not job.future.done():
+                    job.future.set_exception(NoWorkersError("Coordinator stopped"))
+        self._pending.clear()
+
+    def has_worker(self, handler: str) -> bool:
+        return any(handler in worker.handlers for worker in self._workers.values())
+
+    def submit(self, handler: str, chunk: Any) -> 'asyncio.Future[Any]':
+        """Queue a chunk for a worker that has the handler; resolves to its result"""
+        if not self.has_worker(handler):
+            raise NoWorkersError(f"No worker serves handler {handler}")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(handler, deque()).append(
+            _Job(next(self._ids), handler, chunk, future)
+        )
+        self._schedule_dispatch()
+        return future
+
+    def _schedule_dispatch(self):
+        # Coalesce every submit made in this loop iteration into one pass
+        if not self._dispatch_scheduled:
+            self._dispatch_scheduled = True
+            asyncio.get_running_loop().call_soon(self._dispatch)
+
+    def _dispatch(self):
+        self._dispatch_scheduled = False
+        for worker in list(self._workers.values()):
+            batch: List[_Job] = []
+            room = min(worker.credit, self.batch_size)
+            for handler in worker.handlers:
+                queue = self._pending.get(handler)
+                while queue and len(batch) < room:
+                    job = queue.popleft()
+                    if not job.future.done():
+                        batch.append(job)
+            if not batch:
+                continue
+            try:
+                frame = encode_frame(_dumps(
+                    ('batch', [(job.id, job.handler, job.chunk) for job in batch])
+                ))
+            except Exception:
+                # Fail only the chunks that cannot be pickled, then retry the rest
+                for job in batch:
+                    try:
+                        _dumps(job.chunk)
+                    except Exception as e:
+                        job.future.set_exception(e)
+                    else:
+                        self._pending[job.handler].appendleft(job)
+                self._schedule_dispatch()
+                continue
+            for job in batch:
+                worker.outstanding[job.id] = job
+            self.jobs_sent += len(batch)
+            worker.writer.write(frame)
+            if worker.credit > 0 and any(self._pending.get(h) for h in worker.handlers):
+                self._schedule_dispatch()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        if task is not None:
+            self._connection_tasks.add(task)
+        worker: Optional[_WorkerConnection] = None
+        try:
+            hello = json.loads(await read_frame(reader))
+            if self.token is not None and not hmac.compare_digest(
+                str(hello.get('token', '')), self.token
+            ):
+                writer.write(encode_frame(json.dumps({'ok': False, 'error': 'invalid token'}).encode()))
+                return
+            worker = _WorkerConnection(
+                str(hello['worker_id']), set(hello['handlers']), int(hello['capacity']), writer
+            )
+            writer.write(encode_frame(json.dumps({'ok': True}).encode()))
+            self._workers[worker.worker_id] = worker
+            self._schedule_dispatch()
+
+            while True:
+                kind, items = pickle.loads(await read_frame(reader))
+                if kind == 'results':
+                    self._complete(worker, items)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, KeyError):
+            pass
+        finally:
+            if worker is not None:
+                self._drop(worker)
+            writer.close()
+            if task is not None:
+                self._connection_tasks.discard(task)
+
+    def _complete(self, worker: _WorkerConnection, items: List[Tuple[int, bool, Any]]):
+        for job_id, ok, payload in items:
+            job = worker.outstanding.pop(job_id, None)
+            if job is None or job.future.done():
+                continue
+            self.jobs_completed += 1
+            if ok:
+                job.future.set_result(payload)
+            else:
+                job.future.set_exception(RemoteHandlerError(payload))
+        self._schedule_dispatch()
+
+    def _drop(self, worker: _WorkerConnection):
+        if self._workers.get(worker.worker_id) is worker:
+            del self._workers[worker.worker_id]
+        # Requeue at the front so they keep their place in line
+        for job in sorted(worker.outstanding.values(), key=lambda j: j.id, reverse=True):
+            if job.future.done():
+                continue
+            if self.has_worker(job.handler):
+                self._pending.setdefault(job.handler, deque()).appendleft(job)
+                self.jobs_requeued += 1
+            else:
+                job.future.set_exception(NoWorkersError(f"No worker serves handler {job.handler}"))
+        worker.outstanding.clear()
+        for handler, queue in self._pending.items():
+            if queue and not self.has_worker(handler):
+                while queue:
+                    job = queue.popleft()
+                    if not job.future.done():
+                        job.future.set_exception(NoWorkersError(f"No worker serves handler {handler}"))
+        self._schedule_dispatch()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'address': self.address,
+            'workers': {
+                worker_id: {'handlers': sorted(w.handlers), 'outstanding': len(w.outstanding)}
+                for worker_id, w in self._workers.items()
+            },
+            'queued': sum(len(q) for q in self._pending.values()),
+            'jobs_sent': self.jobs_sent,
+            'jobs_completed': self.jobs_completed,
+            'jobs_requeued': self.jobs_requeued,
+        }
+
+
+class RemoteHandler:
+    """
+    A handler name remote workers may serve, with the engine's own as fallback
+
+    ParallelExecutor unwraps it: chunks go to a connected worker serving
+    the name, and otherwise to the local handler on the executor's usual
+    pools. Without a local handler the chunk can only run remotely.
+    """
+
+    __slots__ = ('coordinator', 'name', 'local')
+
+    def __init__(self, coordinator: RemoteCoordinator, name: str,
+                 local: Optional[Callable[[Any], Any]] = None):
+        self.coordinator = coordinator
+        self.name = name
+        self.local = local
+
+    def __call__(self, chunk: Any) -> Any:
+        if self.local is None:
+            raise NoWorkersError(f"No worker serves handler {self.name}")
+        return self.local(chunk)
+
+
+def _run_handler(handler: Callable[[Any], Any], chunk: Any) -> Tuple[bool, Any]:
+    try:
+        return True, handler(chunk)
+    except Exception as e:
+        return False, repr(e)
+
+
+def _encode_results(batch: List[Tuple[int, bool, Any]]) -> bytes:
+    try:
+        return _dumps(('results', batch))
+    except Exception:
+        # Report results that cannot be pickled as failures instead of losing the batch
+        safe = []
+        for job_id, ok, payload in batch:
+            try:
+                pickle.dumps(payload)
+                safe.append((job_id, ok, payload))
+            except Exception as e:
+                safe.append((job_id, False, f"Unpicklable result: {e!r}"))
+        return _dumps(('results', safe))
+
+
+class WorkerClient:
+    """
+    Worker end: pulls batches of chunks and streams results back
+
+    Jobs run on a local thread or process pool. Finished results are held
+    for up to flush_ms (or until batch_size of them are ready) and sent
+    as one frame, so acks cost one write per batch rather than per chunk.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        handlers: Dict[str, Callable[[Any], Any]],
+        concurrency: int = 4,
+        prefetch: Optional[int] = None,
+        batch_size: int = 32,
+        flush_ms: float = 5.0,
+        token: Optional[str] = None,
+        worker_id: Optional[str] = None,
+        executor: Optional[Executor] = None
+    ):
+        self.address = address
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.prefetch = prefetch or concurrency * 2
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.token = token
+        self.worker_id = worker_id or f"{os.uname().nodename}-{os.getpid()}"
+        self.jobs_done = 0
+        self._executor = executor
+        self._stopping = False
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        kind, target = parse_address(self.address)
+        if kind == 'unix':
+            return await asyncio.open_unix_connection(target)
+        return await asyncio.open_connection(*target)
+
+    async def run_once(self) -> bool:
+        """Serve one connection until the coordinator goes away; True if it accepted us"""
+        reader, writer = await self._connect()
+        accepted = False
+        self._writer = writer
+        executor = self._executor or ThreadPoolExecutor(max_workers=self.concurrency)
+        loop = asyncio.get_running_loop()
+        outbox: List[Tuple[int, bool, Any]] = []
+        ready = asyncio.Event()
+        running: Set[asyncio.Future] = set()
+
+        def finished(job_id: int, future: asyncio.Future):
+            running.discard(future)
+            if future.cancelled():
+                return
+            error = future.exception()
+            outbox.append((job_id, False, repr(error)) if error else (job_id, *future.result()))
+            ready.set()
+
+        async def flush():
+            while True:
+                await ready.wait()
+                if len(outbox) < self.batch_size:
+                    await asyncio.sleep(self.flush_ms / 1000)
+                ready.clear()
+                batch = outbox[:]
+                del outbox[:]
+                self.jobs_done += len(batch)
+                writer.write(encode_frame(_encode_results(batch)))
+                await writer.drain()
+
+        writer.write(encode_frame(json.dumps({
+            'worker_id': self.worker_id,
+            'handlers': sorted(self.handlers),
+            'capacity': self.prefetch,
+            'token': self.token or '',
+        }).encode()))
+        flusher = asyncio.create_task(flush())
+        try:
+            welcome = json.loads(await read_frame(reader))
+            if not welcome.get('ok'):
+                raise WorkerRejectedError(
+                    f"Coordinator at {self.address} refused this worker: {welcome.get('error')}"
+                )
+            accepted = True
+            while not self._stopping:
+                kind, items = pickle.loads(await read_frame(reader))
+                if kind != 'batch':
+                    continue
+                for job_id, handler_name, chunk in items:
+                    handler = self.handlers.get(handler_name)
+                    if handler is None:
+                        outbox.append((job_id, False, f"Unknown handler {handler_name}"))
+                        ready.set()
+                        continue
+                    future = loop.run_in_executor(executor, _run_handler, handler, chunk)
+                    running.add(future)
+                    future.add_done_callback(lambda f, job_id=job_id: finished(job_id, f))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            flusher.cancel()
+            writer.close()
+            if self._executor is None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        return accepted
+
+    async def run(self, retry_seconds: float = 1.0):
+        """Serve until stopped, reconnecting with backoff
+
+        Raises WorkerRejectedError if the coordinator refuses the token,
+        since retrying with the same one cannot succeed.
+        """
+        delay = retry_seconds
+        while not self._stopping:
+            try:
+                if await self.run_once():
+                    # The backoff only grows while connections fail or are dropped unaccepted
+                    delay = retry_seconds
+            except OSError:
+                pass
+            if self._stopping:
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def stop(self):
+        self._stopping = True
+        if self._writer is not None:
+            self._writer.close()
@@ -0,0 +1,126 @@
+"""
+DONGOL Retention - Bounded task table with incremental background GC
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .engine import DongolEngine, Task
+
+
+@dataclass
+class RetentionPolicy:
+    """Rules for how long finished tasks are kept"""
+    max_completed_tasks: Optional[int] = None
+    ttl_seconds: Optional[float] = None
+    results_ttl_seconds: Optional[float] = None
+    sweep_interval_seconds: float = 1.0
+    slice_ms: float = 2.0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> 'RetentionPolicy':
+        config = config or {}
+        return cls(
+            max_completed_tasks=config.get('max_completed_tasks'),
+            ttl_seconds=config.get('ttl_seconds'),
+            results_ttl_seconds=config.get('results_ttl_seconds'),
+            sweep_interval_seconds=config.get('sweep_interval_seconds', 1.0),
+            slice_ms=config.get('slice_ms', 2.0),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return any(v is not None for v in (
+            self.max_completed_tasks, self.ttl_seconds, self.results_ttl_seconds
+        ))
+
+
+class RetentionSweeper:
+    """
+    Incremental garbage collector for the engine's task table
+
+    Finished tasks are kept in completion order, so every policy only ever
+    looks at the oldest entries and a sweep costs O(evicted), never
+    O(total tasks). Work is split into short time slices that yield back
+    to the event loop in between.
+    """
+
+    def __init__(self, engine: 'DongolEngine', policy: RetentionPolicy):
+        self.engine = engine
+        self.policy = policy
+        self.evicted = 0
+        self.results_dropped = 0
+        self._finished: 'OrderedDict[str, float]' = OrderedDict()
+        self._holding_results: 'OrderedDict[str, float]' = OrderedDict()
+
+    def task_finished(self, task: 'Task'):
+        finished_at = task.completed_at or time.time()
+        self._finished[task.id] = finished_at
+        self._finished.move_to_end(task.id)
+        if self.policy.results_ttl_seconds is not None:
+            self._holding_results[task.id] = finished_at
+            self._holding_results.move_to_end(task.id)
+
+    def task_removed(self, task_id: str):
+        self._finished.pop(task_id, None)
+        self._holding_results.pop(task_id, None)
+
+    def sweep_slice(self, now: Optional[float] = None) -> bool:
+        """Run one time slice of sweeping; True if work remains"""
+        now = now or time.time()
+        deadline = time.perf_counter() + self.policy.slice_ms / 1000
+        ops = 0
+
+        while True:
+            step = self._next_action(now)
+            if step is None:
+                return False
+            action, task_id = step
+            if action == 'evict':
+                self._finished.pop(task_id, None)
+                self._holding_results.pop(task_id, None)
+                if task_id in self.engine.tasks:
+                    self.engine.remove_task(task_id)
+                self.evicted += 1
+            else:
+                self._holding_results.pop(task_id, None)
+                if task_id in self.engine.tasks:
+                    self.engine.drop_results(task_id)
+                    self.results_dropped += 1
+
+            ops += 1
+            if ops % 64 == 0 and time.perf_counter() >= deadline:
+                return True
+
+    def _next_action(self, now: float) -> Optional[Tuple[str, str]]:
+        policy = self.policy
+        if self._finished:
+            oldest_id, finished_at = next(iter(self._finished.items()))
+            if policy.max_completed_tasks is not None and len(self._finished) > policy.max_completed_tasks:
+                return 'evict', oldest_id
+            if policy.ttl_seconds is not None and finished_at < now - policy.ttl_seconds:
+                return 'evict', oldest_id
+        if self._holding_results and policy.results_ttl_seconds is not None:
+            oldest_id, finished_at = next(iter(self._holding_results.items()))
+            if finished_at < now - policy.results_ttl_seconds:
+                return 'drop_results', oldest_id
+        return None
+
+    async def run(self):
+        """Background sweeper loop"""
+        while True:
+            await asyncio.sleep(self.policy.sweep_interval_seconds)
+            while self.sweep_slice():
+                await asyncio.sleep(0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'finished_tasks': len(self._finished),
+            'evicted': self.evicted,
+            'results_dropped': self.results_dropped,
+        }
@@ -0,0 +1,109 @@
+"""
+DONGOL Routing - Named executor pools and per-handler placement
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# io: thread pool, cpu: process pool, async: run on the event loop
+POOLS = ('io', 'cpu', 'async')
+AUTO = 'auto'
+
+
+def profiled_call(handler: Callable[..., Any], *args: Any) -> Tuple[Any, float, float, float]:
+    """Run a handler, returning (result, start, end, thread CPU seconds)"""
+    cpu = time.thread_time()
+    started = time.perf_counter()
+    result = handler(*args)
+    return result, started, time.perf_counter(), time.thread_time() - cpu
+
+
+class HandlerProfile:
+    """
+    Picks a pool for an auto-routed handler from its first runs
+
+    Samples run one at a time on the io pool, timing wall clock and the
+    thread's CPU time; concurrent samples would wait on each other for
+    the GIL and look like I/O. Chunks arriving while a sample runs take
+    the main executor, so a wide wave contributes one sample. A handler
+    that spends at least cpu_ratio of its time on the CPU holds the GIL
+    and goes to the cpu pool; one that mostly waits stays on io; one
+    that finishes in under inline_ms is cheaper to run on the event loop
+    than to hand to any pool.
+    """
+
+    def __init__(self, samples: int = 5, cpu_ratio: float = 0.5, inline_ms: float = 0.5):
+        self.samples = max(1, samples)
+        self.cpu_ratio = cpu_ratio
+        self.inline = inline_ms / 1000
+        self.pool: Optional[str] = None
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.runs = 0
+        self._sampling = False
+        self._lock = threading.Lock()
+
+    def begin_sample(self) -> bool:
+        """Claim the next sample slot; False while another sample is running"""
+        with self._lock:
+            if self.pool is not None or self._sampling:
+                return False
+            self._sampling = True
+            return True
+
+    def record(self, wall: float, cpu: float):
+        with self._lock:
+            self._sampling = False
+            self.runs += 1
+            self.wall += wall
+            self.cpu += cpu
+            if self.runs < self.samples:
+                return
+            if self.wall / self.runs < self.inline:
+                self.pool = 'async'
+            elif self.cpu >= self.cpu_ratio * self.wall:
+                self.pool = 'cpu'
+            else:
+                self.pool = 'io'
+
+    def abandon(self):
+        with self._lock:
+            self._sampling = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'pool': self.pool,
+            'samples': self.runs,
+            'cpu_ratio': self.cpu / self.wall if self.wall else 0.0,
+        }
+
+
+class RoutedHandler:
+    """
+    A handler pinned to a named pool, or profiled into one ('auto')
+
+    ParallelExecutor unwraps it and runs the inner handler on that pool;
+    anything else calling it just runs the handler.
+    """
+
+    __slots__ = ('handler', 'pool', 'profile')
+
+    def __init__(self, handler: Callable[[Any], Any], pool: str, profile: Optional[HandlerProfile] = None):
+        if pool not in POOLS and pool != AUTO:
+            raise ValueError(f"Unknown pool {pool}; expected one of {', '.join(POOLS + (AUTO,))}")
+        self.handler = handler
+        self.pool = pool
+        self.profile = profile if profile is not None or pool != AUTO else HandlerProfile()
+
+    def __call__(self, chunk: Any) -> Any:
+        return self.handler(chunk)
+
+    def wrap(self, handler: Callable[[Any], Any]) -> 'RoutedHandler':
+        """Same route and profile around a different handler"""
+        return RoutedHandler(handler, self.pool, self.profile)
+
+    def target(self) -> Optional[str]:
+        """Pool to run on now; None while an auto handler is still being profiled"""
+        if self.pool == AUTO:
+            return self.profile.pool
+        return self.pool
@@ -0,0 +1,160 @@
+"""
+DONGOL Search - Incremental inverted index over tasks and results
+"""
+from __future__ import annotations
+
+import fnmatch
+import heapq
+import re
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from .index import SortedIdSet
+
+FIELD_TASK = 1      # task name and description
+FIELD_RESULTS = 2   # chunk result text
+ALL_FIELDS = FIELD_TASK | FIELD_RESULTS
+
+_TOKEN_RE = re.compile(r'\w+')
+_WILDCARDS = set('*?[')
+
+
+def tokenize(text: str) -> Set[str]:
+    """Lowercased word tokens (numbers included, so ids and codes are searchable)"""
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+def extract_text(obj: Any, _depth: int = 0) -> Iterator[str]:
+    """Yield the string and integer leaves of a result payload as text"""
+    if isinstance(obj, str):
+        yield obj
+    elif isinstance(obj, int) and not isinstance(obj, bool):
+        # Status codes and ids are worth finding
+        yield str(obj)
+    elif _depth > 8:
+        return
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            yield from extract_text(value, _depth + 1)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            yield from extract_text(item, _depth + 1)
+
+
+class SearchIndex:
+    """
+    Inverted index from terms to task ids
+
+    Postings carry a field mask so one index answers name-only,
+    result-only and combined searches. The vocabulary is kept sorted,
+    which lets prefix wildcards like ``error*`` expand with a range scan
+    instead of touching every term.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._terms: Dict[str, Dict[str, int]] = {}
+        self._vocab = SortedIdSet()
+
+    def __len__(self) -> int:
+        return len(self._vocab)
+
+    def add(self, task_id: str, content: Any, field: int):
+        """Index the text found in a value under a field"""
+        task_terms = self._terms.setdefault(task_id, {})
+        for text in extract_text(content):
+            for term in tokenize(text):
+                mask = task_terms.get(term, 0)
+                if mask & field:
+                    continue
+                task_terms[term] = mask | field
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    self._vocab.add(term)
+                postings[task_id] = mask | field
+
+    def remove_field(self, task_id: str, field: int):
+        """Forget one field of a task (e.g. after its results are dropped)"""
+        task_terms = self._terms.get(task_id)
+        if not task_terms:
+            return
+        for term, mask in list(task_terms.items()):
+            if not mask & field:
+                continue
+            remaining = mask & ~field
+            if remaining:
+                task_terms[term] = remaining
+                self._postings[term][task_id] = remaining
+            else:
+                del task_terms[term]
+                self._drop_posting(term, task_id)
+        if not task_terms:
+            del self._terms[task_id]
+
+    def remove(self, task_id: str):
+        """Forget a task entirely"""
+        for term in self._terms.pop(task_id, {}):
+            self._drop_posting(term, task_id)
+
+    def _drop_posting(self, term: str, task_id: str):
+        postings = self._postings.get(term)
+        if postings is None:
+            return
+        postings.pop(task_id, None)
+        if not postings:
+            del self._postings[term]
+            self._vocab.discard(term)
+
+    def expand(self, pattern: str) -> List[str]:
+        """Expand a (possibly wildcard) term against the vocabulary"""
+        pattern = pattern.lower()
+        cut = next((i for i, ch in enumerate(pattern) if ch in _WILDCARDS), None)
+        if cut is None:
+            return [pattern] if pattern in self._postings else []
+
+        prefix = pattern[:cut]
+        matcher = re.compile(fnmatch.translate(pattern)).match
+        candidates: Iterator[str]
+        if prefix:
+            candidates = self._prefix_range(prefix)
+        else:
+            candidates = self._vocab.iter_from()
+        return [term for term in candidates if matcher(term)]
+
+    def _prefix_range(self, prefix: str) -> Iterator[str]:
+        if prefix in self._postings:
+            yield prefix
+        for term in self._vocab.iter_from(prefix):
+            if not term.startswith(prefix):
+                return
+            yield term
+
+    def search(self, query: str, fields: int = ALL_FIELDS, limit: Optional[int] = None,
+               prefix: bool = False) -> List[str]:
+        """Task ids matching every term of the query, newest first
+
+        With prefix, bare words match any term they start, so ``optim``
+        finds ``optimization``; words with wildcards match as written.
+        """
+        matched: Optional[Set[str]] = None
+        for raw in query.split():
+            if any(ch in _WILDCARDS for ch in raw):
+                term_patterns = [raw]
+            else:
+                tokens = sorted(tokenize(raw))
+                term_patterns = [f'{t}*' for t in tokens] if prefix else tokens
+                term_patterns = term_patterns or [raw]
+
+            for term_pattern in term_patterns:
+                hits: Set[str] = set()
+                for term in self.expand(term_pattern):
+                    hits.update(
+                        task_id for task_id, mask in self._postings[term].items() if mask & fields
+                    )
+                matched = hits if matched is None else matched & hits
+                if not matched:
+                    return []
+
+        if limit is not None:
+            return heapq.nlargest(limit, matched or ())
+        return sorted(matched or (), reverse=True)
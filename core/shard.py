@@ -0,0 +1,406 @@
+"""
+DONGOL Sharding - Spread tasks over engine processes by task id
+"""
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import hashlib
+import heapq
+import itertools
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .engine import Chunk, DongolEngine, Priority, Task, TaskStatus, new_task_id
+from .index import encode_cursor
+from .remote import encode_frame, read_frame
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to shards
+
+    Each shard owns many points on the ring, so keys spread evenly and
+    changing the shard count only moves the keys next to the points that
+    were added or removed.
+    """
+
+    def __init__(self, shards: Iterable[int], replicas: int = 64):
+        points = sorted(
+            (_hash(f'{shard}:{replica}'), shard)
+            for shard in shards for replica in range(replicas)
+        )
+        self._hashes = [h for h, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def lookup(self, key: str) -> int:
+        i = bisect_right(self._hashes, _hash(key))
+        return self._shards[i % len(self._shards)]
+
+
+def _dumps(obj: Any) -> bytes:
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _portable(task: Optional[Task]) -> Optional[Task]:
+    """Detached copy of a task, with spilled results paged in, that can cross a pipe"""
+    if task is None:
+        return None
+    return Task(**{f.name: getattr(task, f.name) for f in dataclasses.fields(Task)})
+
+
+async def _call_create(engine: DongolEngine, name: str, content: Any, handler_name: str,
+                       auto_chunk: bool, options: Dict[str, Any]) -> Task:
+    return _portable(await engine.create_task(name, content, handler_name, auto_chunk, **options))
+
+
+async def _call_execute(engine: DongolEngine, task_id: str, handler_name: str) -> Task:
+    return _portable(await engine.execute_task(task_id, handler_name))
+
+
+async def _call_submit(engine: DongolEngine, task_id: str, handler_name: str) -> Optional[Task]:
+    # The job records failures on the task instead of raising
+    await engine.submit_task(task_id, handler_name)
+    return _portable(await engine.get_task(task_id))
+
+
+async def _call_get(engine: DongolEngine, task_id: str) -> Optional[Task]:
+    return _portable(await engine.get_task(task_id))
+
+
+async def _call_list(engine: DongolEngine, *args: Any) -> List[Task]:
+    page, _ = engine.list_tasks(*args)
+    return [_portable(task) for task in page]
+
+
+async def _call_search(engine: DongolEngine, *args: Any) -> List[Task]:
+    return [_portable(task) for task in engine.search(*args)]
+
+
+def _sync(method: str, portable: bool = True) -> Callable[..., Any]:
+    async def call(engine: DongolEngine, *args: Any) -> Any:
+        result = getattr(engine, method)(*args)
+        return _portable(result) if portable else result
+    return call
+
+
+async def _call_register(engine: DongolEngine, name: str, handler: Callable[[Chunk], Any],
+                         pool: Optional[str] = None):
+    engine.register_handler(name, handler, pool)
+
+
+# Requests a shard process answers
+_SHARD_CALLS: Dict[str, Callable[..., Any]] = {
+    'create_task': _call_create,
+    'execute_task': _call_execute,
+    'submit_task': _call_submit,
+    'get_task': _call_get,
+    'cancel_task': _sync('cancel_task'),
+    'remove_task': _sync('remove_task'),
+    'drop_results': _sync('drop_results'),
+    'list_tasks': _call_list,
+    'search': _call_search,
+    'get_stats': _sync('get_stats', portable=False),
+    'register_handler': _call_register,
+}
+
+
+async def _serve_shard(address: str, index: int, config: Dict[str, Any],
+                       handlers: Dict[str, Tuple[Callable[[Chunk], Any], Optional[str]]]):
+    engine = DongolEngine(config)
+    for name, (handler, pool) in handlers.items():
+        engine.register_handler(name, handler, pool)
+    await engine.start()
+    reader, writer = await asyncio.open_unix_connection(address)
+    writer.write(encode_frame(_dumps(('hello', index))))
+    requests: set = set()
+
+    async def answer(request_id: int, method: str, args: Tuple[Any, ...]):
+        try:
+            reply = (request_id, True, await _SHARD_CALLS[method](engine, *args))
+        except Exception as e:
+            reply = (request_id, False, e)
+        try:
+            frame = encode_frame(_dumps(reply))
+        except Exception as e:
+            frame = encode_frame(_dumps((request_id, False, RuntimeError(f"Unpicklable reply: {e!r}"))))
+        writer.write(frame)
+
+    try:
+        while True:
+            message = pickle.loads(await read_frame(reader))
+            if message[0] == 'stop':
+                break
+            request = asyncio.create_task(answer(*message[1:]))
+            requests.add(request)
+            request.add_done_callback(requests.discard)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        # The facade went away
+        pass
+    finally:
+        for request in list(requests):
+            request.cancel()
+        await engine.stop()
+        writer.close()
+
+
+def _shard_main(address: str, index: int, config: Dict[str, Any],
+                handlers: Dict[str, Tuple[Callable[[Chunk], Any], Optional[str]]]):
+    asyncio.run(_serve_shard(address, index, config, handlers))
+
+
+class _Shard:
+    def __init__(self, process: multiprocessing.process.BaseProcess):
+        self.process = process
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.connected = asyncio.Event()
+        # Calls sent to this shard, by request id, until it answers
+        self.waiting: Dict[int, 'asyncio.Future[Any]'] = {}
+
+    def fail(self, error: Exception):
+        for future in self.waiting.values():
+            if not future.done():
+                future.set_exception(error)
+        self.waiting.clear()
+
+
+# Ratios and means: averaged over the shards reporting them instead of summed
+_AVERAGED_STATS = frozenset({'avg_batch_size', 'avg_chunks_per_task', 'cpu_ratio', 'queue_wait_ms'})
+
+
+def _merge_stats(shards: List[Dict[str, Any]]) -> Dict[str, Any]:
+    merged: Dict[str, Any] = {}
+    for key in dict.fromkeys(key for stats in shards for key in stats):
+        values = [stats[key] for stats in shards if key in stats]
+        first = values[0]
+        if isinstance(first, bool):
+            merged[key] = all(values)
+        elif isinstance(first, (int, float)):
+            merged[key] = sum(values) / len(values) if key in _AVERAGED_STATS else sum(values)
+        elif isinstance(first, dict):
+            merged[key] = _merge_stats(values)
+        else:
+            merged[key] = first
+    return merged
+
+
+class ShardedEngine:
+    """
+    Engine facade over N engine processes, each with its own loop and executor
+
+    Tasks are placed on a shard by consistent hashing of their id, so
+    every call about a task goes to one process and orchestration work
+    spreads over cores. Listings are merged across shards in id order
+    (ids are time ordered), counters are summed and ratios averaged.
+    Tasks come back as detached snapshots; call get_task again to see
+    later progress.
+
+    A shard process that dies fails the calls waiting on it and is
+    started again; the tasks it held in memory are gone with it.
+
+    Handlers are sent to every shard by pickling, so they must be
+    importable module-level callables.
+    """
+
+    def __init__(self, config: Optional[Dict] = None, shards: Optional[int] = None, replicas: int = 64):
+        self.config = dict(config or {})
+        configured = self.config.pop('shards', None)
+        self.shard_count = shards or configured or os.cpu_count() or 1
+        self.ring = HashRing(range(self.shard_count), replicas)
+        self._handlers: Dict[str, Tuple[Callable[[Chunk], Any], Optional[str]]] = {}
+        self._shards: List[_Shard] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._socket_dir: Optional[str] = None
+        self._address: Optional[str] = None
+        self._ids = itertools.count(1)
+        self._running = False
+        self.restarts = 0
+
+    async def start(self, timeout: float = 60.0):
+        """Spawn the shard processes and wait until each has connected"""
+        self._socket_dir = tempfile.mkdtemp(prefix='dongol-shards-')
+        self._address = os.path.join(self._socket_dir, 'facade.sock')
+        self._server = await asyncio.start_unix_server(self._serve, path=self._address)
+        self._shards = [self._spawn(index) for index in range(self.shard_count)]
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(shard.connected.wait() for shard in self._shards)), timeout
+            )
+        except asyncio.TimeoutError:
+            await self.stop()
+            raise RuntimeError("Engine shards did not start in time")
+        self._running = True
+
+    def _spawn(self, index: int) -> _Shard:
+        process = multiprocessing.get_context('spawn').Process(
+            target=_shard_main, args=(self._address, index, self.config, self._handlers),
+            name=f'dongol-shard-{index}', daemon=True
+        )
+        process.start()
+        return _Shard(process)
+
+    async def _restart(self, index: int):
+        """Replace a shard whose process went away"""
+        process = self._shards[index].process
+        await asyncio.get_running_loop().run_in_executor(None, process.join, 10.0)
+        if process.is_alive():
+            process.terminate()
+        if self._running:
+            self._shards[index] = self._spawn(index)
+            self.restarts += 1
+
+    async def stop(self):
+        self._running = False
+        for shard in self._shards:
+            if shard.writer is not None:
+                shard.writer.write(encode_frame(_dumps(('stop',))))
+        loop = asyncio.get_running_loop()
+        for shard in self._shards:
+            await loop.run_in_executor(None, shard.process.join, 10.0)
+            if shard.process.is_alive():
+                shard.process.terminate()
+            if shard.writer is not None:
+                shard.writer.close()
+            shard.fail(RuntimeError("Sharded engine stopped"))
+        self._shards = []
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._socket_dir is not None:
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+            self._socket_dir = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        shard: Optional[_Shard] = None
+        try:
+            _, index = pickle.loads(await read_frame(reader))
+            shard = self._shards[index]
+            shard.writer = writer
+            shard.connected.set()
+            while True:
+                request_id, ok, value = pickle.loads(await read_frame(reader))
+                future = shard.waiting.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            if shard is not None and shard.writer is writer:
+                shard.writer = None
+                shard.fail(RuntimeError(f"Engine shard {index} exited"))
+                if self._running:
+                    await self._restart(index)
+
+    def _call(self, index: int, method: str, *args: Any) -> 'asyncio.Future[Any]':
+        future = asyncio.get_running_loop().create_future()
+        shard = self._shards[index] if index < len(self._shards) else None
+        writer = shard.writer if shard is not None else None
+        if writer is None:
+            future.set_exception(RuntimeError(f"Engine shard {index} is not running"))
+            return future
+        request_id = next(self._ids)
+        shard.waiting[request_id] = future
+        writer.write(encode_frame(_dumps(('call', request_id, method, args))))
+        return future
+
+    async def _call_all(self, method: str, *args: Any) -> List[Any]:
+        return await asyncio.gather(*(self._call(i, method, *args) for i in range(self.shard_count)))
+
+    def shard_for(self, task_id: str) -> int:
+        return self.ring.lookup(task_id)
+
+    async def register_handler(self, name: str, handler: Callable[[Chunk], Any], pool: Optional[str] = None):
+        """Register a chunk handler on every shard"""
+        self._handlers[name] = (handler, pool)
+        if self._running:
+            await self._call_all('register_handler', name, handler, pool)
+
+    async def create_task(
+        self,
+        name: str,
+        content: Any,
+        handler_name: str = "default",
+        auto_chunk: bool = True,
+        **options
+    ) -> Task:
+        """Create a task on the shard that owns its id"""
+        options['task_id'] = options.get('task_id') or new_task_id()
+        shard = self.shard_for(options['task_id'])
+        return await self._call(shard, 'create_task', name, content, handler_name, auto_chunk, options)
+
+    async def execute_task(self, task_id: str, handler_name: str = "default") -> Task:
+        return await self._call(self.shard_for(task_id), 'execute_task', task_id, handler_name)
+
+    def submit_task(self, task_id: str, handler_name: str = "default") -> 'asyncio.Future[Task]':
+        """Run a task in the background on its shard; resolves to the finished task"""
+        return self._call(self.shard_for(task_id), 'submit_task', task_id, handler_name)
+
+    async def get_task(self, task_id: str) -> Optional[Task]:
+        return await self._call(self.shard_for(task_id), 'get_task', task_id)
+
+    async def cancel_task(self, task_id: str) -> Task:
+        return await self._call(self.shard_for(task_id), 'cancel_task', task_id)
+
+    async def remove_task(self, task_id: str) -> Task:
+        return await self._call(self.shard_for(task_id), 'remove_task', task_id)
+
+    async def drop_results(self, task_id: str) -> Task:
+        return await self._call(self.shard_for(task_id), 'drop_results', task_id)
+
+    async def list_tasks(
+        self,
+        status: Optional[TaskStatus] = None,
+        priority: Optional[Priority] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        newest_first: bool = False,
+        offset: int = 0
+    ) -> Tuple[List[Task], Optional[str]]:
+        """List tasks across shards; same paging contract as DongolEngine.list_tasks"""
+        # Cursors are task ids and ids are global, so every shard resumes from the same one
+        pages = await self._call_all('list_tasks', status, priority, offset + limit + 1, cursor, newest_first)
+        merged = heapq.merge(*pages, key=lambda task: task.id, reverse=newest_first)
+        page = list(itertools.islice(merged, offset, offset + limit + 1))
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            if page:
+                next_cursor = encode_cursor(page[-1].id)
+        return page, next_cursor
+
+    async def search(
+        self,
+        pattern: str,
+        in_tasks: bool = True,
+        in_results: bool = True,
+        limit: Optional[int] = None,
+        prefix: bool = False
+    ) -> List[Task]:
+        pages = await self._call_all('search', pattern, in_tasks, in_results, limit, prefix)
+        # Newest first, as a single engine returns them
+        found = sorted((task for page in pages for task in page), key=lambda task: task.id, reverse=True)
+        return found[:limit] if limit is not None else found
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Statistics merged over every shard: counters summed, ratios averaged"""
+        merged = _merge_stats(await self._call_all('get_stats'))
+        tasks = merged.get('total_tasks', 0)
+        merged['avg_chunks_per_task'] = merged.get('total_chunks', 0) / tasks if tasks else 0
+        merged['shards'] = self.shard_count
+        merged['shard_restarts'] = self.restarts
+        return merged
@@ -0,0 +1,268 @@
+"""
+DONGOL Result Spilling - Keep task results under a memory budget
+"""
+from __future__ import annotations
+
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .engine import Task
+
+
+def estimate_size(obj: Any, _depth: int = 0) -> int:
+    """Cheap recursive size estimate in bytes (bounded depth)"""
+    size = sys.getsizeof(obj)
+    if _depth > 4:
+        return size
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += estimate_size(key, _depth + 1) + estimate_size(value, _depth + 1)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += estimate_size(item, _depth + 1)
+    return size
+
+
+@dataclass
+class SpilledResults:
+    """Lazy handle for task results that were written to the spill file"""
+    spiller: 'ResultSpiller'
+    task: 'Task'
+    offset: int
+    length: int
+    count: int
+    released: bool = False
+
+    def load(self) -> Dict[str, Any]:
+        return self.spiller.page_in(self)
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class SpillFile:
+    """
+    Append-only file holding pickled result payloads
+
+    Released regions stay in the file as dead bytes until nothing live
+    remains or compact() rewrites the live ones into a fresh file.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        if directory:
+            directory = os.path.expanduser(directory)
+            os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        fd, self.path = tempfile.mkstemp(prefix='dongol-spill-', suffix='.bin', dir=directory)
+        self._file = os.fdopen(fd, 'w+b')
+        self._lock = threading.Lock()
+        self.live_bytes = 0
+        self.dead_bytes = 0
+        self.compactions = 0
+
+    def write(self, obj: Any) -> Tuple[int, int]:
+        data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(data)
+            self._file.flush()
+            self.live_bytes += len(data)
+        return offset, len(data)
+
+    def read(self, offset: int, length: int) -> Any:
+        with self._lock:
+            self._file.seek(offset)
+            data = self._file.read(length)
+        return pickle.loads(data)
+
+    def release(self, length: int):
+        """Mark a region as garbage, truncating once nothing live remains"""
+        with self._lock:
+            self.live_bytes -= length
+            self.dead_bytes += length
+            if self.live_bytes <= 0:
+                self._file.truncate(0)
+                self.live_bytes = 0
+                self.dead_bytes = 0
+
+    def compact(self, regions: List[Tuple[int, int]]) -> List[int]:
+        """Copy the live (offset, length) regions into a new file; returns their new offsets"""
+        with self._lock:
+            fd, path = tempfile.mkstemp(prefix='dongol-spill-', suffix='.bin', dir=self.directory)
+            new_file = os.fdopen(fd, 'w+b')
+            offsets = []
+            for offset, length in regions:
+                self._file.seek(offset)
+                offsets.append(new_file.tell())
+                new_file.write(self._file.read(length))
+            new_file.flush()
+            self._file.close()
+            os.unlink(self.path)
+            self._file, self.path = new_file, path
+            self.live_bytes = sum(length for _, length in regions)
+            self.dead_bytes = 0
+            self.compactions += 1
+        return offsets
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+class ResultSpiller:
+    """
+    LRU accounting of resident task results with spill-to-disk
+
+    Tasks are tracked from the moment their results are set. When the
+    resident total exceeds the budget, the least recently used results are
+    pickled to the spill file and replaced by a SpilledResults handle.
+    Reading ``task.results`` pages them back in. Once released regions
+    make up compact_ratio of a file of at least compact_min_bytes, the
+    live ones are rewritten into a fresh file, so the file stays bounded
+    while some spilled results are always alive.
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int,
+        spill_dir: Optional[str] = None,
+        compact_ratio: float = 0.5,
+        compact_min_bytes: int = 1024 * 1024
+    ):
+        self.budget_bytes = budget_bytes
+        self.spill_dir = spill_dir
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self.resident_bytes = 0
+        self.spilled_tasks = 0
+        self.spill_count = 0
+        self.page_in_count = 0
+        self._resident: 'OrderedDict[str, Tuple[Task, int]]' = OrderedDict()
+        # Live handles into the spill file, by id, for compaction to move
+        self._spilled: Dict[int, SpilledResults] = {}
+        self._file: Optional[SpillFile] = None
+
+    def _spill_file(self) -> SpillFile:
+        if self._file is None:
+            self._file = SpillFile(self.spill_dir)
+        return self._file
+
+    def adopt(self, task: 'Task'):
+        """Put a task's results under this spiller's budget"""
+        task.__dict__['_spiller'] = self
+        self.track(task)
+
+    def track(self, task: 'Task'):
+        """Account for a task's resident results and enforce the budget"""
+        self._untrack(task.id)
+        results = task.__dict__.get('_results')
+        if isinstance(results, SpilledResults) or not results:
+            return
+        size = estimate_size(results)
+        self._resident[task.id] = (task, size)
+        self.resident_bytes += size
+        self._enforce()
+
+    def touch(self, task: 'Task'):
+        """Mark a task's results as recently used"""
+        if task.id in self._resident:
+            self._resident.move_to_end(task.id)
+
+    def forget(self, task: 'Task'):
+        """Drop all accounting for a task (resident or spilled)"""
+        self._untrack(task.id)
+        task.__dict__.pop('_spiller', None)
+        results = task.__dict__.get('_results')
+        if isinstance(results, SpilledResults) and results.spiller is self:
+            self.release(results)
+
+    def _untrack(self, task_id: str):
+        entry = self._resident.pop(task_id, None)
+        if entry is not None:
+            self.resident_bytes -= entry[1]
+
+    def _enforce(self):
+        # Always keep the most recently used entry resident
+        while self.resident_bytes > self.budget_bytes and len(self._resident) > 1:
+            task_id, (task, size) = self._resident.popitem(last=False)
+            self.resident_bytes -= size
+            self._spill(task)
+
+    def _spill(self, task: 'Task'):
+        results = task.__dict__.get('_results')
+        offset, length = self._spill_file().write(results)
+        handle = task.__dict__['_results'] = SpilledResults(self, task, offset, length, len(results))
+        self._spilled[id(handle)] = handle
+        self.spilled_tasks += 1
+        self.spill_count += 1
+
+    def release(self, handle: SpilledResults):
+        """Free the spill file region behind a handle"""
+        if handle.released:
+            return
+        handle.released = True
+        self._spilled.pop(id(handle), None)
+        self.spilled_tasks -= 1
+        if self._file is not None:
+            self._file.release(handle.length)
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        spill = self._file
+        size = spill.live_bytes + spill.dead_bytes
+        if size < self.compact_min_bytes or spill.dead_bytes < size * self.compact_ratio:
+            return
+        handles = sorted(self._spilled.values(), key=lambda h: h.offset)
+        offsets = spill.compact([(h.offset, h.length) for h in handles])
+        for handle, offset in zip(handles, offsets):
+            handle.offset = offset
+
+    def page_in(self, handle: SpilledResults) -> Dict[str, Any]:
+        """Load spilled results back into memory and re-admit them"""
+        if self._file is None or handle.released:
+            # Spill file was closed with the engine; the payload is gone
+            results: Dict[str, Any] = {}
+        else:
+            results = self._file.read(handle.offset, handle.length)
+        self.release(handle)
+        self.page_in_count += 1
+        task = handle.task
+        if task.__dict__.get('_results') is handle:
+            task.__dict__['_results'] = results
+            self.track(task)
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'budget_bytes': self.budget_bytes,
+            'resident_bytes': self.resident_bytes,
+            'resident_tasks': len(self._resident),
+            'spilled_tasks': self.spilled_tasks,
+            'spill_count': self.spill_count,
+            'page_in_count': self.page_in_count,
+            'spill_file_bytes': self._file.live_bytes if self._file else 0,
+            'spill_file_dead_bytes': self._file.dead_bytes if self._file else 0,
+            'compactions': self._file.compactions if self._file else 0,
+        }
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._resident.clear()
+        self._spilled.clear()
+        self.resident_bytes = 0
+        self.spilled_tasks = 0
@@ -0,0 +1,121 @@
+"""
+DONGOL Engine Statistics - Counters maintained incrementally
+"""
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from .engine import Task, TaskStatus
+
+
+class RateCounter:
+    """
+    Events per second over a sliding window of one-second buckets
+    """
+
+    def __init__(self, window_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self._counts: List[int] = [0] * window_seconds
+        self._seconds: List[int] = [0] * window_seconds
+
+    def add(self, n: int = 1, now: Optional[float] = None):
+        second = int(now if now is not None else time.time())
+        slot = second % self.window_seconds
+        if self._seconds[slot] != second:
+            self._seconds[slot] = second
+            self._counts[slot] = 0
+        self._counts[slot] += n
+
+    def rate(self, now: Optional[float] = None) -> float:
+        second = int(now if now is not None else time.time())
+        oldest = second - self.window_seconds
+        total = sum(
+            count for count, sec in zip(self._counts, self._seconds) if sec > oldest
+        )
+        return total / self.window_seconds
+
+
+class EngineStats:
+    """
+    O(1) engine counters updated on task and chunk transitions
+
+    The engine calls the hooks below whenever a task is added or removed,
+    changes status, or a chunk starts or finishes, so reading the stats
+    never has to walk the task table.
+    """
+
+    def __init__(self, window_seconds: int = 60):
+        self.total_tasks = 0
+        self.total_chunks = 0
+        self.chunks_in_flight = 0
+        self.pending_chunks = 0
+        self.chunks_completed = 0
+        self.chunks_failed = 0
+        self.tasks_completed = 0
+        self.status_counts: Dict[str, int] = {}
+        self.task_rate = RateCounter(window_seconds)
+        self.chunk_rate = RateCounter(window_seconds)
+
+    def task_added(self, task: 'Task'):
+        self.total_tasks += 1
+        self.total_chunks += len(task.chunks)
+        self._count_status(task.status, 1)
+
+    def task_removed(self, task: 'Task'):
+        self.total_tasks -= 1
+        self.total_chunks -= len(task.chunks)
+        self._count_status(task.status, -1)
+
+    def chunks_added(self, count: int):
+        self.total_chunks += count
+
+    def status_changed(self, old: 'TaskStatus', new: 'TaskStatus'):
+        self._count_status(old, -1)
+        self._count_status(new, 1)
+        if new.name == 'COMPLETED':
+            self.tasks_completed += 1
+            self.task_rate.add()
+
+    def chunks_scheduled(self, count: int):
+        """Chunks of running tasks that are queued or executing"""
+        self.pending_chunks += count
+
+    def chunks_settled(self, count: int):
+        self.pending_chunks -= count
+
+    def chunk_started(self):
+        self.chunks_in_flight += 1
+
+    def chunk_finished(self, ok: bool = True):
+        self.chunks_in_flight -= 1
+        if ok:
+            self.chunks_completed += 1
+            self.chunk_rate.add()
+        else:
+            self.chunks_failed += 1
+
+    def _count_status(self, status: 'TaskStatus', delta: int):
+        count = self.status_counts.get(status.name, 0) + delta
+        if count:
+            self.status_counts[status.name] = count
+        else:
+            self.status_counts.pop(status.name, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'total_tasks': self.total_tasks,
+            'total_chunks': self.total_chunks,
+            'status_distribution': dict(self.status_counts),
+            'avg_chunks_per_task': (
+                self.total_chunks / self.total_tasks if self.total_tasks > 0 else 0
+            ),
+            'chunks_in_flight': self.chunks_in_flight,
+            'pending_chunks': self.pending_chunks,
+            'chunks_completed': self.chunks_completed,
+            'chunks_failed': self.chunks_failed,
+            'tasks_completed': self.tasks_completed,
+            'tasks_completed_per_sec': self.task_rate.rate(),
+            'chunks_completed_per_sec': self.chunk_rate.rate(),
+        }
@@ -0,0 +1,642 @@
+"""
+DONGOL Shared Store - SQLite task registry and job queue for multi-process engines
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .engine import FINISHED_STATUSES, DongolEngine, Priority, ResultFeed, Task, TaskStatus
+from .search import FIELD_RESULTS
+
+logger = logging.getLogger(__name__)
+
+# Task fields persisted in the record blob; results are stored per chunk
+_TASK_FIELDS = (
+    'id', 'name', 'description', 'chunks', 'created_at', 'started_at', 'completed_at',
+    'metadata', 'parallel_mode', 'max_workers', 'completed_chunks',
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    record BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    task_id TEXT NOT NULL,
+    chunk_id TEXT NOT NULL,
+    result BLOB NOT NULL,
+    PRIMARY KEY (task_id, chunk_id)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    task_id TEXT PRIMARY KEY,
+    handler TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    enqueued_at REAL NOT NULL,
+    claimed_by TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_priority ON jobs (priority, enqueued_at);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    chunk_id TEXT,
+    origin TEXT NOT NULL
+);
+"""
+
+Change = Tuple[int, str, str, Optional[str]]
+# (id, status, priority, pickled record) and (task_id, chunk_id, pickled result)
+TaskRow = Tuple[str, str, int, bytes]
+ResultRow = Tuple[str, str, bytes]
+# A task record and, for a finished task, its results
+TaskSnapshot = Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+def _dumps(obj: Any) -> bytes:
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class SharedStore:
+    """
+    Task registry, result table and job queue in one SQLite database
+
+    Several engine processes open the same file in WAL mode, so readers
+    never block the writer. Every write appends to a change log that the
+    other processes tail to keep their in-memory task tables current, and
+    execution requests go through a leased job queue that any process can
+    claim from.
+    """
+
+    def __init__(self, path: str, worker_id: Optional[str] = None, lease_seconds: float = 30.0):
+        self.path = os.path.expanduser(path)
+        self.worker_id = worker_id or f"{os.getpid()}-{os.urandom(2).hex()}"
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _log(self, conn: sqlite3.Connection, task_id: str, kind: str, chunk_id: Optional[str] = None):
+        conn.execute(
+            'INSERT INTO changes (task_id, kind, chunk_id, origin) VALUES (?, ?, ?, ?)',
+            (task_id, kind, chunk_id, self.worker_id)
+        )
+
+    # Tasks and results
+
+    @staticmethod
+    def task_rows(tasks: Iterable['Task']) -> List[TaskRow]:
+        """Pickle task records, on the thread that owns the tasks"""
+        rows = []
+        for task in tasks:
+            record = {name: getattr(task, name) for name in _TASK_FIELDS}
+            record['status'] = task.status.name
+            record['priority'] = task.priority.value
+            rows.append((task.id, task.status.name, task.priority.value, _dumps(record)))
+        return rows
+
+    @staticmethod
+    def result_rows(items: Iterable[Tuple[str, str, Any]]) -> List[ResultRow]:
+        return [(task_id, chunk_id, _dumps(result)) for task_id, chunk_id, result in items]
+
+    def put_tasks(self, tasks: Iterable['Task']):
+        """Upsert task records in one transaction"""
+        self.put_task_rows(self.task_rows(tasks))
+
+    def put_task_rows(self, rows: Iterable[TaskRow]):
+        with self._transaction() as conn:
+            for row in rows:
+                conn.execute(
+                    'INSERT OR REPLACE INTO tasks (id, status, priority, record) VALUES (?, ?, ?, ?)', row
+                )
+                self._log(conn, row[0], 'task')
+
+    def put_results(self, items: Iterable[Tuple[str, str, Any]]):
+        """Store (task_id, chunk_id, result) rows in one transaction"""
+        self.put_result_rows(self.result_rows(items))
+
+    def put_result_rows(self, rows: Iterable[ResultRow]):
+        with self._transaction() as conn:
+            for row in rows:
+                conn.execute(
+                    'INSERT OR REPLACE INTO results (task_id, chunk_id, result) VALUES (?, ?, ?)', row
+                )
+                self._log(conn, row[0], 'result', row[1])
+
+    def delete_task(self, task_id: str):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
+            conn.execute('DELETE FROM results WHERE task_id = ?', (task_id,))
+            conn.execute('DELETE FROM jobs WHERE task_id = ?', (task_id,))
+            self._log(conn, task_id, 'delete')
+
+    def drop_results(self, task_id: str):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM results WHERE task_id = ?', (task_id,))
+
+    def load_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Task record as a dict of fields (status by name, priority by value)"""
+        rows = self._query('SELECT record FROM tasks WHERE id = ?', (task_id,))
+        return pickle.loads(rows[0][0]) if rows else None
+
+    def task_ids(self) -> List[str]:
+        return [row[0] for row in self._query('SELECT id FROM tasks ORDER BY id')]
+
+    def load_results(self, task_id: str) -> Dict[str, Any]:
+        rows = self._query('SELECT chunk_id, result FROM results WHERE task_id = ?', (task_id,))
+        return {chunk_id: pickle.loads(blob) for chunk_id, blob in rows}
+
+    def load_result(self, task_id: str, chunk_id: str) -> Tuple[bool, Any]:
+        rows = self._query(
+            'SELECT result FROM results WHERE task_id = ? AND chunk_id = ?', (task_id, chunk_id)
+        )
+        return (True, pickle.loads(rows[0][0])) if rows else (False, None)
+
+    # Change log
+
+    def last_seq(self) -> int:
+        rows = self._query('SELECT MAX(seq) FROM changes')
+        return rows[0][0] or 0
+
+    def changes_since(self, seq: int, limit: int = 1000) -> List[Change]:
+        """Changes made by other processes after a sequence number"""
+        return self._query(
+            'SELECT seq, task_id, kind, chunk_id FROM changes '
+            'WHERE seq > ? AND origin != ? ORDER BY seq LIMIT ?',
+            (seq, self.worker_id, limit)
+        )
+
+    def first_seq(self) -> int:
+        rows = self._query('SELECT MIN(seq) FROM changes')
+        return rows[0][0] or 0
+
+    def trim_changes(self, keep: int):
+        """Drop all but the newest keep entries of the change log"""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?', (keep,))
+
+    # Job queue
+
+    def enqueue(self, task_id: str, handler: str, priority: int) -> bool:
+        """Queue a task for execution; False if it is already queued or running"""
+        with self._transaction() as conn:
+            cur = conn.execute(
+                'INSERT OR IGNORE INTO jobs (task_id, handler, priority, enqueued_at) VALUES (?, ?, ?, ?)',
+                (task_id, handler, priority, time.time())
+            )
+            return cur.rowcount == 1
+
+    def claim(self, limit: int = 1, now: Optional[float] = None) -> List[Tuple[str, str]]:
+        """Claim up to limit jobs (unclaimed or with an expired lease) by priority"""
+        if limit <= 0:
+            return []
+        now = now if now is not None else time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                'SELECT task_id, handler FROM jobs '
+                'WHERE claimed_by IS NULL OR lease_until < ? '
+                'ORDER BY priority, enqueued_at LIMIT ?',
+                (now, limit)
+            ).fetchall()
+            conn.executemany(
+                'UPDATE jobs SET claimed_by = ?, lease_until = ? WHERE task_id = ?',
+                [(self.worker_id, now + self.lease_seconds, task_id) for task_id, _ in rows]
+            )
+        return rows
+
+    def renew(self, task_ids: Iterable[str], now: Optional[float] = None):
+        """Extend the lease on jobs this process is still running"""
+        now = now if now is not None else time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                'UPDATE jobs SET lease_until = ? WHERE task_id = ? AND claimed_by = ?',
+                [(now + self.lease_seconds, task_id, self.worker_id) for task_id in task_ids]
+            )
+
+    def finish_job(self, task_id: str):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM jobs WHERE task_id = ?', (task_id,))
+            self._log(conn, task_id, 'job_done')
+
+    def dequeue(self, task_id: str) -> bool:
+        """Drop a job nobody has claimed yet; False if it is already running"""
+        with self._transaction() as conn:
+            cur = conn.execute(
+                'DELETE FROM jobs WHERE task_id = ? AND claimed_by IS NULL', (task_id,)
+            )
+            if cur.rowcount != 1:
+                return False
+            self._log(conn, task_id, 'job_done')
+            return True
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class StoreSync:
+    """
+    Keeps an engine's task table in step with a SharedStore
+
+    Local writes go to the store (task records as they are saved, chunk
+    results and progress in batches once per tick) and changes made by
+    other processes are applied from the change log, so every process
+    holds the full task table and its indexes answer reads locally.
+    Execution requests become store jobs; each process claims jobs up to
+    its own limit and runs them with its registered handlers.
+
+    Records are pickled on the event loop, but the SQLite transactions
+    run in order on one store thread, so a save never waits on the
+    database. Reads (the change log, the rows it points at, job claims)
+    run there too and are applied on the loop.
+    """
+
+    def __init__(
+        self,
+        engine: DongolEngine,
+        store: SharedStore,
+        sync_interval: float = 0.02,
+        max_claimed_jobs: int = 4,
+        change_log_size: int = 100000
+    ):
+        self.engine = engine
+        self.store = store
+        self.sync_interval = sync_interval
+        self.max_claimed_jobs = max_claimed_jobs
+        self.change_log_size = change_log_size
+        self.applied_changes = 0
+        self.sync_errors = 0
+        self._seq = 0
+        self._applying = False
+        self._dirty: Dict[str, Task] = {}
+        self._results: List[Tuple[str, str, Any]] = []
+        self._claimed: Set[str] = set()
+        self._waiters: Dict[str, List['asyncio.Future[Optional[Task]]']] = {}
+        self._last_renew = 0.0
+        self._ticks = 0
+        self._write_error: Optional[BaseException] = None
+        # The store blocks, so every write runs on this one thread, in order
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dongol-store')
+
+    async def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._io, fn, *args)
+
+    def _write(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Queue a store write behind the ones already waiting"""
+        future = self._io.submit(fn, *args)
+        future.add_done_callback(self._write_done)
+        return future
+
+    def _write_done(self, future: Future):
+        error = future.exception()
+        if error is not None and self._write_error is None:
+            self._write_error = error
+
+    # Local writes
+
+    def task_saved(self, task: Task):
+        """Write a task record through to the store (with any pending results)"""
+        if self._applying or task.id not in self.engine.tasks:
+            return
+        self._dirty[task.id] = task
+        self._write_pending()
+
+    def task_touched(self, task: Task):
+        """Mark a task's progress for the next batched write"""
+        if not self._applying:
+            self._dirty[task.id] = task
+
+    def result_added(self, task: Task, chunk_id: str, result: Any):
+        if not self._applying:
+            self._results.append((task.id, chunk_id, result))
+            self._dirty[task.id] = task
+
+    def task_deleted(self, task_id: str):
+        self._dirty.pop(task_id, None)
+        if not self._applying:
+            self._results = [item for item in self._results if item[0] != task_id]
+            self._write(self.store.delete_task, task_id)
+        self._resolve(task_id)
+
+    def results_dropped(self, task: Task):
+        if not self._applying:
+            self._results = [item for item in self._results if item[0] != task.id]
+            self._write(self.store.drop_results, task.id)
+            self.task_saved(task)
+
+    def _write_pending(self):
+        """Hand batched results and task records to the writer thread
+
+        A batch that fails to write is queued again for the next tick.
+        """
+        loop = asyncio.get_running_loop()
+        if self._results:
+            results, self._results = self._results, []
+            self._write(self.store.put_result_rows, self.store.result_rows(results)).add_done_callback(
+                functools.partial(self._unwritten, loop, results, [])
+            )
+        if self._dirty:
+            dirty, self._dirty = self._dirty, {}
+            tasks = [t for t in dirty.values() if t.id in self.engine.tasks]
+            if tasks:
+                self._write(self.store.put_task_rows, self.store.task_rows(tasks)).add_done_callback(
+                    functools.partial(self._unwritten, loop, [], tasks)
+                )
+
+    def _unwritten(self, loop: asyncio.AbstractEventLoop, results: List[Tuple[str, str, Any]],
+                   tasks: List[Task], future: Future):
+        if future.exception() is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._requeue, results, tasks)
+
+    def _requeue(self, results: List[Tuple[str, str, Any]], tasks: List[Task]):
+        # Ahead of anything batched since, so results keep their order
+        self._results[:0] = [item for item in results if item[0] in self.engine.tasks]
+        for task in tasks:
+            if task.id in self.engine.tasks:
+                self._dirty.setdefault(task.id, task)
+
+    async def flush(self):
+        """Write batched results and task records, returning once they are stored"""
+        self._write_pending()
+        # The writer runs in order, so this returns after everything queued before it
+        await self._call(int)
+        error, self._write_error = self._write_error, None
+        if error is not None:
+            raise error
+
+    # Jobs
+
+    def submit(self, task: Task, handler_name: str) -> 'asyncio.Future[Optional[Task]]':
+        """Queue a task for whichever process claims it; resolves when the run ends
+
+        The job is enqueued behind the task's pending writes, so whoever
+        claims it finds the record. The future fails with RuntimeError if
+        the task is already queued or running.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._write_pending()
+        self._write(self.store.enqueue, task.id, handler_name, task.priority.value).add_done_callback(
+            lambda queued: loop.call_soon_threadsafe(self._queued, task.id, waiter, queued)
+        )
+        return waiter
+
+    def _queued(self, task_id: str, waiter: 'asyncio.Future[Optional[Task]]', queued: Future):
+        if waiter.done():
+            return
+        error = queued.exception()
+        if error is None and not queued.result():
+            error = RuntimeError(f"Task {task_id} is already running")
+        if error is not None:
+            waiter.set_exception(error)
+        else:
+            self._waiters.setdefault(task_id, []).append(waiter)
+
+    def cancel(self, task_id: str):
+        """Drop a queued job before anyone claims it"""
+        loop = asyncio.get_running_loop()
+
+        def dequeue():
+            if self.store.dequeue(task_id):
+                loop.call_soon_threadsafe(self._resolve, task_id)
+
+        self._write(dequeue)
+
+    def _resolve(self, task_id: str):
+        for waiter in self._waiters.pop(task_id, []):
+            if not waiter.done():
+                waiter.set_result(self.engine.tasks.get(task_id))
+
+    async def _claim(self):
+        free = self.max_claimed_jobs - len(self._claimed)
+        if free <= 0:
+            return
+        for task_id, handler_name in await self._call(self.store.claim, free):
+            if task_id not in self.engine.tasks:
+                await self.refresh(task_id)
+            if task_id not in self.engine.tasks or task_id in self.engine._jobs:
+                self._write(self.store.finish_job, task_id)
+                continue
+            self._claimed.add(task_id)
+            self.engine._jobs[task_id] = asyncio.create_task(
+                self._run_claimed(task_id, handler_name)
+            )
+
+    async def _run_claimed(self, task_id: str, handler_name: str):
+        try:
+            await self.engine.execute_task(task_id, handler_name)
+        except Exception:
+            # Failure is recorded on the task itself
+            pass
+        finally:
+            self.engine._jobs.pop(task_id, None)
+            self._claimed.discard(task_id)
+            self._write_pending()
+            self._write(self.store.finish_job, task_id)
+            self._resolve(task_id)
+
+    # Remote changes
+
+    def _read_snapshot(self) -> Tuple[int, Dict[str, TaskSnapshot]]:
+        seq = self.store.last_seq()
+        return seq, {task_id: self._read_task(task_id) for task_id in self.store.task_ids()}
+
+    def _read_task(self, task_id: str) -> TaskSnapshot:
+        record = self.store.load_task(task_id)
+        if record is None or TaskStatus[record['status']] not in FINISHED_STATUSES:
+            return record, None
+        return record, self.store.load_results(task_id)
+
+    def _read_changes(self, changes: List[Change]) -> List[Any]:
+        """The rows each change points at, read in one trip to the store thread"""
+        rows: List[Any] = []
+        for _, task_id, kind, chunk_id in changes:
+            if kind == 'task':
+                rows.append(self._read_task(task_id))
+            elif kind == 'result':
+                rows.append(self.store.load_result(task_id, chunk_id))
+            else:
+                rows.append(None)
+        return rows
+
+    async def hydrate(self):
+        """Load the whole shared table, e.g. on start or after falling behind"""
+        self._seq, snapshot = await self._call(self._read_snapshot)
+        for task_id in list(self.engine.tasks):
+            if task_id not in snapshot and task_id not in self.engine._jobs:
+                self._apply_delete(task_id)
+        for task_id in sorted(snapshot):
+            self._apply_task(task_id, *snapshot[task_id])
+
+    async def sync_once(self):
+        """One tick: flush local writes, apply remote ones, renew and claim jobs"""
+        await self.flush()
+        if self._seq and await self._call(self.store.first_seq) > self._seq + 1:
+            # The change log was trimmed past us; start over from a snapshot
+            await self.hydrate()
+        while True:
+            changes = await self._call(self.store.changes_since, self._seq)
+            rows = await self._call(self._read_changes, changes)
+            for (seq, task_id, kind, chunk_id), row in zip(changes, rows):
+                self._seq = seq
+                self.applied_changes += 1
+                if kind == 'task':
+                    self._apply_task(task_id, *row)
+                elif kind == 'result':
+                    self._apply_result(task_id, chunk_id, *row)
+                elif kind == 'delete':
+                    self._apply_delete(task_id)
+                elif kind == 'job_done':
+                    self._resolve(task_id)
+            if len(changes) < 1000:
+                break
+
+        now = time.time()
+        if self._claimed and now - self._last_renew > self.store.lease_seconds / 3:
+            self._write(self.store.renew, set(self._claimed), now)
+            self._last_renew = now
+        await self._claim()
+
+        self._ticks += 1
+        if self._ticks % 1000 == 0:
+            self._write(self.store.trim_changes, self.change_log_size)
+
+    async def run(self):
+        """Background sync loop; a failed tick is logged and retried with backoff"""
+        delay = self.sync_interval
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.sync_once()
+            except Exception:
+                self.sync_errors += 1
+                delay = min(delay * 2, 5.0)
+                logger.exception("Shared store sync failed; retrying in %.2fs", delay)
+            else:
+                delay = self.sync_interval
+
+    async def refresh(self, task_id: str):
+        """Pull one task from the store ahead of the change log"""
+        self._apply_task(task_id, *await self._call(self._read_task, task_id))
+
+    def _apply_task(self, task_id: str, record: Optional[Dict[str, Any]],
+                    results: Optional[Dict[str, Any]]):
+        engine = self.engine
+        if record is None:
+            return
+        status = TaskStatus[record.pop('status')]
+        priority = Priority(record.pop('priority'))
+
+        if task_id in engine._jobs:
+            # This process runs the task and owns its state; only a cancel wins
+            if status == TaskStatus.CANCELLED:
+                engine._jobs[task_id].cancel()
+            return
+
+        self._applying = True
+        try:
+            task = engine.tasks.get(task_id)
+            if task is None:
+                task = Task(status=status, priority=priority, **record)
+                if status in FINISHED_STATUSES:
+                    task.results = results
+                engine._add_task(task)
+                if status in FINISHED_STATUSES:
+                    engine.retention.task_finished(task)
+                    engine.search_index.add(task_id, task.results, FIELD_RESULTS)
+                elif status == TaskStatus.RUNNING:
+                    engine._feeds.setdefault(task_id, ResultFeed())
+                return
+
+            old_chunks = len(task.chunks)
+            # A rerun may finish between two ticks without a visible status change
+            rerun = record['completed_at'] != task.completed_at
+            for name, value in record.items():
+                if name != 'id':
+                    setattr(task, name, value)
+            engine.stats.chunks_added(len(task.chunks) - old_chunks)
+            if status == task.status and not (status in FINISHED_STATUSES and rerun):
+                return
+
+            if status == TaskStatus.RUNNING:
+                task.results = {}
+                engine.search_index.remove_field(task_id, FIELD_RESULTS)
+                engine._feeds.setdefault(task_id, ResultFeed())
+            engine._set_status(task, status)
+            if status in FINISHED_STATUSES:
+                engine.search_index.remove_field(task_id, FIELD_RESULTS)
+                task.results = results
+                engine.search_index.add(task_id, task.results, FIELD_RESULTS)
+                feed = engine._feeds.pop(task_id, None)
+                if feed is not None:
+                    feed.close()
+        finally:
+            self._applying = False
+
+    def _apply_result(self, task_id: str, chunk_id: Optional[str], found: bool, result: Any):
+        engine = self.engine
+        task = engine.tasks.get(task_id)
+        if not found or task is None or task_id in engine._jobs or task.status != TaskStatus.RUNNING:
+            return
+        task.results[chunk_id] = result
+        engine.search_index.add(task_id, result, FIELD_RESULTS)
+        feed = engine._feeds.get(task_id)
+        if feed is not None:
+            feed.append(chunk_id, result)
+
+    def _apply_delete(self, task_id: str):
+        if task_id not in self.engine.tasks:
+            return
+        self._applying = True
+        try:
+            self.engine.remove_task(task_id)
+        finally:
+            self._applying = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'worker_id': self.store.worker_id,
+            'seq': self._seq,
+            'applied_changes': self.applied_changes,
+            'sync_errors': self.sync_errors,
+            'claimed_jobs': len(self._claimed),
+        }
+
+    def close(self):
+        self._write_pending()
+        self._io.shutdown(wait=True)
+        for task_id in list(self._waiters):
+            self._resolve(task_id)
+        self.store.close()
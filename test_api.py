@@ -48,7 +48,7 @@ print(f"  Total tasks: {len(r.json())}\n")
 
 # Test execute
 print(f"POST /tasks/{task_id[:8]}.../execute")
-r = client.post(f"/tasks/{task_id}/execute")
+r = client.post(f"/tasks/{task_id}/execute", params={"wait": True})
 print(f"  Status: {r.status_code}")
 result = r.json()
 print(f"  Duration: {result['duration_ms']:.2f}ms")
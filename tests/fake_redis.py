@@ -0,0 +1,192 @@
+"""
+Tiny in-process stand-in for a Redis server, covering the commands RedisQueue uses
+"""
+import socket
+import socketserver
+import threading
+from typing import Any, Dict, List, Tuple
+
+
+class _State:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data: Dict[bytes, Any] = {}
+        self.versions: Dict[bytes, int] = {}
+
+    def touch(self, key: bytes):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+
+def _encode(value: Any) -> bytes:
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, Exception):
+        return b'-ERR %s\r\n' % str(value).encode()
+    if isinstance(value, str):
+        return b'+%s\r\n' % value.encode()
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, bytes):
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+    return b'*%d\r\n' % len(value) + b''.join(_encode(v) for v in value)
+
+
+def _score(raw: bytes) -> float:
+    return float(raw)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.watched: Dict[bytes, int] = {}
+        self.queued: List[List[bytes]] = []
+        self.in_multi = False
+
+    def read_command(self) -> List[bytes]:
+        line = self.rfile.readline()
+        if not line:
+            raise EOFError
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        state: _State = self.server.state
+        while True:
+            try:
+                args = self.read_command()
+            except (EOFError, ConnectionError):
+                return
+            name = args[0].upper()
+            if self.in_multi and name not in (b'EXEC', b'DISCARD'):
+                self.queued.append(args)
+                reply: Any = 'QUEUED'
+            elif name == b'MULTI':
+                self.in_multi, self.queued = True, []
+                reply = 'OK'
+            elif name == b'DISCARD':
+                self.in_multi, self.queued, self.watched = False, [], {}
+                reply = 'OK'
+            elif name == b'EXEC':
+                with state.lock:
+                    if any(state.versions.get(k, 0) != v for k, v in self.watched.items()):
+                        reply = None
+                    else:
+                        reply = [self.run(state, cmd) for cmd in self.queued]
+                self.in_multi, self.queued, self.watched = False, [], {}
+            elif name == b'WATCH':
+                with state.lock:
+                    for key in args[1:]:
+                        self.watched[key] = state.versions.get(key, 0)
+                reply = 'OK'
+            elif name == b'UNWATCH':
+                self.watched = {}
+                reply = 'OK'
+            else:
+                with state.lock:
+                    reply = self.run(state, args)
+            self.wfile.write(_encode(reply))
+
+    def run(self, state: _State, args: List[bytes]) -> Any:
+        name, rest = args[0].upper(), args[1:]
+        try:
+            return getattr(self, 'cmd_' + name.decode().lower())(state, *rest)
+        except AttributeError:
+            return Exception(f"unknown command {name.decode()}")
+
+    def cmd_ping(self, state, *args):
+        return 'PONG'
+
+    def cmd_auth(self, state, *args):
+        return 'OK'
+
+    def cmd_select(self, state, *args):
+        return 'OK'
+
+    def cmd_zadd(self, state, key, *args):
+        flags = set()
+        while args and args[0].upper() in (b'NX', b'XX'):
+            flags.add(args[0].upper())
+            args = args[1:]
+        zset = state.data.setdefault(key, {})
+        added = 0
+        for i in range(0, len(args), 2):
+            score, member = _score(args[i]), args[i + 1]
+            exists = member in zset
+            if (b'NX' in flags and exists) or (b'XX' in flags and not exists):
+                continue
+            added += not exists
+            zset[member] = score
+        state.touch(key)
+        return added
+
+    def cmd_zrangebyscore(self, state, key, low, high, *args):
+        zset = state.data.get(key, {})
+        members = sorted(
+            (score, member) for member, score in zset.items() if _score(low) <= score <= _score(high)
+        )
+        if args and args[0].upper() == b'LIMIT':
+            offset, count = int(args[1]), int(args[2])
+            members = members[offset:offset + count]
+        return [member for _, member in members]
+
+    def cmd_zrem(self, state, key, *members):
+        zset = state.data.get(key, {})
+        removed = sum(1 for m in members if zset.pop(m, None) is not None)
+        state.touch(key)
+        return removed
+
+    def cmd_zcard(self, state, key):
+        return len(state.data.get(key, {}))
+
+    def cmd_hset(self, state, key, *args):
+        table = state.data.setdefault(key, {})
+        added = 0
+        for i in range(0, len(args), 2):
+            added += args[i] not in table
+            table[args[i]] = args[i + 1]
+        state.touch(key)
+        return added
+
+    def cmd_hmget(self, state, key, *fields):
+        table = state.data.get(key, {})
+        return [table.get(f) for f in fields]
+
+    def cmd_hdel(self, state, key, *fields):
+        table = state.data.get(key, {})
+        removed = sum(1 for f in fields if table.pop(f, None) is not None)
+        state.touch(key)
+        return removed
+
+    def cmd_hincrby(self, state, key, field, amount):
+        table = state.data.setdefault(key, {})
+        value = int(table.get(field, b'0')) + int(amount)
+        table[field] = str(value).encode()
+        state.touch(key)
+        return value
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.state = _State()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server_address
+
+    def __enter__(self) -> 'FakeRedisServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,40 @@
+"""
+Handlers run in worker processes by the tests
+"""
+import os
+import time
+
+from core.broadcast import get_broadcast
+
+
+def folder_for(chunk):
+    """Look a chunk's file extension up in the broadcast rules"""
+    return get_broadcast('rules').get(os.path.splitext(chunk.content['value'])[1])
+
+
+
+def spin(chunk):
+    """Hold the GIL for about 10ms"""
+    deadline = time.thread_time() + 0.01
+    while time.thread_time() < deadline:
+        pass
+    return os.getpid()
+
+
+def nap(chunk):
+    """Wait about 10ms without using the CPU"""
+    time.sleep(0.01)
+    return os.getpid()
+
+
+def stall(chunk):
+    """Wait long enough for a test to act while the chunk runs"""
+    time.sleep(5)
+    return os.getpid()
+
+
+# Registered by name in each worker; lambdas are fine since they are never pickled
+HANDLERS = {
+    'worker_pid': lambda chunk: os.getpid(),
+    'length': lambda chunk: len(chunk.content),
+}
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+DONGOL API Server Tests
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+from api import server
+from api.admission import AdmissionController
+from api.idempotency import IdempotencyCache
+
+
+@pytest.fixture
+def client():
+    server._engine = None
+    server.admission = AdmissionController()
+    server.idempotency = IdempotencyCache()
+    with TestClient(server.app) as test_client:
+        yield test_client
+    server._engine = None
+
+
+class TestTaskEndpoints:
+    """Test task CRUD endpoints"""
+    
+    def test_create_and_get_task(self, client):
+        r = client.post("/tasks", json={"name": "API Test", "content": "hello world"})
+        assert r.status_code == 200
+        task_id = r.json()["id"]
+        
+        r = client.get(f"/tasks/{task_id}")
+        assert r.status_code == 200
+        assert r.json()["name"] == "API Test"
+    
+    def test_list_tasks_cursor_pagination(self, client):
+        ids = [
+            client.post("/tasks", json={"name": f"T{i}", "content": "x"}).json()["id"]
+            for i in range(5)
+        ]
+        
+        r = client.get("/tasks", params={"limit": 2, "order": "desc"})
+        assert [t["id"] for t in r.json()] == [ids[4], ids[3]]
+        cursor = r.headers["X-Next-Cursor"]
+        
+        r = client.get("/tasks", params={"limit": 2, "order": "desc", "cursor": cursor})
+        assert [t["id"] for t in r.json()] == [ids[2], ids[1]]
+        
+        r = client.get("/tasks", params={"limit": 0})
+        assert r.status_code == 200
+        assert r.json() == []
+        
+        r = client.get("/tasks", params={"status": "bogus"})
+        assert r.status_code == 400
+    
+    def test_search_endpoint(self, client):
+        task_id = client.post("/tasks", json={"name": "Quarterly budget", "content": "x"}).json()["id"]
+        client.post("/tasks", json={"name": "Unrelated", "content": "x"})
+        
+        r = client.get("/search", params={"q": "budg*", "scope": "tasks"})
+        assert r.status_code == 200
+        assert [t["id"] for t in r.json()] == [task_id]
+
+
+class TestMetrics:
+    """Test the Prometheus metrics endpoint"""
+    
+    def test_metrics_exposition(self, client):
+        task_id = client.post("/tasks", json={"name": "M", "content": "word " * 200,
+                                              "chunk_size": 50}).json()["id"]
+        client.post(f"/tasks/{task_id}/execute", params={"wait": True})
+        
+        r = client.get("/metrics")
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/plain")
+        text = r.text
+        assert "# TYPE dongol_chunk_run_seconds histogram" in text
+        assert 'dongol_chunk_run_seconds_bucket{handler="default",le="+Inf"}' in text
+        assert 'dongol_task_duration_seconds_count{status="COMPLETED"} 1' in text
+        assert "dongol_executor_queue_depth 0" in text
+        assert "dongol_event_loop_lag_seconds" in text
+        assert 'dongol_idempotency_requests_total{result="hit"} 0' in text
+
+
+class TestIdempotency:
+    """Test Idempotency-Key handling on task creation"""
+    
+    def test_retry_returns_same_task(self, client):
+        body = {"name": "Once", "content": "word " * 100}
+        headers = {"Idempotency-Key": "abc"}
+        
+        first = client.post("/tasks", json=body, headers=headers)
+        second = client.post("/tasks", json=body, headers=headers)
+        assert first.status_code == second.status_code == 200
+        assert first.json()["id"] == second.json()["id"]
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert client.get("/stats").json()["total_tasks"] == 1
+        
+        # A different key creates a new task
+        third = client.post("/tasks", json=body, headers={"Idempotency-Key": "def"})
+        assert third.json()["id"] != first.json()["id"]
+    
+    def test_key_reused_with_different_body(self, client):
+        headers = {"Idempotency-Key": "abc"}
+        client.post("/tasks", json={"name": "A", "content": "x"}, headers=headers)
+        r = client.post("/tasks", json={"name": "B", "content": "x"}, headers=headers)
+        assert r.status_code == 422
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_coalesce(self):
+        cache = IdempotencyCache()
+        calls = []
+        
+        async def create():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "task-1"
+        
+        results = await asyncio.gather(*(cache.run("k", "fp", create) for _ in range(5)))
+        assert len(calls) == 1
+        assert [task_id for task_id, _ in results] == ["task-1"] * 5
+        assert sum(replayed for _, replayed in results) == 4
+    
+    @pytest.mark.asyncio
+    async def test_failed_creation_is_not_cached(self):
+        cache = IdempotencyCache(ttl_seconds=10)
+        
+        async def fail():
+            raise RuntimeError("boom")
+        
+        async def create():
+            return "task-1"
+        
+        with pytest.raises(RuntimeError):
+            await cache.run("k", "fp", fail)
+        assert await cache.run("k", "fp", create) == ("task-1", False)
+        
+        # Expired keys are evicted
+        assert await cache.run("k", "fp", create, now=time.monotonic() + 11) == ("task-1", False)
+        assert len(cache) == 1
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_creation_hands_over_to_waiters(self):
+        cache = IdempotencyCache()
+        started = asyncio.Event()
+        calls = []
+        
+        async def create():
+            calls.append(1)
+            started.set()
+            await asyncio.sleep(0.05)
+            return f"task-{len(calls)}"
+        
+        first = asyncio.create_task(cache.run("k", "fp", create))
+        await started.wait()
+        waiter = asyncio.create_task(cache.run("k", "fp", create))
+        await asyncio.sleep(0)
+        first.cancel()
+        
+        # The waiter runs the creation itself instead of seeing the cancellation
+        assert await waiter == ("task-2", False)
+        assert first.cancelled()
+        assert await cache.run("k", "fp", create) == ("task-2", True)
+
+
+class TestAdmission:
+    """Test rate limiting and load shedding"""
+    
+    def test_rate_limit_per_client(self, client):
+        server.admission = AdmissionController(rate_per_client=0.5, burst=2)
+        body = {"name": "Limited", "content": "x"}
+        
+        for _ in range(2):
+            assert client.post("/tasks", json=body, headers={"X-Client-Id": "a"}).status_code == 200
+        r = client.post("/tasks", json=body, headers={"X-Client-Id": "a"})
+        assert r.status_code == 429
+        assert int(r.headers["Retry-After"]) >= 1
+        
+        # Other clients have their own bucket
+        assert client.post("/tasks", json=body, headers={"X-Client-Id": "b"}).status_code == 200
+    
+    def test_shed_by_priority(self, client):
+        server.admission = AdmissionController(max_pending_chunks=100)
+        engine = server._engine
+        engine.stats.pending_chunks = 80
+        
+        def create(priority):
+            return client.post("/tasks", json={"name": "Shed", "content": "x", "priority": priority})
+        
+        assert create("LOW").status_code == 429
+        assert create("NORMAL").status_code == 429
+        assert create("HIGH").status_code == 200
+        
+        engine.stats.pending_chunks = 1000
+        assert create("HIGH").status_code == 429
+        assert create("CRITICAL").status_code == 200
+        engine.stats.pending_chunks = 0
+        
+        stats = client.get("/stats").json()
+        assert stats["admission"]["rejected"]["overloaded"] == 3
+    
+    def test_background_priority_is_shed_first(self, client):
+        server.admission = AdmissionController(max_pending_chunks=100)
+        engine = server._engine
+        body = {"name": "Background", "content": "x", "priority": "BACKGROUND"}
+        
+        r = client.post("/tasks", json=body)
+        assert r.status_code == 200
+        task_id = r.json()["id"]
+        r = client.post("/tasks/upload", params={"name": "Upload", "priority": "background"},
+                        content=b"x")
+        assert r.status_code == 202
+        assert client.post(f"/tasks/{task_id}/execute", params={"wait": True}).status_code == 200
+        
+        engine.stats.pending_chunks = 30
+        assert client.post("/tasks", json=body).status_code == 429
+        r = client.post("/tasks/upload", params={"name": "Upload", "priority": "BACKGROUND"},
+                        content=b"x")
+        assert r.status_code == 429
+        assert client.post(f"/tasks/{task_id}/execute").status_code == 429
+        assert client.post("/tasks", json={**body, "priority": "LOW"}).status_code == 200
+        engine.stats.pending_chunks = 0
+
+
+class TestExecutionJobs:
+    """Test the background execution job model"""
+    
+    def test_execute_returns_202_and_poll(self, client):
+        task_id = client.post("/tasks", json={"name": "Job", "content": "word " * 300,
+                                              "chunk_size": 50}).json()["id"]
+        
+        r = client.post(f"/tasks/{task_id}/execute")
+        assert r.status_code == 202
+        assert r.json()["status_url"] == f"/tasks/{task_id}/status"
+        
+        for _ in range(100):
+            status = client.get(f"/tasks/{task_id}/status").json()
+            if status["status"] == "COMPLETED":
+                break
+        assert status["status"] == "COMPLETED"
+        assert status["completed_chunks"] == status["total_chunks"]
+        
+        r = client.get(f"/tasks/{task_id}/results")
+        assert r.status_code == 200
+        assert len(r.json()["results"]) == status["total_chunks"]
+    
+    def test_execute_wait(self, client):
+        task_id = client.post("/tasks", json={"name": "Job", "content": "x"}).json()["id"]
+        
+        r = client.post(f"/tasks/{task_id}/execute", params={"wait": True})
+        assert r.status_code == 200
+        assert r.json()["status"] == "COMPLETED"
+    
+    def test_upload_streams_into_chunks(self, client):
+        r = client.post("/tasks/upload", params={"name": "Upload", "chunk_size": 50},
+                        content=("word " * 300).encode())
+        assert r.status_code == 202
+        task_id = r.json()["id"]
+        assert r.json()["chunk_count"] > 1
+        
+        for _ in range(100):
+            status = client.get(f"/tasks/{task_id}/status").json()
+            if status["status"] == "COMPLETED":
+                break
+        assert status["status"] == "COMPLETED"
+        assert status["completed_chunks"] == status["total_chunks"]
+    
+    def test_upload_invalid_priority(self, client):
+        r = client.post("/tasks/upload", params={"name": "Upload", "priority": "urgent"},
+                        content=b"x")
+        assert r.status_code == 400
+    
+    def test_results_range_and_projection(self, client):
+        task_id = client.post("/tasks", json={"name": "Paged", "content": "word " * 300,
+                                              "chunk_size": 50}).json()["id"]
+        client.post(f"/tasks/{task_id}/execute", params={"wait": True})
+        
+        r = client.get(f"/tasks/{task_id}/results",
+                       params={"start": 2, "limit": 3, "fields": "chunk_id,processed"})
+        body = r.json()
+        assert r.headers["content-type"] == "application/json"
+        assert len(body["results"]) == 3
+        assert body["next_start"] == 5
+        for chunk_id, result in body["results"].items():
+            assert result == {"chunk_id": chunk_id, "processed": True}
+        
+        r = client.get(f"/tasks/{task_id}/results", params={"start": 5, "end": 7})
+        assert len(r.json()["results"]) == 2
+        assert r.json()["next_start"] is None
+    
+    def test_stream_ndjson(self, client):
+        import json
+        
+        task_id = client.post("/tasks", json={"name": "Stream", "content": "word " * 300,
+                                              "chunk_size": 50}).json()["id"]
+        client.post(f"/tasks/{task_id}/execute", params={"wait": True})
+        
+        r = client.get(f"/tasks/{task_id}/stream", params={"fields": "chunk_id"})
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in r.text.splitlines()]
+        assert lines[-1] == {"done": True, "status": "COMPLETED", "error": None}
+        assert all(line["result"] == {"chunk_id": line["chunk_id"]} for line in lines[:-1])
+        
+        r = client.get(f"/tasks/{task_id}/stream", params={"format": "sse"})
+        assert r.text.count("event: chunk") == len(lines) - 1
+
+
+class TestWebSocket:
+    """Test WebSocket push subscriptions"""
+    
+    def test_subscribe_receives_batched_events(self, client):
+        task_id = client.post("/tasks", json={"name": "Push", "content": "x"}).json()["id"]
+        
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"command": "subscribe", "task_ids": [task_id]})
+            assert ws.receive_json() == {"type": "subscriptions", "task_ids": [task_id], "all": False}
+            
+            client.post(f"/tasks/{task_id}/execute", params={"wait": True})
+            
+            events = []
+            while not any(e["type"] == "task_completed" for e in events):
+                frame = ws.receive_json()
+                assert frame["type"] == "events"
+                events.extend(frame["events"])
+        
+        types = [e["type"] for e in events]
+        assert types == ["chunk_started", "chunk_completed", "task_completed"]
+        assert all(e["task_id"] == task_id for e in events)
+    
+    @pytest.mark.asyncio
+    async def test_publish_only_queues_subscribed_tasks(self):
+        class FakeSocket:
+            async def accept(self):
+                pass
+            
+            async def send_text(self, frame):
+                pass
+        
+        manager = server.ConnectionManager()
+        connection = await manager.connect(FakeSocket())
+        manager.publish({"type": "chunk_started", "task_id": "a"})
+        assert manager._pending == []
+        
+        manager.subscribe(connection, {"a"})
+        manager.publish({"type": "chunk_started", "task_id": "a"})
+        manager.publish({"type": "chunk_started", "task_id": "b"})
+        assert [e["task_id"] for e in manager._pending] == ["a"]
+        
+        manager.unsubscribe(connection, {"a"})
+        assert manager._subscribers == {}
+        manager.subscribe(connection, {"b"}, all_tasks=True)
+        manager.disconnect(connection.websocket)
+        assert manager._subscribers == {}
+        assert manager._all == set()
+        
+        await manager.stop()
+    
+    @pytest.mark.asyncio
+    async def test_slow_consumer_does_not_block_fanout(self):
+        import asyncio
+        
+        class FakeSocket:
+            def __init__(self, stall=False):
+                self.stall = stall
+                self.frames = []
+            
+            async def accept(self):
+                pass
+            
+            async def send_text(self, frame):
+                if self.stall:
+                    await asyncio.Event().wait()
+                self.frames.append(frame)
+            
+            async def close(self, code=1000):
+                pass
+        
+        manager = server.ConnectionManager(max_queue=2, overflow="drop_oldest")
+        slow, fast = FakeSocket(stall=True), FakeSocket()
+        slow_conn = await manager.connect(slow)
+        await manager.connect(fast)
+        
+        for i in range(5):
+            await manager.broadcast({"n": i})
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        
+        assert fast.frames == [f'{{"n":{i}}}' for i in range(5)]
+        assert slow_conn.dropped > 0
+        
+        strict = server.ConnectionManager(max_queue=1, overflow="disconnect")
+        stuck = FakeSocket(stall=True)
+        await strict.connect(stuck)
+        for i in range(4):
+            await strict.broadcast({"n": i})
+        await asyncio.sleep(0.01)
+        assert strict.active_connections == []
+        
+        await manager.stop()
+    
+    @pytest.mark.asyncio
+    async def test_coalesce_keeps_latest_progress_per_task(self):
+        import json
+        
+        class StuckSocket:
+            async def accept(self):
+                pass
+            
+            async def send_text(self, frame):
+                await asyncio.Event().wait()
+            
+            async def close(self, code=1000):
+                pass
+        
+        manager = server.ConnectionManager(max_queue=3, overflow="coalesce")
+        connection = await manager.connect(StuckSocket())
+        manager.subscribe(connection, {"a", "b"})
+        await asyncio.sleep(0)
+        
+        for n in range(1, 6):
+            for task_id in ("a", "b"):
+                manager.publish({"type": "chunk_completed", "task_id": task_id, "completed_chunks": n})
+            await manager.flush()
+            await asyncio.sleep(0)
+        manager.publish({"type": "task_completed", "task_id": "a"})
+        await manager.flush()
+        
+        queued = [(key, json.loads(frame)["events"]) for key, frame in connection._queue]
+        progress = {key: events[-1]["completed_chunks"] for key, events in queued if key}
+        assert progress == {"progress:a": 5, "progress:b": 5}
+        assert queued[-1] == (None, [{"type": "task_completed", "task_id": "a"}])
+        assert connection.dropped > 0
+        
+        await manager.stop()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -37,6 +37,21 @@ class TestChunkingEngine:
             if i > 0:
                 assert len(chunk.dependencies) > 0
     
+    def test_stream_tokens_splits_text_without_whitespace(self):
+        chunking = ChunkingEngine()
+        text = "a" * 1000 + " tail " + "b" * 170
+        
+        chunker = chunking.stream_tokens(token_limit=10)
+        chunks = []
+        for i in range(0, len(text), 7):
+            chunks += chunker.feed(text[i:i + 7])
+            assert len(chunker._carry) <= chunker.max_word_chars
+        chunks += chunker.close()
+        
+        expected = chunking.chunk_by_tokens(text, token_limit=10)
+        assert [c.content for c in chunks] == [c.content for c in expected]
+        assert max(len(c.content) for c in chunks) <= 2 * chunker.max_word_chars
+    
     def test_chunk_by_structure(self):
         chunker = ChunkingEngine()
         data = {
@@ -165,6 +180,94 @@ class TestDongolEngine:
         
         await engine.stop()
     
+    @pytest.mark.asyncio
+    async def test_submit_task_records_failure(self):
+        engine = DongolEngine()
+        await engine.start()
+        
+        def handler(chunk: Chunk) -> dict:
+            raise RuntimeError("boom")
+        
+        engine.register_handler("broken", handler)
+        task = await engine.create_task(name="Broken", content="x", auto_chunk=False)
+        
+        job = engine.submit_task(task.id, "broken")
+        with pytest.raises(RuntimeError):
+            engine.submit_task(task.id, "broken")
+        await job
+        
+        assert task.status == TaskStatus.FAILED
+        assert "boom" in task.metadata['error']
+        
+        # A parallel task whose chunks raise fails too
+        parallel = await engine.create_task(name="Broken parallel", content="word " * 200, chunk_size=50)
+        assert len(parallel.chunks) > 1
+        await engine.submit_task(parallel.id, "broken")
+        assert parallel.status == TaskStatus.FAILED
+        assert "boom" in parallel.metadata['error']
+        
+        await engine.stop()
+    
+    @pytest.mark.asyncio
+    async def test_stream_results_while_running(self):
+        engine = DongolEngine()
+        await engine.start()
+        
+        async def handler(chunk: Chunk) -> str:
+            await asyncio.sleep(0.001)
+            return f"done_{chunk.id}"
+        
+        engine.register_handler("slow", handler)
+        task = await engine.create_task(name="Stream", content="Word " * 300, chunk_size=50)
+        
+        received = []
+        
+        async def consume():
+            async for chunk_id, result in engine.stream_results(task.id):
+                received.append((chunk_id, result, task.status))
+        
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        await engine.execute_task(task.id, "slow")
+        await consumer
+        
+        assert [r[0] for r in received] == list(task.results)
+        assert received[0][2] == TaskStatus.RUNNING
+        
+        # Finished tasks replay their stored results
+        replay = [item async for item in engine.stream_results(task.id)]
+        assert replay == list(task.results.items())
+        
+        await engine.stop()
+    
+    @pytest.mark.asyncio
+    async def test_ingest_stream(self):
+        engine = DongolEngine()
+        await engine.start()
+        engine.register_handler("first_word", lambda chunk: chunk.content.split()[0])
+        
+        text = "".join(f"wörd{i} " * 30 for i in range(20))
+        data = text.encode()
+        
+        async def body():
+            # Fixed-size pieces split multi-byte characters across reads
+            for i in range(0, len(data), 97):
+                yield data[i:i + 97]
+                await asyncio.sleep(0)
+        
+        task = await engine.ingest_stream("Upload", body(), "first_word", chunk_size=40)
+        assert task.metadata['streamed'] is True
+        await engine._jobs[task.id]
+        
+        expected = engine.chunking.chunk_by_tokens(text, token_limit=40)
+        assert task.status == TaskStatus.COMPLETED
+        assert [c.content for c in task.chunks] == [c.content for c in expected]
+        assert len(task.results) == len(task.chunks)
+        assert engine.get_stats()['total_chunks'] == len(task.chunks)
+        assert engine.get_stats()['pending_chunks'] == 0
+        
+        await engine.stop()
+    
     @pytest.mark.asyncio
     async def test_auto_chunking(self):
         engine = DongolEngine()
@@ -202,6 +305,1204 @@ class TestDongolEngine:
         assert stats['engine_running']
         
         await engine.stop()
+    
+    @pytest.mark.asyncio
+    async def test_incremental_stats(self):
+        engine = DongolEngine()
+        await engine.start()
+        
+        tasks = []
+        for i in range(3):
+            tasks.append(await engine.create_task(
+                name=f"Task {i}", content="Word " * 200, auto_chunk=True, chunk_size=50
+            ))
+        await engine.execute_task(tasks[0].id)
+        engine.cancel_task(tasks[1].id)
+        engine.remove_task(tasks[2].id)
+        
+        stats = engine.get_stats()
+        assert stats['total_tasks'] == 2
+        assert stats['total_chunks'] == len(tasks[0].chunks) + len(tasks[1].chunks)
+        assert stats['status_distribution'] == {'COMPLETED': 1, 'CANCELLED': 1}
+        assert stats['chunks_in_flight'] == 0
+        assert stats['pending_chunks'] == 0
+        assert stats['chunks_completed'] == len(tasks[0].chunks)
+        assert stats['tasks_completed_per_sec'] > 0
+        
+        await engine.stop()
+    
+    @pytest.mark.asyncio
+    async def test_cancel_stops_running_job(self):
+        engine = DongolEngine()
+        await engine.start()
+        
+        gate = asyncio.Event()
+        
+        async def gated(chunk: Chunk) -> bool:
+            await gate.wait()
+            return True
+        
+        engine.register_handler("gated", gated)
+        task = await engine.create_task(name="Running", content="x")
+        job = engine.submit_task(task.id, "gated")
+        for _ in range(100):
+            if engine.stats.chunks_in_flight:
+                break
+            await asyncio.sleep(0.01)
+        engine.cancel_task(task.id)
+        gate.set()
+        await asyncio.wait([job])
+        
+        assert job.cancelled()
+        assert task.status == TaskStatus.CANCELLED
+        assert engine.get_stats()['status_distribution'] == {'CANCELLED': 1}
+        
+        await engine.stop()
+
+
+class TestTaskIndex:
+    """Test secondary indexes and cursor pagination"""
+    
+    def test_task_ids_are_time_ordered(self):
+        ids = [Task().id for _ in range(1000)]
+        assert ids == sorted(ids)
+        assert len(set(ids)) == len(ids)
+    
+    @pytest.mark.asyncio
+    async def test_list_tasks_by_status_with_cursor(self):
+        engine = DongolEngine()
+        await engine.start()
+        
+        tasks = []
+        for i in range(10):
+            task = await engine.create_task(name=f"T{i}", content="x", auto_chunk=False)
+            tasks.append(task)
+        for task in tasks[::2]:
+            engine.cancel_task(task.id)
+        
+        page, cursor = engine.list_tasks(status=TaskStatus.CANCELLED, limit=3, newest_first=True)
+        assert [t.id for t in page] == [tasks[8].id, tasks[6].id, tasks[4].id]
+        assert cursor is not None
+        
+        page, cursor = engine.list_tasks(status=TaskStatus.CANCELLED, limit=3, cursor=cursor,
+                                         newest_first=True)
+        assert [t.id for t in page] == [tasks[2].id, tasks[0].id]
+        assert cursor is None
+        
+        page, _ = engine.list_tasks(status=TaskStatus.PENDING, priority=Priority.NORMAL)
+        assert [t.id for t in page] == [t.id for t in tasks[1::2]]
+        assert engine.list_tasks(limit=0) == ([], None)
+        
+        await engine.stop()
+
+
+class TestSearch:
+    """Test the inverted search index"""
+    
+    @pytest.mark.asyncio
+    async def test_search_names_and_results(self):
+        engine = DongolEngine()
+        await engine.start()
+        
+        def handler(chunk: Chunk) -> dict:
+            return {"message": f"ErrorCode found in {chunk.content}", "count": 3}
+        
+        engine.register_handler("scan", handler)
+        alpha = await engine.create_task(name="Alpha report", content="logs", auto_chunk=False)
+        beta = await engine.create_task(name="Beta report", content="metrics", auto_chunk=False,
+                                        description="weekly optimization")
+        await engine.execute_task(alpha.id, "scan")
+        
+        assert [t.id for t in engine.search("report")] == [beta.id, alpha.id]
+        assert [t.id for t in engine.search("error*")] == [alpha.id]
+        assert [t.id for t in engine.search("*code", in_tasks=True, in_results=False)] == []
+        assert [t.id for t in engine.search("optimi?ation")] == [beta.id]
+        assert [t.id for t in engine.search("alpha errorcode")] == [alpha.id]
+        assert [t.id for t in engine.search("3")] == [alpha.id]
+        assert engine.search("optim") == []
+        assert [t.id for t in engine.search("optim", prefix=True)] == [beta.id]
+        assert [t.id for t in engine.search("rep alp", prefix=True)] == [alpha.id]
+        
+        engine.drop_results(alpha.id)
+        assert engine.search("errorcode") == []
+        engine.remove_task(beta.id)
+        assert engine.search("beta") == []
+        
+        await engine.stop()
+
+
+class TestResultSpilling:
+    """Test spilling results under a memory budget"""
+    
+    @pytest.mark.asyncio
+    async def test_cold_results_spill_and_page_in(self, tmp_path):
+        from core.spill import SpilledResults
+        
+        engine = DongolEngine({'memory_budget_mb': 0.01, 'spill_dir': str(tmp_path)})
+        await engine.start()
+        
+        def handler(chunk: Chunk) -> dict:
+            return {"payload": "x" * 4000}
+        
+        engine.register_handler("big", handler)
+        tasks = []
+        for i in range(5):
+            task = await engine.create_task(name=f"Big {i}", content="data", auto_chunk=False)
+            await engine.execute_task(task.id, "big")
+            tasks.append(task)
+        
+        first = tasks[0]
+        assert isinstance(first.__dict__['_results'], SpilledResults)
+        assert engine.get_stats()['memory']['spilled_tasks'] > 0
+        
+        # Transparent page-in on access
+        results = first.results
+        assert len(results) == 1
+        assert list(results.values())[0]["payload"] == "x" * 4000
+        assert isinstance(first.__dict__['_results'], dict)
+        
+        await engine.stop()
+    
+    @pytest.mark.asyncio
+    async def test_failed_run_results_are_budgeted(self, tmp_path):
+        engine = DongolEngine({'memory_budget_mb': 1, 'spill_dir': str(tmp_path)})
+        await engine.start()
+        
+        task = await engine.create_task(name="Partial", content="word " * 200, chunk_size=50)
+        last = task.chunks[-1].id
+        
+        def handler(chunk: Chunk) -> dict:
+            if chunk.id == last:
+                raise RuntimeError("boom")
+            return {"payload": "x" * 4000}
+        
+        engine.register_handler("partial", handler)
+        with pytest.raises(RuntimeError):
+            await engine.execute_task(task.id, "partial")
+        
+        assert task.status == TaskStatus.FAILED
+        assert 0 < len(task.results) < len(task.chunks)
+        assert engine.get_stats()['memory']['resident_bytes'] > 4000 * len(task.results)
+        
+        await engine.stop()
+    
+    @pytest.mark.asyncio
+    async def test_remove_spilled_task(self, tmp_path):
+        engine = DongolEngine({'memory_budget_mb': 0.001, 'spill_dir': str(tmp_path)})
+        await engine.start()
+        
+        tasks = []
+        for i in range(3):
+            task = await engine.create_task(name=f"T{i}", content="data", auto_chunk=False)
+            await engine.execute_task(task.id)
+            tasks.append(task)
+        
+        for task in tasks:
+            engine.remove_task(task.id)
+        
+        memory = engine.get_stats()['memory']
+        assert memory['spilled_tasks'] == 0
+        assert memory['resident_bytes'] == 0
+        assert memory['spill_file_bytes'] == 0
+        
+        await engine.stop()
+    
+    @pytest.mark.asyncio
+    async def test_spill_file_compacts_while_results_stay_live(self, tmp_path):
+        import os
+        
+        engine = DongolEngine({'memory_budget_mb': 0.005, 'spill_dir': str(tmp_path),
+                               'spill_compact_min_mb': 0})
+        await engine.start()
+        engine.register_handler("big", lambda chunk: {"payload": chunk.content * 4000})
+        
+        async def run(name):
+            task = await engine.create_task(name=name, content=name[-1], auto_chunk=False)
+            await engine.execute_task(task.id, "big")
+            return task
+        
+        # One spilled task stays alive throughout while others spill and go
+        keeper = await run("keep k")
+        previous = await run("churn 0")
+        for i in range(1, 20):
+            task = await run(f"churn {i % 10}")
+            engine.remove_task(previous.id)
+            previous = task
+        spill_file = engine._spiller._file
+        
+        memory = engine.get_stats()['memory']
+        assert memory['compactions'] > 0
+        assert memory['spill_file_dead_bytes'] <= memory['spill_file_bytes']
+        assert os.path.getsize(spill_file.path) == memory['spill_file_bytes'] + memory['spill_file_dead_bytes']
+        assert list(keeper.results.values())[0]["payload"] == "k" * 4000
+        
+        await engine.stop()
+
+
+class TestRetention:
+    """Test retention policies and the background sweeper"""
+    
+    @pytest.mark.asyncio
+    async def test_max_completed_tasks(self):
+        engine = DongolEngine({'retention': {'max_completed_tasks': 2}})
+        await engine.start()
+        
+        ids = []
+        for i in range(5):
+            task = await engine.create_task(name=f"T{i}", content="x", auto_chunk=False)
+            await engine.execute_task(task.id)
+            ids.append(task.id)
+        pending = await engine.create_task(name="Pending", content="x", auto_chunk=False)
+        
+        assert engine.retention.sweep_slice() is False
+        assert set(engine.tasks) == {ids[3], ids[4], pending.id}
+        
+        await engine.stop()
+    
+    @pytest.mark.asyncio
+    async def test_ttl_and_drop_results(self):
+        import time
+        
+        engine = DongolEngine({'retention': {'ttl_seconds': 100, 'results_ttl_seconds': 10}})
+        await engine.start()
+        
+        old = await engine.create_task(name="Old", content="x", auto_chunk=False)
+        await engine.execute_task(old.id)
+        recent = await engine.create_task(name="Recent", content="x", auto_chunk=False)
+        await engine.execute_task(recent.id)
+        old.completed_at = time.time() - 200
+        engine.retention._finished[old.id] = old.completed_at
+        
+        engine.retention.sweep_slice(now=time.time() + 20)
+        
+        assert old.id not in engine.tasks
+        assert recent.id in engine.tasks
+        assert recent.results == {}
+        assert recent.metadata['results_dropped']
+        
+        await engine.stop()
+    
+    @pytest.mark.asyncio
+    async def test_background_sweeper(self):
+        engine = DongolEngine({
+            'retention': {'max_completed_tasks': 0, 'sweep_interval_seconds': 0.01}
+        })
+        await engine.start()
+        
+        task = await engine.create_task(name="Gone", content="x", auto_chunk=False)
+        await engine.execute_task(task.id)
+        await asyncio.sleep(0.05)
+        
+        assert task.id not in engine.tasks
+        assert engine.get_stats()['retention']['evicted'] == 1
+        
+        await engine.stop()
+
+
+class TestSharedStore:
+    """Test engines sharing a task table through SQLite"""
+    
+    @pytest.mark.asyncio
+    async def test_tasks_and_jobs_shared_between_engines(self, tmp_path):
+        path = str(tmp_path / "shared.db")
+        # a only serves requests; b claims and runs the jobs
+        a = DongolEngine({'shared': {'path': path, 'worker_id': 'a', 'max_claimed_jobs': 0}})
+        b = DongolEngine({'shared': {'path': path, 'worker_id': 'b'}})
+        await a.start()
+        await b.start()
+        b.register_handler("upper", lambda chunk: chunk.content.upper())
+        
+        task = await a.create_task("Shared", "word " * 200, chunk_size=50)
+        await a.shared.flush()
+        await b.shared.sync_once()
+        assert task.id in b.tasks
+        assert len(b.tasks[task.id].chunks) == len(task.chunks)
+        
+        waiter = a.submit_task(task.id, "upper")
+        with pytest.raises(RuntimeError):
+            await a.submit_task(task.id, "upper")
+        finished = await asyncio.wait_for(waiter, timeout=5)
+        
+        assert finished is task
+        assert task.status == TaskStatus.COMPLETED
+        assert len(task.results) == len(task.chunks)
+        assert all(r.startswith("WORD") for r in task.results.values())
+        assert a.get_stats()['status_distribution'] == {'COMPLETED': 1}
+        assert a.search("word")[0].id == task.id
+        
+        a.remove_task(task.id)
+        await a.shared.flush()
+        await b.shared.sync_once()
+        assert task.id not in b.tasks
+        
+        await a.stop()
+        await b.stop()
+    
+    @pytest.mark.asyncio
+    async def test_sync_survives_failed_write(self, tmp_path, monkeypatch):
+        import sqlite3
+        
+        a = DongolEngine({'shared': {'path': str(tmp_path / "shared.db"), 'worker_id': 'a'}})
+        await a.start()
+        store = a.shared.store
+        put_task_rows = store.put_task_rows
+        failures = []
+        
+        def locked_once(rows):
+            if not failures:
+                failures.append(rows)
+                raise sqlite3.OperationalError("database is locked")
+            put_task_rows(rows)
+        
+        monkeypatch.setattr(store, 'put_task_rows', locked_once)
+        task = await a.create_task("Retried", "hello world")
+        for _ in range(100):
+            await asyncio.sleep(0.02)
+            if store.load_task(task.id) is not None:
+                break
+        
+        # The failed batch went out again on a later tick and the loop kept going
+        assert store.load_task(task.id) is not None
+        assert a.get_stats()['shared']['sync_errors'] == 1
+        assert not a._shared_sync.done()
+        await a.stop()
+    
+    @pytest.mark.asyncio
+    async def test_store_calls_do_not_block_the_loop(self, tmp_path):
+        import threading
+        import time
+        
+        a = DongolEngine({'shared': {'path': str(tmp_path / "shared.db"), 'worker_id': 'a',
+                                     'max_claimed_jobs': 0}})
+        await a.start()
+        task = await a.create_task("Queued", "hello world")
+        await a.shared.flush()
+        
+        # Another holder of the connection keeps the store busy
+        held, release = threading.Event(), threading.Event()
+        
+        def hold():
+            with a.shared.store._lock:
+                held.set()
+                release.wait(5)
+        
+        threading.Thread(target=hold).start()
+        held.wait(5)
+        started = time.perf_counter()
+        waiter = a.submit_task(task.id, "default")
+        lookup = asyncio.ensure_future(a.get_task("missing"))
+        await asyncio.sleep(0.05)
+        assert time.perf_counter() - started < 0.5
+        assert not lookup.done() and not waiter.done()
+        
+        release.set()
+        assert await lookup is None
+        await a.stop()
+        assert await waiter is task
+    
+    @pytest.mark.asyncio
+    async def test_new_engine_hydrates_from_store(self, tmp_path):
+        path = str(tmp_path / "shared.db")
+        a = DongolEngine({'shared': {'path': path, 'worker_id': 'a'}})
+        await a.start()
+        task = await a.create_task("Persisted", "hello world")
+        await a.execute_task(task.id)
+        await a.stop()
+        
+        b = DongolEngine({'shared': {'path': path, 'worker_id': 'b'}})
+        await b.start()
+        copy = b.tasks[task.id]
+        assert copy.status == TaskStatus.COMPLETED
+        assert copy.results.keys() == task.results.keys()
+        assert b.list_tasks(status=TaskStatus.COMPLETED)[0][0].id == task.id
+        await b.stop()
+
+
+class TestRemoteWorkers:
+    """Test running chunks on dongol-worker clients"""
+    
+    @pytest.mark.asyncio
+    async def test_chunks_run_on_remote_worker(self, tmp_path):
+        import threading
+        from core.remote import WorkerClient
+        
+        address = f"unix://{tmp_path}/dongol.sock"
+        engine = DongolEngine({'remote': {'listen': address, 'token': 'secret'}})
+        await engine.start()
+        
+        worker = WorkerClient(address, {"shout": lambda chunk: chunk.content.upper() + "!"},
+                              concurrency=2, batch_size=4, token='secret', worker_id='w1')
+        worker_job = asyncio.create_task(worker.run())
+        for _ in range(100):
+            if engine.remote.has_worker("shout"):
+                break
+            await asyncio.sleep(0.01)
+        
+        task = await engine.create_task("Remote", "word " * 400, chunk_size=50)
+        await engine.execute_task(task.id, "shout")
+        
+        assert task.status == TaskStatus.COMPLETED
+        assert len(task.results) == len(task.chunks)
+        assert all(r.endswith("!") for r in task.results.values())
+        stats = engine.get_stats()['remote']
+        assert stats['jobs_completed'] == len(task.chunks)
+        assert worker.jobs_done == len(task.chunks)
+        
+        # Handlers no worker serves still run in the engine, on the pool they were routed to
+        threads = []
+        engine.register_handler("inline", lambda chunk: threads.append(threading.get_ident()), pool="async")
+        other = await engine.create_task("Local", "hello")
+        await engine.execute_task(other.id, "inline")
+        assert other.status == TaskStatus.COMPLETED
+        assert threads == [threading.get_ident()]
+        assert engine.get_stats()['chunks_completed'] == len(task.chunks) + 1
+        
+        worker.stop()
+        await worker_job
+        await engine.stop()
+    
+    @pytest.mark.asyncio
+    async def test_remote_errors_and_bad_token(self, tmp_path):
+        from core.remote import WorkerClient, WorkerRejectedError
+        
+        address = f"unix://{tmp_path}/dongol.sock"
+        engine = DongolEngine({'remote': {'listen': address, 'token': 'secret'}})
+        await engine.start()
+        
+        def fail(chunk):
+            raise ValueError("bad chunk")
+        
+        # Refused outright rather than retried with the same token
+        intruder = WorkerClient(address, {"fail": fail}, token='wrong')
+        with pytest.raises(WorkerRejectedError):
+            await asyncio.wait_for(intruder.run(), timeout=5)
+        assert not engine.remote.has_worker("fail")
+        
+        worker = WorkerClient(address, {"fail": fail}, token='secret')
+        worker_job = asyncio.create_task(worker.run())
+        for _ in range(100):
+            if engine.remote.has_worker("fail"):
+                break
+            await asyncio.sleep(0.01)
+        
+        task = await engine.create_task("Failing", "hello")
+        with pytest.raises(Exception, match="bad chunk"):
+            await engine.execute_task(task.id, "fail")
+        assert task.status == TaskStatus.FAILED
+        
+        worker.stop()
+        await worker_job
+        await engine.stop()
+    
+    @pytest.mark.asyncio
+    async def test_worker_backs_off_when_dropped(self, tmp_path):
+        from core.remote import WorkerClient
+        
+        connections = []
+        
+        async def drop(reader, writer):
+            connections.append(writer)
+            writer.close()
+        
+        server = await asyncio.start_unix_server(drop, path=str(tmp_path / "drop.sock"))
+        worker = WorkerClient(f"unix://{tmp_path}/drop.sock", {"noop": len})
+        job = asyncio.create_task(worker.run(retry_seconds=0.05))
+        await asyncio.sleep(0.5)
+        worker.stop()
+        job.cancel()
+        server.close()
+        await server.wait_closed()
+        # 0.05s doubling to the next attempt: a handful of connections, not a busy loop
+        assert 1 < len(connections) < 8
+    
+    def test_tcp_listener_requires_token(self):
+        from core.remote import RemoteCoordinator
+        
+        with pytest.raises(ValueError, match="token is required"):
+            DongolEngine({'remote': {'listen': 'tcp://127.0.0.1:0'}})
+        with pytest.raises(ValueError, match="token is required"):
+            RemoteCoordinator('tcp://127.0.0.1:0', token='')
+        assert RemoteCoordinator('tcp://127.0.0.1:0', token='secret').token == 'secret'
+        assert RemoteCoordinator('unix:///tmp/dongol-test.sock').token is None
+
+
+class TestQueueBackends:
+    """Test the pluggable work queues"""
+    
+    @pytest.mark.parametrize("kind", ["memory", "sqlite", "redis"])
+    def test_visibility_timeout_and_redelivery(self, kind, tmp_path):
+        import time
+        from core.queue import MemoryQueue, RedisQueue, SQLiteQueue
+        from tests.fake_redis import FakeRedisServer
+        
+        with FakeRedisServer() as server:
+            if kind == "memory":
+                queue = MemoryQueue()
+            elif kind == "sqlite":
+                queue = SQLiteQueue(str(tmp_path / "queue.db"))
+            else:
+                queue = RedisQueue(*server.address)
+            
+            assert queue.enqueue("jobs", [("a", b"1"), ("b", b"2"), ("c", b"3")]) == 3
+            # Re-sending a batch is harmless
+            assert queue.enqueue("jobs", [("a", b"1")]) == 0
+            
+            first = queue.reserve("jobs", 2, visibility_timeout=0.2)
+            assert [(m.id, m.payload, m.attempts) for m in first] == [("a", b"1", 1), ("b", b"2", 1)]
+            assert [m.id for m in queue.reserve("jobs", 10, visibility_timeout=0.2)] == ["c"]
+            assert queue.reserve("jobs", 10, visibility_timeout=0.2) == []
+            
+            queue.ack("jobs", ["a", "c"])
+            queue.extend("jobs", ["b"], visibility_timeout=0.05)
+            assert queue.size("jobs") == 1
+            
+            # Unacked past its timeout, so it comes back
+            time.sleep(0.1)
+            again = queue.reserve("jobs", 10, visibility_timeout=5)
+            assert [(m.id, m.attempts) for m in again] == [("b", 2)]
+            queue.ack("jobs", ["b"])
+            assert queue.size("jobs") == 0
+            queue.close()
+    
+    def test_locked_sqlite_queue_raises_queue_error(self, tmp_path):
+        import sqlite3
+        from core.queue import QueueError, SQLiteQueue
+        
+        path = str(tmp_path / "queue.db")
+        queue = SQLiteQueue(path, timeout=0.05)
+        holder = sqlite3.connect(path, isolation_level=None)
+        holder.execute('BEGIN IMMEDIATE')
+        # Loops that retry on QueueError now survive a lock held past the timeout
+        with pytest.raises(QueueError):
+            queue.reserve("jobs", 10, visibility_timeout=5)
+        with pytest.raises(QueueError):
+            queue.enqueue("jobs", [("a", b"1")])
+        holder.execute('ROLLBACK')
+        holder.close()
+        
+        assert queue.enqueue("jobs", [("a", b"1")]) == 1
+        assert [m.id for m in queue.reserve("jobs", 10, visibility_timeout=5)] == ["a"]
+        queue.close()
+    
+    @pytest.mark.asyncio
+    async def test_engine_feeds_queue_workers(self):
+        from core.queue import QueueWorker, RedisQueue, jobs_queue
+        from tests.fake_redis import FakeRedisServer
+        
+        with FakeRedisServer() as server:
+            host, port = server.address
+            engine = DongolEngine({'queue': {'url': f'redis://{host}:{port}/0', 'poll_interval_ms': 5}})
+            await engine.start()
+            
+            # A worker that reserved a job and died; its lease runs out and the job is redelivered
+            task = await engine.create_task("Queued", "word " * 300, chunk_size=50)
+            run = asyncio.create_task(engine.execute_task(task.id, "shout"))
+            crashed = RedisQueue(host, port)
+            for _ in range(100):
+                if crashed.reserve(jobs_queue('dongol', 'shout'), 1, visibility_timeout=0.2):
+                    break
+                await asyncio.sleep(0.01)
+            
+            workers = [
+                QueueWorker(RedisQueue(host, port), {"shout": lambda chunk: chunk.content.upper()},
+                            concurrency=2, batch_size=4, visibility_timeout=5, poll_interval=0.01)
+                for _ in range(2)
+            ]
+            worker_jobs = [asyncio.create_task(w.run()) for w in workers]
+            await asyncio.wait_for(run, timeout=10)
+            
+            assert task.status == TaskStatus.COMPLETED
+            assert len(task.results) == len(task.chunks)
+            assert all(r.isupper() for r in task.results.values())
+            assert engine.get_stats()['queue']['jobs_completed'] == len(task.chunks)
+            
+            # Handlers registered in the engine keep running locally
+            local = await engine.create_task("Local", "hello")
+            await engine.execute_task(local.id)
+            assert local.status == TaskStatus.COMPLETED
+            
+            for worker in workers:
+                worker.stop()
+            await asyncio.gather(*worker_jobs)
+            # Counted after the ack, which can land after the engine has the result
+            assert sum(w.jobs_done for w in workers) >= len(task.chunks)
+            crashed.close()
+            await engine.stop()
+    
+    @pytest.mark.asyncio
+    async def test_unknown_handler_times_out(self):
+        from core.queue import QueueError
+        
+        engine = DongolEngine({'queue': {'url': 'memory://typo', 'poll_interval_ms': 5,
+                                         'job_timeout': 0.2}})
+        await engine.start()
+        
+        # Nothing serves a mistyped handler name; the chunk fails instead of waiting forever
+        task = await engine.create_task("Typo", "hello")
+        with pytest.raises(QueueError, match="shuot"):
+            await asyncio.wait_for(engine.execute_task(task.id, "shuot"), timeout=5)
+        assert task.status == TaskStatus.FAILED
+        assert engine.get_stats()['queue']['jobs_expired'] == 1
+        
+        await engine.stop()
+
+
+class TestShardedEngine:
+    """Test spreading tasks over engine processes"""
+    
+    def test_hash_ring_spreads_and_stays_stable(self):
+        from core.engine import new_task_id
+        from core.shard import HashRing
+        
+        keys = [new_task_id() for _ in range(2000)]
+        four = HashRing(range(4))
+        placed = [four.lookup(k) for k in keys]
+        assert all(placed.count(shard) > 250 for shard in range(4))
+        
+        # Adding a shard only moves the keys the new shard takes over
+        five = HashRing(range(5))
+        moved = [k for k, shard in zip(keys, placed) if five.lookup(k) != shard]
+        assert all(five.lookup(k) == 4 for k in moved)
+        assert len(moved) < len(keys) * 0.35
+    
+    @pytest.mark.asyncio
+    async def test_sharded_engine_routes_and_merges(self):
+        import operator
+        from core.shard import ShardedEngine
+        
+        engine = ShardedEngine({'max_workers': 2}, shards=2)
+        await engine.start()
+        try:
+            await engine.register_handler("content", operator.attrgetter("content"))
+            created = [await engine.create_task(f"Task {i}", f"text {i}") for i in range(8)]
+            assert {engine.shard_for(t.id) for t in created} == {0, 1}
+            
+            done = await engine.execute_task(created[0].id, "content")
+            assert done.status == TaskStatus.COMPLETED
+            assert list(done.results.values()) == ["text 0"]
+            submitted = await engine.submit_task(created[1].id)
+            assert submitted.status == TaskStatus.COMPLETED
+            assert (await engine.get_task(created[1].id)).status == TaskStatus.COMPLETED
+            
+            # Listings merge across shards in creation order and page by cursor
+            first, cursor = await engine.list_tasks(limit=5)
+            rest, end = await engine.list_tasks(limit=5, cursor=cursor)
+            assert [t.id for t in first + rest] == [t.id for t in created]
+            assert end is None
+            newest, _ = await engine.list_tasks(limit=3, newest_first=True, offset=1)
+            assert [t.id for t in newest] == [t.id for t in reversed(created)][1:4]
+            completed, _ = await engine.list_tasks(status=TaskStatus.COMPLETED)
+            assert {t.id for t in completed} == {created[0].id, created[1].id}
+            assert await engine.list_tasks(limit=0) == ([], None)
+            
+            # Search hits merge newest first, so the limit keeps the latest matches
+            hits = await engine.search("task", limit=3)
+            assert [t.id for t in hits] == [t.id for t in reversed(created)][:3]
+            
+            stats = await engine.get_stats()
+            assert stats['total_tasks'] == 8
+            assert stats['tasks_completed'] == 2
+            assert stats['shards'] == 2
+            
+            await engine.remove_task(created[2].id)
+            assert await engine.get_task(created[2].id) is None
+            with pytest.raises(ValueError):
+                await engine.execute_task("missing")
+        finally:
+            await engine.stop()
+    
+    def test_merged_stats_average_ratios(self):
+        from core.shard import _merge_stats
+        
+        merged = _merge_stats([
+            {'tasks_completed': 2, 'engine_running': True, 'routing': {'spin': {'pool': 'process', 'cpu_ratio': 0.9}}},
+            {'tasks_completed': 3, 'engine_running': True, 'routing': {'spin': {'pool': 'process', 'cpu_ratio': 0.7}},
+             'autoscale': {'workers': 4, 'queue_wait_ms': 10.0}},
+        ])
+        assert merged['tasks_completed'] == 5
+        assert merged['engine_running'] is True
+        assert merged['routing']['spin'] == {'pool': 'process', 'cpu_ratio': pytest.approx(0.8)}
+        assert merged['autoscale'] == {'workers': 4, 'queue_wait_ms': 10.0}
+    
+    @pytest.mark.asyncio
+    async def test_dead_shard_fails_pending_calls_and_restarts(self):
+        import os
+        import signal
+        from core.shard import ShardedEngine
+        from tests.preloaded_handlers import nap, stall
+        
+        engine = ShardedEngine(shards=1)
+        await engine.start()
+        try:
+            await engine.register_handler("stall", stall)
+            await engine.register_handler("nap", nap)
+            task = await engine.create_task("Stalled", "x")
+            pending = asyncio.ensure_future(engine.execute_task(task.id, "stall"))
+            await asyncio.sleep(0.2)
+            os.kill(engine._shards[0].process.pid, signal.SIGKILL)
+            with pytest.raises(RuntimeError, match="exited"):
+                await asyncio.wait_for(pending, timeout=5)
+            
+            # A fresh shard takes its place, with the handlers registered so far
+            for _ in range(300):
+                if engine.restarts and engine._shards[0].connected.is_set():
+                    break
+                await asyncio.sleep(0.1)
+            assert (await engine.get_stats())['shard_restarts'] == 1
+            assert await engine.get_task(task.id) is None
+            again = await engine.create_task("Again", "x")
+            done = await engine.execute_task(again.id, "nap")
+            assert done.status == TaskStatus.COMPLETED
+        finally:
+            await engine.stop()
+
+
+class TestWorkStealing:
+    """Test the work-stealing process pool"""
+    
+    def test_idle_workers_steal_and_priority_wins(self):
+        import time
+        from core.pool import StealingPool
+        
+        pool = StealingPool(max_workers=2, seed=1)
+        try:
+            # Everything lands on worker 0; worker 1 has to steal to help
+            futures = [pool.submit_to(0, 2, time.sleep, 0.05) for _ in range(6)]
+            for future in futures:
+                future.result(timeout=10)
+            stats = pool.get_stats()
+            assert stats['steals'] > 0
+            assert all(w['executed'] > 0 for w in stats['workers'])
+            
+            # Worker 0 frees up first and takes both, most urgent first
+            blockers = [pool.submit_to(w, 2, time.sleep, delay) for w, delay in ((0, 0.1), (1, 0.5))]
+            low = pool.submit_to(0, Priority.LOW.value, time.perf_counter)
+            critical = pool.submit_to(0, Priority.CRITICAL.value, time.perf_counter)
+            assert critical.result(timeout=10) < low.result(timeout=10)
+            for future in blockers:
+                future.result(timeout=10)
+        finally:
+            pool.shutdown()
+    
+    def test_worker_killed_while_idle_is_replaced(self):
+        import os
+        import signal
+        import time
+        from core.pool import StealingPool
+        
+        pool = StealingPool(max_workers=2, seed=1)
+        try:
+            killed = [worker.process for worker in pool._workers]
+            for process in killed:
+                os.kill(process.pid, signal.SIGKILL)
+            # Killing is asynchronous; a job sent before the exit would die with the worker
+            while any(process.is_alive() for process in killed):
+                time.sleep(0.01)
+            futures = [pool.submit(os.getpid) for _ in range(10)]
+            pids = {future.result(timeout=10) for future in futures}
+            assert pids <= {w.process.pid for w in pool._workers}
+            assert pool.get_stats()['recycled'] == 2
+        finally:
+            pool.shutdown()
+    
+    @pytest.mark.asyncio
+    async def test_engine_runs_chunks_on_stealing_pool(self):
+        import operator
+        
+        engine = DongolEngine({'use_processes': True, 'scheduler': 'stealing', 'max_workers': 2})
+        await engine.start()
+        engine.register_handler("content", operator.attrgetter("content"))
+        
+        task = await engine.create_task("Stealing", "word " * 400, chunk_size=50,
+                                        priority=Priority.HIGH.value)
+        await engine.execute_task(task.id, "content")
+        
+        assert task.status == TaskStatus.COMPLETED
+        assert len(task.results) == len(task.chunks)
+        assert all(c.priority == Priority.HIGH for c in task.chunks)
+        assert sum(w['executed'] for w in engine.executor._executor.get_stats()['workers']) == len(task.chunks)
+        await engine.stop()
+
+
+class TestWarmPool:
+    """Test the persistent preloaded worker pool"""
+    
+    def test_workers_preload_and_recycle(self):
+        import pickle
+        from core.pool import PreloadedHandler, StealingPool, preload
+        
+        handler = PreloadedHandler('worker_pid')
+        assert pickle.loads(pickle.dumps(handler)).name == 'worker_pid'
+        
+        pool = StealingPool(
+            max_workers=1, initializer=preload, initargs=(('tests.preloaded_handlers',), None),
+            max_tasks_per_child=2
+        )
+        try:
+            pids = [pool.submit(handler, None).result(timeout=10) for _ in range(4)]
+            assert pids[0] == pids[1] != pids[2] == pids[3]
+            assert pool.get_stats()['recycled'] == 2
+        finally:
+            pool.shutdown()
+    
+    @pytest.mark.asyncio
+    async def test_engines_share_warm_pool(self):
+        config = {
+            'use_processes': True, 'max_workers': 2,
+            'pool': {'persistent': True, 'preload': ['tests.preloaded_handlers']}
+        }
+        engine = DongolEngine(config)
+        await engine.start()
+        pool = engine.executor._executor
+        
+        # Never registered on the engine; resolved from the preloaded handlers
+        task = await engine.create_task("Warm", "word " * 200, chunk_size=50)
+        await engine.execute_task(task.id, "length")
+        assert task.status == TaskStatus.COMPLETED
+        assert all(task.results[c.id] == len(c.content) for c in task.chunks)
+        assert engine.get_stats()['pool']['workers']
+        await engine.stop()
+        
+        restarted = DongolEngine(config)
+        await restarted.start()
+        assert restarted.executor._executor is pool
+        await restarted.stop()
+
+
+class TestBatchedSubmission:
+    """Test packing chunks into batched process-pool calls"""
+    
+    @pytest.mark.asyncio
+    async def test_batches_by_count_and_spreads_remainder(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from core.batch import ChunkBatcher
+        
+        def double(chunk):
+            if chunk == 13:
+                raise ValueError("unlucky")
+            return chunk * 2
+        
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            batcher = ChunkBatcher(executor, max_workers=2, max_chunks=8)
+            futures = [batcher.submit(double, i) for i in range(20)]
+            results = await asyncio.gather(*futures, return_exceptions=True)
+        finally:
+            executor.shutdown()
+        
+        assert isinstance(results[13], ValueError)
+        assert [r[0] for i, r in enumerate(results) if i != 13] == [i * 2 for i in range(20) if i != 13]
+        # Two full batches of 8, then the last 4 split over both workers
+        assert batcher.get_stats()['batches'] == 4
+    
+    @pytest.mark.asyncio
+    async def test_engine_batches_process_chunks(self):
+        import operator
+        
+        engine = DongolEngine({'use_processes': True, 'max_workers': 2, 'batch': {'enabled': True}})
+        await engine.start()
+        engine.register_handler("content", operator.attrgetter("content"))
+        
+        task = await engine.create_task("Batched", {f"k{i}": i for i in range(40)})
+        await engine.execute_task(task.id, "content")
+        
+        assert task.status == TaskStatus.COMPLETED
+        assert all(task.results[c.id] == c.content for c in task.chunks)
+        stats = engine.get_stats()['batching']
+        assert stats['chunks'] == len(task.chunks)
+        assert stats['batches'] < len(task.chunks)
+        await engine.stop()
+
+
+class TestBroadcast:
+    """Test read-only broadcast values shipped once per worker"""
+    
+    @pytest.mark.asyncio
+    async def test_process_workers_resolve_broadcast(self):
+        import pickle
+        from core.broadcast import BroadcastHandler, get_broadcast
+        from tests.preloaded_handlers import folder_for
+        
+        engine = DongolEngine({'use_processes': True, 'max_workers': 2})
+        await engine.start()
+        rules = {f".ext{i}": f"Folder{i}" for i in range(2000)}
+        rules[".pdf"] = "Documents"
+        assert engine.broadcast("rules", rules) > 0
+        engine.register_handler("folder", folder_for)
+        
+        task = await engine.create_task("Organize", {f"f{i}": f"file{i}.pdf" for i in range(10)})
+        await engine.execute_task(task.id, "folder")
+        
+        assert task.status == TaskStatus.COMPLETED
+        assert set(task.results.values()) == {"Documents"}
+        
+        # Already-running workers pick up a replaced value from its new segment
+        engine.broadcast("rules", {".pdf": "Papers"})
+        task = await engine.create_task("Organize again", {"f": "report.pdf"})
+        await engine.execute_task(task.id, "folder")
+        assert list(task.results.values()) == ["Papers"]
+        
+        # Only segment names travel with the handler, not the rules
+        handler = BroadcastHandler(folder_for, engine.broadcasts.refs())
+        assert len(pickle.dumps(handler)) < 200 < len(pickle.dumps(rules))
+        assert engine.get_stats()['broadcasts']['values'] == 1
+        
+        assert engine.remove_broadcast("rules")
+        with pytest.raises(KeyError):
+            get_broadcast("rules")
+        await engine.stop()
+
+
+class TestHandlerRouting:
+    """Test named pools and auto-routed handlers"""
+    
+    @pytest.mark.asyncio
+    async def test_pinned_pools(self):
+        import os
+        from tests.preloaded_handlers import nap
+        
+        engine = DongolEngine({'max_workers': 2})
+        await engine.start()
+        engine.register_handler("cpu", nap, pool="cpu")
+        engine.register_handler("inline", lambda chunk: os.getpid(), pool="async")
+        with pytest.raises(ValueError):
+            engine.register_handler("bad", nap, pool="gpu")
+        
+        task = await engine.create_task("Pinned", {"a": 1, "b": 2})
+        await engine.execute_task(task.id, "cpu")
+        assert os.getpid() not in task.results.values()
+        task = await engine.create_task("Inline", {"a": 1})
+        await engine.execute_task(task.id, "inline")
+        assert list(task.results.values()) == [os.getpid()]
+        assert engine.get_stats()['routing']['cpu'] == {'pool': 'cpu'}
+        await engine.stop()
+    
+    @pytest.mark.asyncio
+    async def test_auto_routing_classifies_handlers(self):
+        import operator
+        from tests.preloaded_handlers import nap, spin
+        
+        engine = DongolEngine({'max_workers': 2, 'routing': {'samples': 2}})
+        await engine.start()
+        engine.register_handler("spin", spin, pool="auto")
+        engine.register_handler("nap", nap, pool="auto")
+        engine.register_handler("tiny", operator.attrgetter("content"), pool="auto")
+        
+        # One sample per wave; two waves each settle the profiles
+        for name in ("spin", "nap", "tiny") * 2:
+            task = await engine.create_task(name, {f"k{i}": i for i in range(4)})
+            await engine.execute_task(task.id, name)
+            assert task.status == TaskStatus.COMPLETED
+        
+        routing = engine.get_stats()['routing']
+        assert routing['spin']['pool'] == 'cpu'
+        assert routing['nap']['pool'] == 'io'
+        assert routing['tiny']['pool'] == 'async'
+        await engine.stop()
+
+
+class TestAffinity:
+    """Test socket topology, worker pinning and co-located placement"""
+    
+    def test_topology_and_plans(self, tmp_path, monkeypatch):
+        import core.affinity as affinity
+        
+        for node, cpulist in (("node0", "0-1"), ("node1", "2-3\n")):
+            (tmp_path / "node" / node).mkdir(parents=True)
+            (tmp_path / "node" / node / "cpulist").write_text(cpulist)
+        monkeypatch.setattr(affinity, "_allowed", lambda: {0, 1, 2, 3})
+        topology = affinity.cpu_topology(str(tmp_path))
+        assert topology == {0: [0, 1], 1: [2, 3]}
+        
+        spread = affinity.AffinityPlan(4, topology=topology)
+        assert spread.sockets == [0, 0, 1, 1]
+        assert spread.for_worker(3) == {2, 3}
+        pinned = affinity.AffinityPlan(3, socket=1, per_core=True, topology=topology)
+        assert pinned.cpus == [{2}, {3}, {2}]
+        with pytest.raises(ValueError):
+            affinity.AffinityPlan(2, socket=5, topology=topology)
+    
+    def test_pool_pins_workers_and_keeps_keys_on_one_socket(self):
+        import os
+        import time
+        from core.affinity import AffinityPlan, cpu_topology
+        from core.pool import StealingPool
+        
+        cpus = next(iter(cpu_topology().values()))
+        # Two sockets' worth of workers, all on the CPUs this machine really has
+        plan = AffinityPlan(4, topology={0: cpus, 1: cpus}, per_core=True)
+        pool = StealingPool(max_workers=4, affinity=plan)
+        try:
+            assert pool.submit_to(0, 2, os.sched_getaffinity, 0).result(timeout=10) == plan.for_worker(0)
+            
+            blockers = [pool.submit_to(w, 2, time.sleep, 0.5) for w in range(4)]
+            while not all(w['busy'] for w in pool.get_stats()['workers']):
+                time.sleep(0.01)
+            near = [pool.submit_near("task-a", 2, time.perf_counter) for _ in range(4)]
+            workers = pool.get_stats()['workers']
+            queued_sockets = {w['socket'] for w in workers if w['queued']}
+            assert len(queued_sockets) == 1
+            assert sum(w['queued'] for w in workers) == 4
+            for future in blockers + near:
+                future.result(timeout=10)
+        finally:
+            pool.shutdown()
+    
+    @pytest.mark.asyncio
+    async def test_engine_runs_pinned_stealing_pool(self):
+        import operator
+        
+        engine = DongolEngine({
+            'use_processes': True, 'scheduler': 'stealing', 'max_workers': 2,
+            'affinity': {'enabled': True, 'socket': 0}
+        })
+        await engine.start()
+        engine.register_handler("content", operator.attrgetter("content"))
+        
+        task = await engine.create_task("Pinned", {f"k{i}": i for i in range(8)})
+        await engine.execute_task(task.id, "content")
+        
+        assert task.status == TaskStatus.COMPLETED
+        assert {w['socket'] for w in engine.get_stats()['pool']['workers']} == {0}
+        await engine.stop()
+
+
+class TestAutoscale:
+    """Test runtime pool resizing and the autoscaler"""
+    
+    def test_policy_grows_fast_and_shrinks_slowly(self):
+        engine = DongolEngine({'max_workers': 2, 'autoscale': {
+            'min_workers': 1, 'max_workers': 8, 'scale_down_after_seconds': 10
+        }})
+        scaler = engine.autoscaler
+        scaler.cpu_load = lambda: 0.1
+        
+        # Burst with nothing finished yet: grow by the backlog, at most doubling
+        engine.stats.chunks_in_flight = 6
+        assert scaler.sample(now=0) == 4
+        engine.executor.max_workers = 4
+        # A backlog that is not waiting long counts as keeping up
+        scaler.observe(0.001)
+        assert scaler.sample(now=1) is None
+        # Saturated CPUs: more workers would only contend
+        engine.stats.chunks_in_flight = 12
+        scaler.cpu_load = lambda: 3.0
+        assert scaler.sample(now=2) is None
+        
+        # Quiet: nothing until the quiet period passes, then half the idle workers go
+        engine.stats.chunks_in_flight = 0
+        assert scaler.sample(now=3) is None
+        assert scaler.sample(now=12) is None
+        assert scaler.sample(now=13) == 2
+        assert scaler.sample(now=14) is None
+    
+    @pytest.mark.asyncio
+    async def test_persistent_pool_is_not_autoscaled(self):
+        warm = {'use_processes': True, 'scheduler': 'stealing', 'pool': {'persistent': True}}
+        with pytest.raises(ValueError, match="persistent pool"):
+            DongolEngine({**warm, 'autoscale': {'max_workers': 4}})
+        
+        engine = DongolEngine(warm)
+        with pytest.raises(ValueError, match="persistent pool"):
+            await engine.reconfigure({'autoscale': {'max_workers': 4}})
+        with pytest.raises(RuntimeError, match="cannot be resized"):
+            await engine.reconfigure({'max_workers': 8})
+        assert engine.executor.max_workers == 4
+    
+    def test_stealing_pool_resizes_while_busy(self):
+        import time
+        from core.pool import StealingPool
+        
+        pool = StealingPool(max_workers=1)
+        try:
+            pool.resize(3)
+            assert len(pool.get_stats()['workers']) == 3
+            busy = [pool.submit_to(w, 2, time.sleep, 0.2) for w in range(3)]
+            while not all(w['busy'] for w in pool.get_stats()['workers']):
+                time.sleep(0.01)
+            queued = [pool.submit_to(2, 2, time.perf_counter) for _ in range(3)]
+            
+            # Dropped workers finish their job; their queue moves to worker 0
+            pool.resize(1)
+            for future in busy + queued:
+                future.result(timeout=10)
+            assert len(pool.get_stats()['workers']) == 1
+            assert pool.submit(time.perf_counter).result(timeout=10)
+        finally:
+            pool.shutdown()
+    
+    @pytest.mark.asyncio
+    async def test_engine_scales_up_on_burst(self):
+        import time
+        import core.engine
+        from core.engine import get_engine
+        
+        engine = await get_engine({'max_workers': 1, 'autoscale': {
+            'min_workers': 1, 'max_workers': 4, 'interval_seconds': 0.02,
+            'target_wait_ms': 1, 'max_cpu_load': None
+        }})
+        try:
+            engine.register_handler("slow", lambda chunk: time.sleep(0.05))
+            task = await engine.create_task("Burst", {f"k{i}": i for i in range(16)})
+            await engine.execute_task(task.id, "slow")
+            
+            assert task.status == TaskStatus.COMPLETED
+            stats = engine.get_stats()['autoscale']
+            assert stats['scale_ups'] >= 1
+            assert engine.executor.max_workers > 1
+            
+            # Later configs are applied to the running engine, within the bounds
+            assert await get_engine({'max_workers': 9}) is engine
+            assert engine.executor.max_workers == 4
+        finally:
+            await engine.stop()
+            core.engine._engine = None
+
+
+class TestMetrics:
+    """Test sharded metric collectors"""
+    
+    def test_histogram_merges_thread_shards(self):
+        import threading
+        from core.metrics import MetricsRegistry
+        
+        registry = MetricsRegistry()
+        hist = registry.histogram('latency_seconds', 'Latency', ('handler',), buckets=(0.1, 1.0))
+        failures = registry.counter('failures_total', 'Failures', ('handler',))
+        
+        def work():
+            for value in (0.05, 0.5, 5.0):
+                hist.observe(value, 'h')
+            failures.inc('h')
+        
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        text = registry.render()
+        assert 'latency_seconds_bucket{handler="h",le="0.1"} 4' in text
+        assert 'latency_seconds_bucket{handler="h",le="1"} 8' in text
+        assert 'latency_seconds_bucket{handler="h",le="+Inf"} 12' in text
+        assert 'latency_seconds_count{handler="h"} 12' in text
+        assert 'failures_total{handler="h"} 4' in text
+    
+    @pytest.mark.asyncio
+    async def test_chunk_timings_labelled_by_handler(self):
+        engine = DongolEngine()
+        await engine.start()
+        engine.register_handler("upper", lambda chunk: chunk.content.upper())
+        
+        task = await engine.create_task("Timed", "word " * 200, chunk_size=50)
+        await engine.execute_task(task.id, "upper")
+        
+        text = engine.metrics.render()
+        count = f'dongol_chunk_run_seconds_count{{handler="upper"}} {len(task.chunks)}'
+        assert count in text
+        assert 'dongol_chunk_queue_wait_seconds_count{handler="upper"}' in text
+        
+        await engine.stop()
 
 
 class TestTaskAndChunk:
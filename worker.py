@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+DONGOL Worker - Standalone process that runs chunk handlers for an engine
+
+Start an engine with a remote listener (engine config ``remote.listen`` or
+DONGOL_REMOTE_LISTEN for the API server), then point workers at it:
+
+    dongol-worker --connect tcp://engine-host:7070 --module myapp.handlers
+    dongol-worker --connect unix:///tmp/dongol.sock --handler upper=myapp.text:upper
+
+Chunks for handlers that no worker serves keep running inside the engine.
+Engines configured with a queue (engine config ``queue.url`` or
+DONGOL_QUEUE_URL) are served by pulling from the same queue instead:
+
+    dongol-worker --queue redis://queue-host:6379/0 --module myapp.handlers
+"""
+import asyncio
+import importlib
+import os
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+import click
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.queue import QueueWorker, open_queue
+from core.remote import WorkerClient, WorkerRejectedError
+
+
+def load_handlers(specs: Iterable[str], modules: Iterable[str]) -> Dict[str, Callable[[Any], Any]]:
+    """Resolve NAME=module:function specs and modules exposing a HANDLERS dict"""
+    handlers: Dict[str, Callable[[Any], Any]] = {}
+    for module_name in modules:
+        found = getattr(importlib.import_module(module_name), 'HANDLERS', None)
+        if not isinstance(found, dict):
+            raise click.BadParameter(f"{module_name} has no HANDLERS dict", param_hint='--module')
+        handlers.update(found)
+    for spec in specs:
+        name, _, target = spec.partition('=')
+        module_name, _, attr = target.partition(':')
+        if not name or not module_name or not attr:
+            raise click.BadParameter(f"Expected NAME=module:function, got {spec}", param_hint='--handler')
+        handlers[name] = getattr(importlib.import_module(module_name), attr)
+    return handlers
+
+
+async def serve(client: Union[WorkerClient, QueueWorker]):
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, client.stop)
+        except (NotImplementedError, RuntimeError):
+            # Not supported on this platform; Ctrl+C still ends the process
+            pass
+    await client.run()
+
+
+@click.command()
+@click.option('--connect', envvar='DONGOL_COORDINATOR',
+              help='Coordinator address: tcp://host:port or unix:///path')
+@click.option('--queue', 'queue_url', envvar='DONGOL_QUEUE_URL',
+              help='Queue to pull from instead: redis://host:port/db or sqlite:///path')
+@click.option('--queue-name', default='dongol', help='Queue name the engine was configured with')
+@click.option('--visibility-timeout', default=30.0, help='Seconds before an unacked job is redelivered')
+@click.option('--handler', 'handler_specs', multiple=True, help='Handler as NAME=module:function')
+@click.option('--module', 'modules', multiple=True, help='Module exposing a HANDLERS dict')
+@click.option('--concurrency', '-w', default=os.cpu_count() or 4, help='Chunks run at once')
+@click.option('--prefetch', type=int, default=None, help='Jobs held in flight (default 2x concurrency)')
+@click.option('--batch-size', default=32, help='Max results per ack frame')
+@click.option('--flush-ms', default=5.0, help='Max time a finished result waits to be sent')
+@click.option('--processes', is_flag=True, help='Run handlers in a process pool (CPU-bound work)')
+@click.option('--token', envvar='DONGOL_WORKER_TOKEN', help='Shared secret the coordinator expects')
+@click.option('--worker-id', default=None, help='Name reported to the coordinator or in logs')
+def main(connect: Optional[str], queue_url: Optional[str], queue_name: str,
+         visibility_timeout: float, handler_specs, modules, concurrency: int, prefetch: Optional[int],
+         batch_size: int, flush_ms: float, processes: bool, token: Optional[str],
+         worker_id: Optional[str]):
+    """Run chunk handlers for a DONGOL engine"""
+    # Handler modules usually live next to where the worker is started
+    sys.path.insert(0, os.getcwd())
+    handlers = load_handlers(handler_specs, modules)
+    if not handlers:
+        raise click.UsageError("No handlers given; use --handler or --module")
+    if bool(connect) == bool(queue_url):
+        raise click.UsageError("Give exactly one of --connect or --queue")
+
+    executor = ProcessPoolExecutor(max_workers=concurrency) if processes else None
+    if queue_url:
+        worker = QueueWorker(
+            open_queue(queue_url),
+            handlers,
+            name=queue_name,
+            concurrency=concurrency,
+            prefetch=prefetch,
+            batch_size=batch_size,
+            visibility_timeout=visibility_timeout,
+            worker_id=worker_id,
+            executor=executor
+        )
+        click.echo(f"dongol-worker {worker.worker_id}: serving {', '.join(sorted(handlers))} from {queue_url}")
+        asyncio.run(serve(worker))
+        return
+
+    client = WorkerClient(
+        connect,
+        handlers,
+        concurrency=concurrency,
+        prefetch=prefetch,
+        batch_size=batch_size,
+        flush_ms=flush_ms,
+        token=token,
+        worker_id=worker_id,
+        executor=executor
+    )
+    click.echo(f"dongol-worker {client.worker_id}: serving {', '.join(sorted(handlers))} for {connect}")
+    try:
+        asyncio.run(serve(client))
+    except WorkerRejectedError as e:
+        raise click.ClickException(str(e))
+
+
+if __name__ == '__main__':
+    main()